@@ -0,0 +1,259 @@
+"""Admission control and load shedding for the AgriPreserve API."""
+
+import asyncio
+import math
+from typing import Any, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+# Default limits for each priority class. Cheap endpoints get a generous
+# budget; expensive aggregations are capped so they cannot starve the threadpool.
+DEFAULT_ADMISSION_LIMITS = {
+    "cheap": {"max_concurrency": 32, "max_queue": 64, "max_wait": 1.0},
+    "expensive": {"max_concurrency": 4, "max_queue": 8, "max_wait": 0.25},
+}
+
+# Priority class of each route. Routes not listed here are not admission controlled.
+# A trailing '{param}' segment matches any single path segment.
+ROUTE_PRIORITIES = {
+    "/": "cheap",
+    "/api/crops": "cheap",
+    "/api/states": "cheap",
+    "/api/regions": "cheap",
+    "/api/predict": "cheap",
+    "/api/predict/batch": "expensive",
+    "/api/train": "cheap",
+    "/api/metrics/history": "cheap",
+    "/api/metrics/diff": "cheap",
+    "/api/metrics/names": "cheap",
+    "/api/metrics/snapshots": "cheap",
+    "/api/metrics/trend/{name}": "cheap",
+    "/api/loss-percentage": "expensive",
+    "/api/loss-tonnes": "expensive",
+    "/api/summary-statistics": "expensive",
+    "/api/high-opportunity-areas": "expensive",
+    "/api/crop-comparison": "expensive",
+}
+
+
+class RouteLimiter:
+    """Bounded concurrency limiter with a bounded, time-limited wait queue."""
+
+    def __init__(
+        self,
+        route: str,
+        priority: str,
+        max_concurrency: int,
+        max_queue: int,
+        max_wait: float
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            route: Path of the route being limited.
+            priority: Priority class of the route ('cheap' or 'expensive').
+            max_concurrency: Maximum number of requests handled at once.
+            max_queue: Maximum number of requests waiting for a slot.
+            max_wait: Maximum time in seconds a request may wait for a slot.
+        """
+        self.route = route
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore is bound to the serving event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        """
+        Try to acquire a slot.
+
+        Returns:
+            True if the request was admitted, False if it was shed.
+        """
+        semaphore = self._get_semaphore()
+
+        if semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Release a previously acquired slot."""
+        self.in_flight -= 1
+        self._get_semaphore().release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current state of the limiter."""
+        return {
+            "priority": self.priority,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
+
+
+class AdmissionController:
+    """Per-route admission control with priority for cheap endpoints."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        route_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        route_priorities: Optional[Dict[str, str]] = None,
+        max_total_concurrency: int = 40,
+        cheap_reserve: int = 8
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            limits: Default limits per priority class, merged over DEFAULT_ADMISSION_LIMITS.
+            route_limits: Limit overrides keyed by route path.
+            route_priorities: Priority class per route path, merged over ROUTE_PRIORITIES.
+            max_total_concurrency: Total number of requests handled at once across all routes.
+            cheap_reserve: Number of slots of the total kept free for cheap endpoints.
+                Expensive requests are shed first once the server is near its total limit.
+        """
+        class_limits = {
+            priority: dict(values) for priority, values in DEFAULT_ADMISSION_LIMITS.items()
+        }
+        for priority, values in (limits or {}).items():
+            class_limits.setdefault(priority, {}).update(values)
+
+        priorities = dict(ROUTE_PRIORITIES)
+        priorities.update(route_priorities or {})
+
+        self.max_total_concurrency = max_total_concurrency
+        self.cheap_reserve = cheap_reserve
+        self.total_in_flight = 0
+        self.limiters = {}
+        self._prefix_limiters = []
+
+        for route, priority in priorities.items():
+            config = dict(class_limits[priority])
+            config.update((route_limits or {}).get(route, {}))
+            self.limiters[route] = RouteLimiter(route, priority, **config)
+            if route.endswith("}") and "{" in route:
+                prefix = route[:route.rindex("{")]
+                self._prefix_limiters.append((prefix, self.limiters[route]))
+
+    def limiter_for(self, path: str) -> Optional[RouteLimiter]:
+        """Return the limiter for a request path, or None if it is not controlled."""
+        limiter = self.limiters.get(path)
+        if limiter is not None:
+            return limiter
+        for prefix, limiter in self._prefix_limiters:
+            remainder = path[len(prefix):]
+            if path.startswith(prefix) and remainder and "/" not in remainder:
+                return limiter
+        return None
+
+    def _over_total_limit(self, limiter: RouteLimiter) -> bool:
+        limit = self.max_total_concurrency
+        if limiter.priority != "cheap":
+            limit -= self.cheap_reserve
+        return self.total_in_flight >= limit
+
+    async def acquire(self, limiter: RouteLimiter) -> bool:
+        """
+        Admit a request to a route or shed it.
+
+        Args:
+            limiter: Limiter of the route being requested.
+
+        Returns:
+            True if the request was admitted, False if it was shed.
+        """
+        if self._over_total_limit(limiter):
+            limiter.shed += 1
+            return False
+
+        if not await limiter.acquire():
+            return False
+
+        # The total may have filled up while the request was queued
+        if self._over_total_limit(limiter):
+            limiter.release()
+            limiter.admitted -= 1
+            limiter.shed += 1
+            return False
+
+        self.total_in_flight += 1
+        return True
+
+    def release(self, limiter: RouteLimiter) -> None:
+        """Release a slot held by an admitted request."""
+        self.total_in_flight -= 1
+        limiter.release()
+
+    def retry_after(self, limiter: RouteLimiter) -> int:
+        """Return the Retry-After value in seconds for a shed request."""
+        return max(1, math.ceil(limiter.max_wait))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and shed counts for all controlled routes."""
+        routes = {route: limiter.stats() for route, limiter in self.limiters.items()}
+        return {
+            "max_total_concurrency": self.max_total_concurrency,
+            "total_in_flight": self.total_in_flight,
+            "queue_depth": sum(route["queue_depth"] for route in routes.values()),
+            "shed": sum(route["shed"] for route in routes.values()),
+            "routes": routes
+        }
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that sheds load with 503 responses when over capacity."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiter_for(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(limiter):
+            response = JSONResponse(
+                {"detail": "Server is over capacity, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after(limiter))}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(limiter)
@@ -0,0 +1,159 @@
+"""Dynamic micro-batching of concurrent prediction requests."""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from agripreserve.utils.histogram import Histogram
+
+# Histogram bucket bounds for batch sizes and queue waits in milliseconds
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000]
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently and scores them in one call.
+
+    The first item of a batch opens a collection window. The batch is run as
+    soon as the window closes or max_batch_size items are queued, and each
+    caller receives its own result. When a batch fails, it is bisected so that
+    only the callers whose items fail receive the exception.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        batch_window_ms: float = 2.0
+    ):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            predict_fn: Function scoring a list of items, returning one result per item.
+                        It is run in the threadpool.
+            max_batch_size: Maximum number of items per batch.
+            batch_window_ms: Time in milliseconds to wait for more items after the first.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.batch_window_ms = batch_window_ms
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches = 0
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self) -> None:
+        # The queue and worker are bound to the running event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit an item and wait for its result.
+
+        Args:
+            item: Item to score.
+
+        Returns:
+            The result for this item.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Any]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000)
+            self.batch_sizes.observe(len(batch))
+            self.batches += 1
+
+            # Callers that gave up (e.g. disconnected) are skipped
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            try:
+                outcomes = await run_in_threadpool(
+                    self._predict_isolated, [item for item, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), (failed, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if failed:
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+
+    def _predict_isolated(self, items: List[Any]) -> List[Tuple[bool, Any]]:
+        """
+        Score items, bisecting a failing batch down to the items that fail.
+
+        Returns:
+            For each item, (False, result) or (True, exception).
+        """
+        try:
+            return [(False, result) for result in self.predict_fn(items)]
+        except Exception as e:
+            if len(items) == 1:
+                return [(True, e)]
+        middle = len(items) // 2
+        return self._predict_isolated(items[:middle]) + self._predict_isolated(items[middle:])
+
+    async def close(self) -> None:
+        """Stop the worker task."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch size and queue wait histograms."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "batch_window_ms": self.batch_window_ms,
+            "batches": self.batches,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
@@ -1,23 +1,196 @@
 """API routes for AgriPreserve."""
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Literal, Optional, Union
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+import os
 import pandas as pd
 
-from agripreserve.data.loader import load_datasets
+from agripreserve.api.admission import AdmissionController, AdmissionControlMiddleware
+from agripreserve.api.batching import MicroBatcher
+from agripreserve.data.loader import load_datasets, assign_region
+from agripreserve.models.cache import PredictionCache
+from agripreserve.models.inference_pool import InferencePool
+from agripreserve.models.loss_prediction_model import DEFAULT_MODEL_TYPES
+from agripreserve.models.registry import ModelRegistry
+from agripreserve.models.serving import ModelService
+from agripreserve.models.training_jobs import QueueFullError, TrainingJobQueue
+from agripreserve.utils.metrics_store import METRICS_DB_FILE, MetricsStore, parse_snapshot_ref
+from agripreserve.utils.resilience import breaker_stats
 
 # Load the datasets
 loss_percentage_df, loss_tonnes_df = load_datasets()
 
-def create_app(allowed_origins: Optional[List[str]] = None) -> FastAPI:
-    """Create and configure the FastAPI application."""
+
+# Maximum number of items accepted by the batch prediction endpoint
+MAX_BATCH_PREDICTIONS = 10000
+
+
+class PredictionItem(BaseModel):
+    """Input for a single loss percentage prediction."""
+
+    state: str
+    crop: str
+    loss_tonnes: float = Field(..., ge=0)
+    region: Optional[str] = None
+
+
+class ModelSelection(BaseModel):
+    """
+    Choice of the model serving a prediction request.
+
+    The random forest is served unless the client asks for another model type,
+    or for 'auto': the most accurate model meeting the latency budget.
+    """
+
+    model_type: str = "random_forest"
+    variant: Literal["auto", "full", "distilled"] = "auto"
+    latency_budget_ms: Optional[float] = Field(None, gt=0)
+
+
+class PredictionRequest(PredictionItem, ModelSelection):
+    """Input for a loss percentage prediction."""
+
+    interval_coverage: Optional[float] = Field(None, gt=0, lt=1)
+
+
+class BatchPredictionRequest(ModelSelection):
+    """Input for a batch of loss percentage predictions."""
+
+    items: List[PredictionItem] = Field(..., max_length=MAX_BATCH_PREDICTIONS)
+    interval_coverage: Optional[float] = Field(None, gt=0, lt=1)
+
+
+class PromotionRequest(BaseModel):
+    """Version of a model to promote in the registry."""
+
+    version: str
+
+
+class TrainingRequest(BaseModel):
+    """Input for a background training job."""
+
+    model_types: List[str] = Field(default_factory=lambda: list(DEFAULT_MODEL_TYPES), min_length=1)
+    track_with_mlflow: bool = False
+
+
+def create_app(
+    allowed_origins: Optional[List[str]] = None,
+    admission_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+    route_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+    model_dir: Optional[str] = None,
+    preload_models: bool = True,
+    max_batch_size: int = 64,
+    batch_window_ms: float = 2.0,
+    prediction_cache_size: int = 10000,
+    prediction_cache_ttl: float = 300.0,
+    tonnes_bucket: float = 1.0,
+    compact_models: bool = True,
+    latency_slo_ms: Optional[float] = None,
+    training_workers: int = 1,
+    training_queue_size: int = 4,
+    inference_workers: int = 0,
+    registry_dir: Optional[str] = None,
+    metrics_db: Optional[str] = None
+) -> FastAPI:
+    """
+    Create and configure the FastAPI application.
+
+    Args:
+        allowed_origins: List of allowed origins for CORS.
+        admission_limits: Concurrency limits per priority class ('cheap' or 'expensive').
+        route_limits: Concurrency limit overrides keyed by route path.
+        model_dir: Directory containing the trained model files.
+        preload_models: Whether to load the prediction models at startup.
+        max_batch_size: Maximum number of concurrent single predictions scored together.
+        batch_window_ms: Time in milliseconds to collect concurrent single predictions.
+        prediction_cache_size: Maximum number of cached predictions. Use 0 to disable caching.
+        prediction_cache_ttl: Time in seconds a cached prediction stays valid.
+        tonnes_bucket: Width of the tonnage buckets used as cache keys.
+        compact_models: Whether to serve from memory-mapped compact model artifacts.
+        latency_slo_ms: Latency SLO above which 'auto' requests use the distilled model.
+        training_workers: Number of background processes running training jobs.
+        training_queue_size: Maximum number of training jobs waiting for a process.
+        inference_workers: Number of worker processes evaluating the models. If 0,
+                           models are evaluated in the API process.
+        registry_dir: Optional model registry directory. If set, the promoted
+                      versions are served and trained models are registered.
+        metrics_db: Metrics history database written by MetricsTracker. If None,
+                    uses metrics/metrics.db in the working directory.
+    """
+    cache = None
+    if prediction_cache_size > 0:
+        cache = PredictionCache(
+            max_size=prediction_cache_size,
+            ttl_seconds=prediction_cache_ttl,
+            tonnes_bucket=tonnes_bucket
+        )
+    inference_pool = InferencePool(inference_workers, model_dir) if inference_workers else None
+    registry = ModelRegistry(registry_dir) if registry_dir else None
+    metrics_store = MetricsStore(metrics_db or os.path.join("metrics", METRICS_DB_FILE))
+    model_service = ModelService(
+        model_dir=model_dir,
+        cache=cache,
+        compact=compact_models,
+        latency_slo_ms=latency_slo_ms,
+        inference_pool=inference_pool,
+        registry=registry
+    )
+    batchers = {}
+
+    def get_batcher(model_key: str) -> MicroBatcher:
+        """Get the micro-batcher for single predictions with a resident model."""
+        if model_key not in batchers:
+            def predict_fn(items):
+                # Resolve the model per batch so reloaded models are picked up
+                model = model_service.get(model_key)
+                states, regions, crops, tonnes = zip(*items)
+                return model.predict_many(list(states), list(regions), list(crops), list(tonnes))
+
+            batchers[model_key] = MicroBatcher(
+                predict_fn, max_batch_size=max_batch_size, batch_window_ms=batch_window_ms
+            )
+        return batchers[model_key]
+
+    # Trained models are published to the model directory, then hot-swapped in
+    training_jobs = TrainingJobQueue(
+        model_dir=model_dir,
+        max_workers=training_workers,
+        max_queued=training_queue_size,
+        on_complete=lambda job: model_service.load(),
+        registry=registry
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Load models in the background; /api/ready reports once they are warm
+        if preload_models:
+            model_service.start_background_load()
+        yield
+        for batcher in batchers.values():
+            await batcher.close()
+        training_jobs.shutdown()
+        if inference_pool is not None:
+            inference_pool.close()
+
     app = FastAPI(
         title="AgriPreserve API",
         description="API for analyzing post-harvest losses in Nigeria",
-        version="0.1.0"
+        version="0.1.0",
+        lifespan=lifespan
     )
+    app.state.model_service = model_service
+    app.state.training_jobs = training_jobs
+    app.state.metrics_store = metrics_store
+
+    # Shed load before requests reach the threadpool
+    admission = AdmissionController(limits=admission_limits, route_limits=route_limits)
+    app.state.admission = admission
+    app.add_middleware(AdmissionControlMiddleware, controller=admission)
 
     # Enable CORS
     app.add_middleware(
@@ -32,6 +205,259 @@ def create_app(allowed_origins: Optional[List[str]] = None) -> FastAPI:
     def read_root():
         return {"message": "Welcome to AgriPreserve API"}
 
+    @app.get("/api/stats")
+    def get_stats():
+        """Get server load statistics"""
+        return {
+            "admission": admission.stats(),
+            "batching": {model_key: batcher.stats() for model_key, batcher in batchers.items()},
+            "prediction_cache": model_service.cache_stats(),
+            "training": training_jobs.stats(),
+            "inference_pool": inference_pool.stats() if inference_pool is not None else None,
+            "remotes": breaker_stats()
+        }
+
+    @app.get("/api/ready")
+    def get_ready():
+        """Get readiness of the prediction models"""
+        status = model_service.status()
+        if not status["ready"]:
+            return JSONResponse(status_code=503, content=status)
+        return status
+
+    def select_prediction_model(crops: List[str], selection: ModelSelection) -> str:
+        """Validate prediction inputs and return the key of the resident model to use."""
+        if any(crop not in ["Maize", "Rice", "Sorghum", "Millet"] for crop in crops):
+            raise HTTPException(status_code=400, detail="Invalid crop name")
+        if not model_service.is_ready():
+            raise HTTPException(status_code=503, detail="Models are not loaded yet")
+        try:
+            return model_service.select(
+                selection.model_type, selection.variant, selection.latency_budget_ms
+            )
+        except KeyError:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Model '{selection.model_type}' ({selection.variant}) is not available"
+            )
+
+    def predict_with_interval(model_key: str, states, regions, crops, loss_tonnes,
+                              coverage: float):
+        """Predict with the interval of a forest model, mapping other models to a 400."""
+        try:
+            return model_service.get(model_key).predict_interval(
+                states, regions, crops, loss_tonnes, coverage=coverage
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def variant_of(model_key: str) -> str:
+        """Return the variant name of a resident model key."""
+        return "distilled" if model_key.endswith("_distilled") else "full"
+
+    def model_type_of(model_key: str) -> str:
+        """Return the model type of a resident model key."""
+        return model_key[:-len("_distilled")] if model_key.endswith("_distilled") else model_key
+
+    @app.post("/api/predict")
+    async def predict(request: PredictionRequest):
+        """Predict the post-harvest loss percentage"""
+        model_key = select_prediction_model([request.crop], request)
+
+        region = request.region or assign_region(request.state)
+        result = {
+            "state": request.state,
+            "region": region,
+            "crop": request.crop,
+            "loss_tonnes": request.loss_tonnes,
+            "model_type": model_type_of(model_key),
+            "variant": variant_of(model_key)
+        }
+
+        if request.interval_coverage is not None:
+            predictions, lower, upper = await run_in_threadpool(
+                predict_with_interval, model_key, [request.state], [region], [request.crop],
+                [request.loss_tonnes], request.interval_coverage
+            )
+            result.update({
+                "predicted_loss_percentage": float(predictions[0]),
+                "interval_coverage": request.interval_coverage,
+                "lower_loss_percentage": float(lower[0]),
+                "upper_loss_percentage": float(upper[0])
+            })
+            return result
+
+        # Concurrent single predictions are scored together in one batch
+        prediction = await get_batcher(model_key).submit(
+            (request.state, region, request.crop, request.loss_tonnes)
+        )
+        result["predicted_loss_percentage"] = float(prediction)
+        return result
+
+    @app.post("/api/predict/batch")
+    def predict_batch(request: BatchPredictionRequest):
+        """Predict post-harvest loss percentages for a batch of inputs"""
+        model_key = select_prediction_model([item.crop for item in request.items], request)
+        model = model_service.get(model_key)
+
+        regions = [item.region or assign_region(item.state) for item in request.items]
+        inputs = (
+            [item.state for item in request.items],
+            regions,
+            [item.crop for item in request.items],
+            [item.loss_tonnes for item in request.items]
+        )
+        results = [
+            {
+                "state": item.state,
+                "region": region,
+                "crop": item.crop,
+                "loss_tonnes": item.loss_tonnes
+            }
+            for item, region in zip(request.items, regions)
+        ]
+
+        if request.interval_coverage is not None:
+            predictions, lower, upper = predict_with_interval(
+                model_key, *inputs, request.interval_coverage
+            )
+            for result, low, high in zip(results, lower, upper):
+                result["lower_loss_percentage"] = float(low)
+                result["upper_loss_percentage"] = float(high)
+        else:
+            predictions = model.predict_many(*inputs)
+
+        for result, prediction in zip(results, predictions):
+            result["predicted_loss_percentage"] = float(prediction)
+
+        response = {
+            "model_type": model_type_of(model_key),
+            "variant": variant_of(model_key),
+            "predictions": results
+        }
+        if request.interval_coverage is not None:
+            response["interval_coverage"] = request.interval_coverage
+        return response
+
+    @app.post("/api/train", status_code=202)
+    def submit_training(request: TrainingRequest):
+        """Submit a background training job"""
+        try:
+            job_id = training_jobs.submit(
+                request.model_types, track_with_mlflow=request.track_with_mlflow
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+        return training_jobs.status(job_id)
+
+    @app.get("/api/train/{job_id}")
+    def get_training_status(job_id: str):
+        """Get the status, progress and metrics of a training job"""
+        try:
+            return training_jobs.status(job_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found")
+
+    def get_registry() -> ModelRegistry:
+        """Return the model registry, or fail if none is configured."""
+        if registry is None:
+            raise HTTPException(status_code=404, detail="No model registry is configured")
+        return registry
+
+    @app.get("/api/models")
+    def list_models():
+        """List the registered versions of each model type"""
+        models_registry = get_registry()
+        return {
+            model_type: {
+                "current": models_registry.current(model_type),
+                "versions": models_registry.versions(model_type)
+            }
+            for model_type in models_registry.model_types()
+        }
+
+    @app.post("/api/models/{model_type}/promote")
+    def promote_model(model_type: str, request: PromotionRequest):
+        """Promote a registered version and serve it"""
+        try:
+            get_registry().promote(model_type, request.version)
+        except KeyError:
+            raise HTTPException(
+                status_code=404, detail=f"Version '{request.version}' of {model_type} not found"
+            )
+        model_service.load()
+        return model_service.status()
+
+    @app.post("/api/models/{model_type}/rollback")
+    def rollback_model(model_type: str):
+        """Serve the previously promoted version again"""
+        try:
+            get_registry().rollback(model_type)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        model_service.load()
+        return model_service.status()
+
+    @app.get("/api/metrics/names")
+    def get_metric_names():
+        """Get the names of the tracked metrics"""
+        return {"names": metrics_store.names()}
+
+    @app.get("/api/metrics/snapshots")
+    def get_metric_snapshots(
+        start: Optional[float] = Query(
+            None, description="Earliest time, in seconds since the epoch"
+        ),
+        end: Optional[float] = Query(None, description="Latest time, in seconds since the epoch"),
+        limit: int = Query(100, ge=1, le=10000)
+    ):
+        """Get the tracked snapshots, newest first"""
+        return {"snapshots": metrics_store.snapshots(start=start, end=end, limit=limit)}
+
+    @app.get("/api/metrics/history")
+    def get_metric_history(
+        names: Optional[List[str]] = Query(None, description="Metric names, all if omitted"),
+        start: Optional[float] = Query(
+            None, description="Earliest time, in seconds since the epoch"
+        ),
+        end: Optional[float] = Query(None, description="Latest time, in seconds since the epoch"),
+        limit: int = Query(
+            10000, ge=1, le=100000, description="Maximum number of values per metric"
+        )
+    ):
+        """Get the recorded values of metrics in a time range"""
+        return {"history": metrics_store.query(names=names, start=start, end=end, limit=limit)}
+
+    @app.get("/api/metrics/diff")
+    def get_metric_diff(
+        before: str = Query(..., description="Content hash, or id:<ID>, of the earlier snapshot"),
+        after: str = Query(..., description="Content hash, or id:<ID>, of the later snapshot")
+    ):
+        """Compare the metrics of two snapshots"""
+        try:
+            references = [parse_snapshot_ref(before), parse_snapshot_ref(after)]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid snapshot ID: {e}")
+        try:
+            return {"before": before, "after": after, "metrics": metrics_store.diff(*references)}
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"{e.args[0]} not found")
+
+    @app.get("/api/metrics/trend/{name}")
+    def get_metric_trend(
+        name: str,
+        start: Optional[float] = Query(
+            None, description="Earliest time, in seconds since the epoch"
+        ),
+        end: Optional[float] = Query(None, description="Latest time, in seconds since the epoch"),
+        points: int = Query(100, ge=1, le=1000, description="Maximum number of points")
+    ):
+        """Get a metric's history downsampled for charting"""
+        trend = metrics_store.trend(name, start=start, end=end, points=points)
+        return {"name": name, "trend": trend}
+
     @app.get("/api/crops")
     def get_crops():
         """Get list of available crops"""
@@ -68,7 +494,9 @@ def create_app(allowed_origins: Optional[List[str]] = None) -> FastAPI:
             if crop not in ["Maize", "Rice", "Sorghum", "Millet"]:
                 raise HTTPException(status_code=400, detail="Invalid crop name")
             
-            result = filtered_df[["State", "Region", crop]].rename(columns={crop: "loss_percentage"})
+            result = filtered_df[["State", "Region", crop]].rename(
+                columns={crop: "loss_percentage"}
+            )
             result = result[result["loss_percentage"] > 0]  # Filter out zero values
             return result.to_dict(orient="records")
         
@@ -2,11 +2,25 @@
 
 import uvicorn
 from agripreserve.api.routes import create_app
-from typing import List, Optional
+from typing import Any, List, Optional
 
-def run_server(host: str = "0.0.0.0", port: int = 8000, allowed_origins: Optional[List[str]] = None):
-    """Run the FastAPI server."""
-    app = create_app(allowed_origins=allowed_origins)
+def run_server(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    allowed_origins: Optional[List[str]] = None,
+    **app_options: Any
+):
+    """
+    Run the FastAPI server.
+
+    Args:
+        host: Host to bind to.
+        port: Port to bind to.
+        allowed_origins: List of allowed origins for CORS.
+        **app_options: Further options for create_app, such as admission_limits,
+                       model_dir, max_batch_size or batch_window_ms.
+    """
+    app = create_app(allowed_origins=allowed_origins, **app_options)
     uvicorn.run(app, host=host, port=port)
 
 if __name__ == "__main__":
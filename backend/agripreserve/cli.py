@@ -3,6 +3,7 @@
 import argparse
 import os
 import sys
+import time
 
 def run_api(host="0.0.0.0", port=8001, allow_origins=None):
     """Run the FastAPI server."""
@@ -15,9 +16,76 @@ def run_api(host="0.0.0.0", port=8001, allow_origins=None):
     
     run_server(host=host, port=port, allowed_origins=origins)
 
+def run_train(server="http://localhost:8001", model_types="random_forest,linear",
+              track_with_mlflow=False, wait=False, poll_interval=2.0, timeout=30.0):
+    """Submit a training job to a running API server."""
+    import requests
+
+    url = f"{server.rstrip('/')}/api/train"
+    try:
+        response = requests.post(url, json={
+            "model_types": [model_type.strip() for model_type in model_types.split(",")],
+            "track_with_mlflow": track_with_mlflow
+        }, timeout=timeout)
+        if response.status_code != 202:
+            print(f"Failed to submit training job: {response.status_code} {response.text}")
+            return None
+
+        job = response.json()
+        print(f"Submitted training job {job['job_id']}")
+
+        # Poll the job until it finishes
+        while wait and job["status"] in ("queued", "running"):
+            time.sleep(poll_interval)
+            job = requests.get(f"{url}/{job['job_id']}", timeout=timeout).json()
+            print(f"  {job['status']} ({job['progress']:.0%})")
+    except requests.RequestException as e:
+        print(f"Could not reach the API server at {server}: {e}")
+        return None
+
+    if job["status"] == "succeeded":
+        for model_type, metrics in job["metrics"].items():
+            values = ", ".join(f"{name}={value:.4f}" for name, value in metrics.items())
+            print(f"{model_type}: {values}")
+    elif job["status"] == "failed":
+        print(f"Training job failed: {job['error']}")
+    return job
+
+def run_backfill(source, metrics_db="metrics/metrics.db", checkpoint=None, workers=None,
+                 batch_size=100, restart=False):
+    """Backfill the tracked metrics of historical snapshots in a directory or manifest."""
+    from agripreserve.utils.backfill import (
+        DEFAULT_CHECKPOINT_FILE, backfill, discover_snapshots, load_manifest
+    )
+    from agripreserve.utils.metrics_store import MetricsStore
+
+    checkpoint = checkpoint or os.path.join(os.path.dirname(metrics_db), DEFAULT_CHECKPOINT_FILE)
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    entries = discover_snapshots(source) if os.path.isdir(source) else load_manifest(source)
+    print(f"Backfilling {len(entries)} snapshots into {metrics_db}")
+
+    def report(progress):
+        done = progress["skipped"] + progress["written"] + progress["failed"]
+        print(f"  {done}/{progress['total']}")
+
+    summary = backfill(
+        entries, MetricsStore(metrics_db), checkpoint, workers=workers, batch_size=batch_size,
+        on_progress=report
+    )
+
+    print(f"Wrote {summary['written']}, skipped {summary['skipped']} already backfilled, "
+          f"{summary['failed']} failed in {summary['seconds']:.1f}s")
+    for key, error in summary["errors"].items():
+        print(f"  {key}: {error}")
+    return summary
+
 def main():
     """Main entry point for the CLI."""
-    parser = argparse.ArgumentParser(description="AgriPreserve - Nigeria Post-Harvest Loss Analysis")
+    parser = argparse.ArgumentParser(
+        description="AgriPreserve - Nigeria Post-Harvest Loss Analysis"
+    )
     
     # API command is now the default and only command
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
@@ -25,7 +93,53 @@ def main():
     parser.add_argument("--allow-origins", default="http://localhost:3000,http://localhost:5173", 
                        help="Comma-separated list of allowed origins for CORS")
     
+    # Optional subcommands; without one the API server is run
+    subparsers = parser.add_subparsers(dest="command")
+    train_parser = subparsers.add_parser(
+        "train", help="Submit a training job to a running API server"
+    )
+    train_parser.add_argument("--server", default="http://localhost:8001",
+                              help="URL of the API server")
+    train_parser.add_argument("--model-types", default="random_forest,linear",
+                              help="Comma-separated list of model types to train")
+    train_parser.add_argument("--track-with-mlflow", action="store_true",
+                              help="Track the training with MLflow")
+    train_parser.add_argument("--wait", action="store_true", help="Wait for the job to finish")
+    train_parser.add_argument("--timeout", type=float, default=30.0,
+                              help="Timeout in seconds of each request to the server")
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Compute and track the metrics of historical snapshots"
+    )
+    backfill_parser.add_argument("source",
+                                 help="Directory of snapshots, or a JSON manifest of them")
+    backfill_parser.add_argument("--metrics-db", default="metrics/metrics.db",
+                                 help="Metrics history database to write to")
+    backfill_parser.add_argument("--workers", type=int, default=None,
+                                 help="Number of worker processes (default: CPU count)")
+    backfill_parser.add_argument("--batch-size", type=int, default=100,
+                                 help="Number of snapshots written per transaction")
+    backfill_parser.add_argument("--checkpoint", default=None,
+                                 help="Checkpoint file (default: next to the database)")
+    backfill_parser.add_argument("--restart", action="store_true",
+                                 help="Ignore the checkpoint and backfill every snapshot")
+
     args = parser.parse_args()
+
+    if args.command == "train":
+        job = run_train(server=args.server, model_types=args.model_types,
+                        track_with_mlflow=args.track_with_mlflow, wait=args.wait,
+                        timeout=args.timeout)
+        if job is None or job["status"] == "failed":
+            sys.exit(1)
+        return
+
+    if args.command == "backfill":
+        summary = run_backfill(args.source, metrics_db=args.metrics_db,
+                               checkpoint=args.checkpoint, workers=args.workers,
+                               batch_size=args.batch_size, restart=args.restart)
+        if summary["failed"]:
+            sys.exit(1)
+        return
     
     # Run the API server
     run_api(host=args.host, port=args.port, allow_origins=args.allow_origins)
@@ -0,0 +1,281 @@
+"""Compact, memory-mappable model artifacts for AgriPreserve.
+
+A compact artifact is a directory holding a JSON manifest (encoder categories and
+model kind) and one .npy file per array. Tree ensembles are flattened into
+contiguous node arrays, so several worker processes can memory-map the same
+files read-only and share their pages. Loading needs only NumPy: no scikit-learn
+pickle is deserialized.
+
+Only random forest, decision tree and linear pipelines with a one-hot or ordinal
+encoder can be exported.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+
+from agripreserve.models.fast_inference import CompiledPredictor
+
+# Version of the artifact layout, bumped on incompatible changes
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+COMPRESSED_FILE = "arrays.npz"
+
+
+class TreeEnsemble:
+    """Evaluates a flattened tree ensemble on all trees and samples at once."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Initialize the ensemble.
+
+        Args:
+            arrays: Node arrays 'children_left', 'children_right', 'feature',
+                    'threshold' and 'value' of all trees, with child indices global
+                    to the arrays, and 'roots' holding the root node of each tree.
+        """
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the ensemble."""
+        return len(self.roots)
+
+    def predict_per_tree(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict with every tree.
+
+        Args:
+            X: Encoded feature matrix of shape (n_samples, n_features).
+
+        Returns:
+            Array of shape (n_samples, n_trees).
+        """
+        # scikit-learn trees compare float32 features against their thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+
+        # Advance every (sample, tree) pair one level per iteration until all reach a leaf
+        while True:
+            left = self.children_left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+
+        return self.value[nodes]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the mean over all trees."""
+        return self.predict_per_tree(X).mean(axis=1)
+
+
+class LinearEnsemble:
+    """Evaluates a linear model from its coefficients."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict X @ coef + intercept."""
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept[0]
+
+
+ESTIMATOR_KINDS = {
+    "forest": TreeEnsemble,
+    "linear": LinearEnsemble,
+}
+
+
+def _flatten_forest(estimators) -> Dict[str, np.ndarray]:
+    """Flatten fitted trees into contiguous node arrays."""
+    parts = {"children_left": [], "children_right": [], "feature": [], "threshold": [], "value": []}
+    roots = []
+    offset = 0
+
+    for estimator in estimators:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        parts["children_left"].append(np.where(left == -1, -1, left + offset))
+        parts["children_right"].append(np.where(right == -1, -1, right + offset))
+        # Leaves have feature -2; point them at column 0 so lookups stay in bounds
+        parts["feature"].append(np.maximum(tree.feature, 0).astype(np.int32))
+        parts["threshold"].append(tree.threshold.astype(np.float64))
+        parts["value"].append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {name: np.ascontiguousarray(np.concatenate(values)) for name, values in parts.items()}
+    arrays["roots"] = np.asarray(roots, dtype=np.int64)
+    return arrays
+
+
+def as_tree_ensemble(estimator) -> Optional[TreeEnsemble]:
+    """
+    Return a TreeEnsemble evaluating the trees of an estimator.
+
+    Args:
+        estimator: A TreeEnsemble, a fitted forest or a fitted decision tree.
+
+    Returns:
+        The ensemble, or None if the estimator is not made of regression trees
+        whose mean is the prediction.
+    """
+    if isinstance(estimator, TreeEnsemble):
+        return estimator
+    estimators = getattr(estimator, "estimators_", None)
+    if estimators is not None and len(estimators) and hasattr(estimators[0], "tree_"):
+        return TreeEnsemble(_flatten_forest(estimators))
+    if hasattr(estimator, "tree_"):
+        return TreeEnsemble(_flatten_forest([estimator]))
+    return None
+
+
+def publish_path(source: str, target: str):
+    """Move source to target, replacing a file or directory already at target."""
+    if os.path.isdir(source):
+        # Directories cannot be replaced atomically. The old one is renamed aside
+        # and removed, which is safe for processes that have its files mapped.
+        old = f"{target}.old-{uuid.uuid4().hex[:8]}"
+        if os.path.exists(target):
+            os.rename(target, old)
+        os.rename(source, target)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(source, target)
+
+
+def export_artifact(pipeline, path: str, compress: bool = False) -> str:
+    """
+    Export a fitted pipeline as a compact artifact.
+
+    The artifact is written to a sibling directory and then moved into place,
+    so processes that memory-mapped an artifact already at path keep reading
+    its files unchanged.
+
+    Args:
+        pipeline: Fitted preprocessor/model pipeline.
+        path: Directory to write the artifact to.
+        compress: Whether to write a single compressed archive for cold storage.
+                  Compressed artifacts are loaded into memory instead of mapped.
+
+    Returns:
+        The artifact path.
+
+    Raises:
+        ValueError: If the pipeline cannot be exported.
+    """
+    compiled = CompiledPredictor.from_pipeline(pipeline)
+    estimator = compiled.estimator
+
+    if hasattr(estimator, "estimators_") and hasattr(estimator.estimators_[0], "tree_"):
+        kind = "forest"
+        arrays = _flatten_forest(estimator.estimators_)
+    elif hasattr(estimator, "tree_"):
+        # A single decision tree is a forest of one tree
+        kind = "forest"
+        arrays = _flatten_forest([estimator])
+    elif hasattr(estimator, "coef_") and np.ndim(estimator.coef_) == 1:
+        kind = "linear"
+        arrays = {
+            "coef": np.ascontiguousarray(estimator.coef_, dtype=np.float64),
+            "intercept": np.asarray([estimator.intercept_], dtype=np.float64)
+        }
+    else:
+        raise ValueError(f"Cannot export estimator of type {type(estimator).__name__}")
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "kind": kind,
+        "encoding": compiled.encoding,
+        "n_columns": compiled.n_columns,
+        "numeric_columns": compiled.numeric_columns,
+        "category_columns": [
+            [[category, column] for category, column in columns.items()]
+            for columns in compiled.category_columns
+        ],
+        "compressed": compress,
+        "arrays": sorted(arrays)
+    }
+
+    staging = f"{os.path.normpath(path)}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(staging)
+    try:
+        if compress:
+            np.savez_compressed(os.path.join(staging, COMPRESSED_FILE), **arrays)
+        else:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), array)
+
+        # Written last so a partially written artifact has no manifest
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        publish_path(staging, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return path
+
+
+def load_artifact(path: str, mmap: bool = True) -> CompiledPredictor:
+    """
+    Load a compact artifact.
+
+    Args:
+        path: Directory of the artifact.
+        mmap: Whether to memory-map the arrays read-only instead of reading them.
+
+    Returns:
+        A CompiledPredictor backed by NumPy-only estimators.
+
+    Raises:
+        ValueError: If the artifact format is not supported.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest["format_version"] != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest['format_version']}")
+
+    if manifest["compressed"]:
+        with np.load(os.path.join(path, COMPRESSED_FILE)) as archive:
+            arrays = {name: archive[name] for name in manifest["arrays"]}
+    else:
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in manifest["arrays"]
+        }
+
+    estimator = ESTIMATOR_KINDS[manifest["kind"]](arrays)
+    category_columns = [
+        {category: column for category, column in columns}
+        for columns in manifest["category_columns"]
+    ]
+    return CompiledPredictor(
+        estimator,
+        category_columns,
+        manifest["numeric_columns"],
+        manifest["n_columns"],
+        encoding=manifest["encoding"]
+    )
+
+
+def artifact_exists(path: Optional[str]) -> bool:
+    """Return True if a complete compact artifact exists at path."""
+    return bool(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
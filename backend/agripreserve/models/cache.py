@@ -0,0 +1,125 @@
+"""Prediction memoization cache for AgriPreserve."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class PredictionCache:
+    """
+    LRU cache with a time-to-live for loss predictions.
+
+    Keys are (model version, state, region, crop, bucketed tonnage). Tonnages are
+    rounded to the nearest multiple of tonnes_bucket, so near-identical queries
+    share an entry. Entries hold the prediction at the bucket's tonnage, whichever
+    tonnage was requested first. Including the model version in the key means entries of a
+    retrained or reloaded model are never served.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        tonnes_bucket: float = 1.0
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept.
+            ttl_seconds: Time in seconds an entry stays valid.
+            tonnes_bucket: Width of the tonnage buckets. Use 0 for exact tonnages.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.tonnes_bucket = tonnes_bucket
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bucket(self, loss_tonnes: float) -> float:
+        """Return the representative tonnage of the bucket containing loss_tonnes."""
+        if not self.tonnes_bucket:
+            return float(loss_tonnes)
+        return round(float(loss_tonnes) / self.tonnes_bucket) * self.tonnes_bucket
+
+    def make_key(
+        self,
+        version: str,
+        state: str,
+        region: str,
+        crop: str,
+        loss_tonnes: float
+    ) -> Tuple[str, str, str, str, float]:
+        """Build the cache key of a prediction. The last element is the bucketed tonnage."""
+        return (version, state, region, crop, self.bucket(loss_tonnes))
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        """
+        Look up several keys.
+
+        Args:
+            keys: Keys to look up.
+
+        Returns:
+            The cached value for each key, or None on a miss.
+        """
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def put_many(self, items: Dict[Hashable, Any]) -> None:
+        """Store several values."""
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version: Optional[str] = None) -> None:
+        """
+        Drop cached entries.
+
+        Args:
+            version: Only drop the entries of this model version. If None, drops all entries.
+        """
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == version]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the size and hit ratio of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "tonnes_bucket": self.tonnes_bucket,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
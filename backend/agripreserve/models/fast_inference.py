@@ -0,0 +1,162 @@
+"""Compiled inference path for loss prediction pipelines."""
+
+import threading
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class CompiledPredictor:
+    """
+    Encodes raw inputs straight into a NumPy feature matrix and calls the estimator.
+
+    Building a DataFrame and running the ColumnTransformer costs more than the
+    estimator itself for small batches. The category maps of the fitted
+    OneHotEncoder or OrdinalEncoder are precomputed once, so encoding is a
+    dictionary lookup per value written into a reused buffer.
+    """
+
+    def __init__(
+        self,
+        estimator,
+        category_columns: List[Dict[str, int]],
+        numeric_columns: List[int],
+        n_columns: int,
+        encoding: str = "onehot"
+    ):
+        """
+        Initialize the compiled predictor.
+
+        Args:
+            estimator: Fitted estimator consuming the encoded matrix.
+            category_columns: For each categorical feature, a map from category to
+                              its column in the encoded matrix ('onehot') or to its
+                              ordinal code ('ordinal').
+            numeric_columns: Column of each numeric feature in the encoded matrix.
+            n_columns: Width of the encoded matrix.
+            encoding: 'onehot' or 'ordinal'.
+        """
+        self.estimator = estimator
+        self.encoding = encoding
+        self.category_columns = category_columns
+        self.numeric_columns = numeric_columns
+        self.n_columns = n_columns
+        self._local = threading.local()
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "CompiledPredictor":
+        """
+        Compile a fitted preprocessor/model pipeline.
+
+        Args:
+            pipeline: Fitted Pipeline with a 'preprocessor' ColumnTransformer that
+                      one-hot or ordinal encodes State, Region and Crop and passes
+                      Loss_Tonnes through.
+
+        Returns:
+            The compiled predictor.
+
+        Raises:
+            ValueError: If the pipeline does not have the expected structure.
+        """
+        # Imported here so compact artifacts can use this class without scikit-learn
+        from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+        preprocessor = pipeline.named_steps["preprocessor"]
+        estimator = pipeline.named_steps["model"]
+
+        encoders = [
+            (name, transformer, columns)
+            for name, transformer, columns in preprocessor.transformers_
+            if name != "remainder"
+        ]
+        if len(encoders) != 1 or not isinstance(encoders[0][1], (OneHotEncoder, OrdinalEncoder)):
+            raise ValueError(
+                "Only pipelines with a single OneHotEncoder or OrdinalEncoder can be compiled"
+            )
+
+        _, encoder, categorical_features = encoders[0]
+        if getattr(encoder, "drop", None) is not None or \
+                getattr(encoder, "infrequent_categories_", None):
+            raise ValueError("Encoders with drop or infrequent categories cannot be compiled")
+        if list(categorical_features) != ["State", "Region", "Crop"]:
+            raise ValueError("Pipeline must encode State, Region and Crop in that order")
+
+        if isinstance(encoder, OrdinalEncoder):
+            category_columns = [
+                {category: code for code, category in enumerate(categories)}
+                for categories in encoder.categories_
+            ]
+            # Codes occupy one column per feature, followed by Loss_Tonnes
+            n_features = len(category_columns)
+            return cls(
+                estimator, category_columns, [n_features], n_features + 1, encoding="ordinal"
+            )
+
+        category_columns = []
+        offset = 0
+        for categories in encoder.categories_:
+            category_columns.append(
+                {category: offset + i for i, category in enumerate(categories)}
+            )
+            offset += len(categories)
+
+        # The remainder (Loss_Tonnes) is passed through after the encoded columns
+        numeric_columns = [offset]
+        return cls(estimator, category_columns, numeric_columns, offset + 1)
+
+    def _buffer(self, n_samples: int) -> np.ndarray:
+        # One reusable buffer per thread, grown on demand
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < n_samples:
+            buffer = np.zeros((max(n_samples, 64), self.n_columns))
+            self._local.buffer = buffer
+        view = buffer[:n_samples]
+        view.fill(0.0)
+        return view
+
+    def encode(
+        self,
+        states: Sequence[str],
+        regions: Sequence[str],
+        crops: Sequence[str],
+        loss_tonnes: Sequence[float]
+    ) -> np.ndarray:
+        """
+        Encode raw inputs into the feature matrix expected by the estimator.
+
+        The returned array is a view of a per-thread buffer and is only valid
+        until the next call from the same thread.
+        """
+        n_samples = len(states)
+        matrix = self._buffer(n_samples)
+        rows = np.arange(n_samples)
+
+        for feature, (values, columns) in enumerate(
+            zip((states, regions, crops), self.category_columns)
+        ):
+            indices = np.fromiter(
+                (columns.get(value, -1) for value in values), dtype=np.intp, count=n_samples
+            )
+            known = indices >= 0
+            if self.encoding == "ordinal":
+                # Unknown categories are encoded as NaN, as with unknown_value=np.nan
+                matrix[:, feature] = np.where(known, indices, np.nan)
+            else:
+                # Unknown categories are encoded as all zeros, as with handle_unknown="ignore"
+                matrix[rows[known], indices[known]] = 1.0
+
+        matrix[:, self.numeric_columns[0]] = np.asarray(loss_tonnes, dtype=np.float64)
+        return matrix
+
+    def predict(
+        self,
+        states: Sequence[str],
+        regions: Sequence[str],
+        crops: Sequence[str],
+        loss_tonnes: Sequence[float]
+    ) -> np.ndarray:
+        """Predict loss percentages for raw inputs."""
+        if len(states) == 0:
+            return np.empty(0)
+        return self.estimator.predict(self.encode(states, regions, crops, loss_tonnes))
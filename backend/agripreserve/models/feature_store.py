@@ -0,0 +1,108 @@
+"""Versioned cache of prepared training features for AgriPreserve.
+
+Preparing training data merges the two loss tables, reshapes them per crop,
+filters and splits them, and fits the categorical encoder. Entries are keyed by
+a content hash of the input frames and FEATURE_PIPELINE_VERSION. Repeated runs
+and model variants on the same data then load the prepared split, the fitted
+encoder and the encoded matrices from disk instead of rebuilding them.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+import joblib
+
+# Version of the feature preparation, bumped whenever the data preparation or the
+# encoders change so stale entries are never reused
+FEATURE_PIPELINE_VERSION = 1
+
+
+class FeatureStore:
+    """
+    On-disk store of prepared features with a small in-process LRU in front.
+
+    Entries are written atomically, so processes training variants in parallel
+    can share a store directory.
+    """
+
+    def __init__(self, cache_dir: str, max_memory_entries: int = 8):
+        """
+        Initialize the store.
+
+        Args:
+            cache_dir: Directory holding the entries.
+            max_memory_entries: Number of entries also kept in memory.
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.builds = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, name: str, data_key: str) -> str:
+        """Return the file of an entry."""
+        return os.path.join(
+            self.cache_dir, f"{name}-v{FEATURE_PIPELINE_VERSION}-{data_key}.joblib"
+        )
+
+    def get_or_build(self, name: str, data_key: str, build: Callable[[], Any]) -> Any:
+        """
+        Return an entry, building and storing it on a miss.
+
+        Args:
+            name: Kind of entry, e.g. 'split' or 'features_onehot'.
+            data_key: Content hash of the input data, from dataset_hash.
+            build: Function computing the entry.
+
+        Returns:
+            The entry. It is shared between callers and must not be modified.
+        """
+        path = self.path(name, data_key)
+        with self._lock:
+            if path in self._memory:
+                self._memory.move_to_end(path)
+                self.memory_hits += 1
+                return self._memory[path]
+
+        if os.path.exists(path):
+            value = joblib.load(path)
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            value = build()
+            self._write(path, value)
+            with self._lock:
+                self.builds += 1
+
+        with self._lock:
+            self._memory[path] = value
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+        return value
+
+    def _write(self, path: str, value: Any):
+        # Write to a temporary file first so readers never see a partial entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit and build counters."""
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "builds": self.builds
+            }
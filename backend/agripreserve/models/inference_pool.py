@@ -0,0 +1,380 @@
+"""Out-of-process inference worker pool for AgriPreserve.
+
+Estimators are evaluated in dedicated worker processes, so forest traversal does
+not hold the API process's GIL while requests are parsed and serialized. The
+API process still encodes inputs, which is cheap, and writes the encoded matrix
+into a shared-memory buffer of the worker. Only a short message naming the model
+and the matrix shape travels over the worker's pipe, and the worker writes its
+predictions into a second shared buffer.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+import warnings
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from agripreserve.utils.histogram import Histogram
+
+# Upper bounds in milliseconds of the histogram of waits for an idle worker
+WORKER_WAIT_MS_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000]
+
+# Number of model generations a worker keeps, so models being replaced keep
+# serving until the new set is swapped in
+GENERATIONS_KEPT = 2
+
+
+def _worker_main(conn, input_name: str, output_name: str):
+    """Serve load and predict messages until the pipe is closed. Runs in a worker process."""
+    # Artifacts need only NumPy, so workers import neither scikit-learn nor MLflow
+    from agripreserve.models.artifact import artifact_exists, load_artifact
+
+    input_memory = shared_memory.SharedMemory(name=input_name)
+    output_memory = shared_memory.SharedMemory(name=output_name)
+    estimators = {}
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            try:
+                if message[0] == "load":
+                    _, generation, artifact_paths = message
+                    for key, path in artifact_paths.items():
+                        if artifact_exists(path):
+                            estimators[(generation, key)] = load_artifact(path).estimator
+                    # Drop generations that can no longer be requested
+                    estimators = {
+                        (gen, key): estimator for (gen, key), estimator in estimators.items()
+                        if gen > generation - GENERATIONS_KEPT
+                    }
+                    conn.send(("ok", sorted(key for gen, key in estimators if gen == generation)))
+                elif message[0] == "predict":
+                    _, generation, key, n_rows, n_columns = message
+                    X = np.ndarray((n_rows, n_columns), dtype=np.float64, buffer=input_memory.buf)
+                    y = np.ndarray((n_rows,), dtype=np.float64, buffer=output_memory.buf)
+                    y[:] = estimators[(generation, key)].predict(X)
+                    conn.send(("ok", n_rows))
+                else:
+                    conn.send(("error", f"Unknown message: {message[0]}"))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        del estimators
+        input_memory.close()
+        output_memory.close()
+
+
+class WorkerExitedError(RuntimeError):
+    """Raised when an inference worker process exited or its pipe broke."""
+
+
+class _Worker:
+    """Handle of a worker process with its pipe and shared buffers."""
+
+    def __init__(self, context, index: int, buffer_floats: int):
+        self.index = index
+        self.context = context
+        self.input_memory = shared_memory.SharedMemory(create=True, size=buffer_floats * 8)
+        self.output_memory = shared_memory.SharedMemory(create=True, size=buffer_floats * 8)
+        self.input = np.ndarray((buffer_floats,), dtype=np.float64, buffer=self.input_memory.buf)
+        self.output = np.ndarray((buffer_floats,), dtype=np.float64, buffer=self.output_memory.buf)
+        self.busy_seconds = 0.0
+        self.requests = 0
+        self.restarts = 0
+        self._spawn()
+
+    def _spawn(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.input_memory.name, self.output_memory.name),
+            name=f"inference-worker-{self.index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def restart(self):
+        """Replace an exited process with a new one attached to the same buffers."""
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=5)
+        self.restarts += 1
+        self._spawn()
+
+    def call(self, message) -> Any:
+        """Send a message and return the worker's reply."""
+        try:
+            self.conn.send(message)
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise WorkerExitedError(f"Inference worker {self.index} exited")
+        if status != "ok":
+            raise RuntimeError(f"Inference worker {self.index} failed: {value}")
+        return value
+
+    def close(self):
+        """Stop the process and release the shared buffers."""
+        self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        # Views must be released before the memory can be closed
+        del self.input, self.output
+        for memory in (self.input_memory, self.output_memory):
+            memory.close()
+            memory.unlink()
+
+
+class PooledPredictor:
+    """
+    Drop-in replacement for a CompiledPredictor that runs the estimator in the pool.
+
+    Inputs are encoded in the calling process with the local predictor, whose
+    encoders match the estimator the workers loaded for the same generation.
+    """
+
+    def __init__(self, pool: "InferencePool", generation: int, key: str, local):
+        self.pool = pool
+        self.generation = generation
+        self.key = key
+        self.local = local
+        self.estimator = local.estimator
+        self.encoding = local.encoding
+        self.category_columns = local.category_columns
+        self.numeric_columns = local.numeric_columns
+        self.n_columns = local.n_columns
+
+    def encode(self, states, regions, crops, loss_tonnes) -> np.ndarray:
+        """Encode raw inputs with the local predictor."""
+        return self.local.encode(states, regions, crops, loss_tonnes)
+
+    def predict(self, states, regions, crops, loss_tonnes) -> np.ndarray:
+        """
+        Encode raw inputs locally and predict in a worker process.
+
+        Predicts with the local predictor when the worker exits during the call.
+        """
+        if len(states) == 0:
+            return np.empty(0)
+        X = self.encode(states, regions, crops, loss_tonnes)
+        try:
+            return self.pool.predict_encoded(self.generation, self.key, X)
+        except WorkerExitedError:
+            return self.local.estimator.predict(X)
+
+
+class InferencePool:
+    """
+    Pool of worker processes holding the served models resident.
+
+    The pool is sized independently of the API workers. Each worker runs one
+    prediction at a time; callers wait for an idle worker. A worker that exits
+    is restarted in the background with the models of the kept generations, and
+    is out of rotation until it is ready again.
+    """
+
+    def __init__(
+        self,
+        n_workers: int = 2,
+        model_dir: Optional[str] = None,
+        buffer_floats: int = 1 << 18
+    ):
+        """
+        Initialize the pool. Worker processes are started on the first load.
+
+        Args:
+            n_workers: Number of worker processes.
+            model_dir: Directory containing the model files. If None, uses the
+                       package's models directory.
+            buffer_floats: Size in float64 values of each worker's input and output
+                           buffers. Larger batches are split into chunks.
+        """
+        self.n_workers = n_workers
+        self.model_dir = model_dir
+        self.buffer_floats = buffer_floats
+        self.generation = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self.wait_ms = Histogram(WORKER_WAIT_MS_BUCKETS)
+        self._workers = []
+        self._idle = queue.Queue()
+        self._started_at = None
+        self._lock = threading.Lock()
+        # Guards the counters only; never held while waiting for a worker
+        self._stats_lock = threading.Lock()
+        # Artifact paths loaded by each kept generation, replayed into restarted workers
+        self._loads = {}
+
+    def _start(self):
+        context = multiprocessing.get_context("spawn")
+        self._workers = [
+            _Worker(context, index, self.buffer_floats)
+            for index in range(self.n_workers)
+        ]
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._started_at = time.monotonic()
+
+    def load(self, keys: Union[Iterable[str], Dict[str, Optional[str]]]) -> Tuple[int, List[str]]:
+        """
+        Load a new generation of models into every worker.
+
+        Waits for each worker to finish its current prediction. Models of the
+        previous generation stay loaded, so predictors created for them keep working.
+
+        Args:
+            keys: Model keys to load, as passed to LossPredictionModel's model_type,
+                  or a mapping from key to the model directory to load it from.
+
+        Returns:
+            The new generation and the keys every worker could load. Only models
+            with a compiled inference path can be served by the pool.
+
+        Raises:
+            RuntimeError: If a worker failed to load the models.
+        """
+        from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+        model_dirs = dict(keys) if isinstance(keys, dict) else dict.fromkeys(keys)
+        artifact_paths = {
+            key: LossPredictionModel(
+                model_type=key, model_dir=key_model_dir or self.model_dir
+            ).artifact_path
+            for key, key_model_dir in model_dirs.items()
+        }
+        with self._lock:
+            if not self._workers:
+                self._start()
+            self.generation += 1
+            generation = self.generation
+            self._loads[generation] = artifact_paths
+            self._loads = {
+                gen: paths for gen, paths in self._loads.items()
+                if gen > generation - GENERATIONS_KEPT
+            }
+
+            # Take every worker out of rotation, so each one is loaded exactly once
+            workers = [self._idle.get() for _ in self._workers]
+            try:
+                loaded = [worker.call(("load", generation, artifact_paths)) for worker in workers]
+            finally:
+                for worker in workers:
+                    self._idle.put(worker)
+
+        return generation, sorted(set.intersection(*(set(names) for names in loaded)))
+
+    def predictor(self, generation: int, key: str, local) -> PooledPredictor:
+        """
+        Create a predictor for a model loaded in a generation.
+
+        Args:
+            generation: Generation returned by load.
+            key: Model key.
+            local: CompiledPredictor of the same model, used to encode inputs.
+
+        Returns:
+            The pooled predictor.
+        """
+        return PooledPredictor(self, generation, key, local)
+
+    def predict_encoded(self, generation: int, key: str, X: np.ndarray) -> np.ndarray:
+        """
+        Predict an encoded feature matrix in a worker process.
+
+        Args:
+            generation: Generation the model was loaded in.
+            key: Model key.
+            X: Encoded feature matrix of shape (n_samples, n_features).
+
+        Returns:
+            Array of predictions.
+        """
+        n_rows, n_columns = X.shape
+        chunk_rows = max(1, self.buffer_floats // n_columns)
+        predictions = np.empty(n_rows)
+
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            size = (stop - start) * n_columns
+
+            wait_start = time.perf_counter()
+            worker = self._idle.get()
+            call_start = time.perf_counter()
+            self.wait_ms.observe((call_start - wait_start) * 1000)
+            exited = False
+            try:
+                worker.input[:size] = X[start:stop].ravel()
+                worker.call(("predict", generation, key, stop - start, n_columns))
+                predictions[start:stop] = worker.output[:stop - start]
+            except WorkerExitedError:
+                exited = True
+                raise
+            finally:
+                worker.busy_seconds += time.perf_counter() - call_start
+                worker.requests += 1
+                # The worker is handed back before any lock is taken, as load
+                # holds the pool lock while it waits for every worker
+                if exited:
+                    threading.Thread(
+                        target=self._restart, args=(worker,), name="inference-restart", daemon=True
+                    ).start()
+                    with self._stats_lock:
+                        self.fallbacks += 1
+                else:
+                    self._idle.put(worker)
+
+        with self._stats_lock:
+            self.rows += n_rows
+        return predictions
+
+    def _restart(self, worker: _Worker):
+        """Restart an exited worker, reload the kept generations and return it to rotation."""
+        if worker not in self._workers:
+            # The pool was closed meanwhile
+            return
+        try:
+            worker.restart()
+            for generation, artifact_paths in sorted(dict(self._loads).items()):
+                worker.call(("load", generation, artifact_paths))
+        except Exception as e:
+            warnings.warn(f"Error restarting inference worker {worker.index}: {e}")
+        # Returned even on failure, so load and close never wait for it; a
+        # worker that exited again is restarted on its next call
+        self._idle.put(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool size, utilization and worker wait times."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        busy = sum(worker.busy_seconds for worker in self._workers)
+        return {
+            "n_workers": self.n_workers,
+            "alive": sum(worker.process.is_alive() for worker in self._workers),
+            "busy": len(self._workers) - self._idle.qsize(),
+            "generation": self.generation,
+            "requests": sum(worker.requests for worker in self._workers),
+            "rows": self.rows,
+            "restarts": sum(worker.restarts for worker in self._workers),
+            "fallbacks": self.fallbacks,
+            "utilization": (
+                busy / (elapsed * len(self._workers)) if elapsed and self._workers else 0.0
+            ),
+            "wait_ms": self.wait_ms.snapshot()
+        }
+
+    def close(self):
+        """Stop all worker processes."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.close()
@@ -1,51 +1,167 @@
 """Post-harvest loss prediction model for AgriPreserve."""
 
+import copy
 import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
 from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import (
+    KFold,
+    ParameterGrid,
+    ParameterSampler,
+    cross_val_score,
+    train_test_split
+)
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import joblib
-import mlflow
-import mlflow.sklearn
 
 from agripreserve.data.loader import load_datasets
+from agripreserve.models.artifact import (
+    artifact_exists,
+    as_tree_ensemble,
+    export_artifact,
+    load_artifact,
+    publish_path
+)
+from agripreserve.models.fast_inference import CompiledPredictor
+from agripreserve.models.feature_store import FeatureStore
+from agripreserve.utils.hashing import dataset_hash
 from agripreserve.utils.mlflow_utils import (
     setup_mlflow_tracking,
     start_run,
     log_metrics,
     log_params,
     log_artifacts,
-    end_run
+    log_model,
+    end_run,
+    flush_logging
 )
 
+# Input features of the prediction pipeline, in order
+FEATURE_COLUMNS = ["State", "Region", "Crop", "Loss_Tonnes"]
+
+
+def _build_random_forest(n_jobs=None):
+    """Build the random forest estimator."""
+    return RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+
+
+def _build_linear(n_jobs=None):
+    """Build the linear regression estimator."""
+    return LinearRegression()
+
+
+def _build_hist_gradient_boosting(n_jobs=None):
+    """Build the histogram gradient boosting estimator."""
+    # State, Region and Crop are the first three columns after ordinal encoding.
+    # The estimator uses OpenMP threads and has no n_jobs parameter.
+    return HistGradientBoostingRegressor(
+        categorical_features=[0, 1, 2],
+        max_iter=200,
+        learning_rate=0.1,
+        random_state=42
+    )
+
+
+# Estimator builders by model type. Each builder takes the number of cores the
+# estimator may use. Add an entry here to make a new variant trainable.
+MODEL_TYPES = {
+    "random_forest": _build_random_forest,
+    "linear": _build_linear,
+    "hist_gradient_boosting": _build_hist_gradient_boosting,
+}
+
+# Model types consuming State, Region and Crop as ordinal codes instead of one-hot
+# columns, so their width does not grow with the number of categories
+ORDINAL_ENCODED_MODEL_TYPES = {"hist_gradient_boosting"}
+
+# Directory of the feature store used by train_and_save_models, inside the model directory
+FEATURE_CACHE_DIR = "feature_cache"
+
+# Model types trained and served by default
+DEFAULT_MODEL_TYPES = ("random_forest", "linear")
+
+# Hyperparameter search spaces used by LossPredictionModel.tune. The resource is
+# the estimator parameter grown between successive halving rungs.
+SEARCH_SPACES = {
+    "random_forest": {
+        "resource": "n_estimators",
+        "min_resource": 25,
+        "max_resource": 200,
+        "params": {
+            "max_depth": [None, 5, 10, 20],
+            "min_samples_leaf": [1, 2, 4],
+            "max_features": [1.0, 0.5, "sqrt"],
+        },
+    },
+    "hist_gradient_boosting": {
+        "resource": "max_iter",
+        "min_resource": 50,
+        "max_resource": 400,
+        "params": {
+            "learning_rate": [0.03, 0.1, 0.3],
+            "max_leaf_nodes": [7, 15, 31],
+            "l2_regularization": [0.0, 1.0],
+        },
+    },
+}
+
 
 class LossPredictionModel:
     """Model for predicting post-harvest losses."""
     
-    def __init__(self, model_type="random_forest"):
+    def __init__(self, model_type="random_forest", model_dir=None, cache=None, n_jobs=None,
+                 feature_store=None):
         """
         Initialize the loss prediction model.
         
         Args:
-            model_type: Type of model to use ('random_forest' or 'linear').
+            model_type: Type of model to use, a key of MODEL_TYPES ('random_forest',
+                        'linear' or 'hist_gradient_boosting').
+            model_dir: Directory to save and load the model file. If None, uses the
+                       package's models directory.
+            cache: Optional PredictionCache for memoizing predictions.
+            n_jobs: Number of cores used to fit estimators that support it (-1 for all).
+            feature_store: Optional FeatureStore reusing prepared training features
+                           across runs and model variants.
         """
         self.model_type = model_type
+        self.n_jobs = n_jobs
+        self.feature_store = feature_store
         self.model = None
         self.preprocessor = None
+        self.compiled = None
+        self.version = None
+        self._tree_ensemble = None
+        self.cache = cache
+        self.model_dir = model_dir or os.path.dirname(os.path.abspath(__file__))
         self.model_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
+            self.model_dir,
             f"loss_prediction_{model_type}.joblib"
         )
+        self.artifact_path = os.path.join(
+            self.model_dir,
+            f"loss_prediction_{model_type}.compact"
+        )
     
     def _prepare_data(self, loss_percentage_df, loss_tonnes_df):
         """
-        Prepare data for training.
+        Prepare data for training, reusing the feature store's split if possible.
         
         Args:
             loss_percentage_df: DataFrame with loss percentage data.
@@ -54,6 +170,59 @@ class LossPredictionModel:
         Returns:
             X_train, X_test, y_train, y_test: Train and test data.
         """
+        if self.feature_store is None:
+            return self._split_data(loss_percentage_df, loss_tonnes_df)
+        
+        return self.feature_store.get_or_build(
+            "split",
+            dataset_hash(loss_percentage_df, loss_tonnes_df),
+            lambda: self._split_data(loss_percentage_df, loss_tonnes_df)
+        )
+    
+    def _prepare_features(self, loss_percentage_df, loss_tonnes_df):
+        """
+        Prepare the encoded feature matrices for training.
+        
+        Model types with the same encoding share a store entry, and the fitted
+        preprocessor becomes part of the trained pipeline, so serving encodes
+        inputs exactly as they were encoded for training.
+        
+        Args:
+            loss_percentage_df: DataFrame with loss percentage data.
+            loss_tonnes_df: DataFrame with loss tonnage data.
+            
+        Returns:
+            Dictionary with the raw split ('X_train', 'X_test', 'y_train',
+            'y_test'), the fitted 'preprocessor' and the encoded 'Xt_train' and
+            'Xt_test' matrices.
+        """
+        def build():
+            X_train, X_test, y_train, y_test = self._prepare_data(
+                loss_percentage_df, loss_tonnes_df
+            )
+            preprocessor = self._build_preprocessor()
+            return {
+                "X_train": X_train,
+                "X_test": X_test,
+                "y_train": y_train,
+                "y_test": y_test,
+                "preprocessor": preprocessor,
+                "Xt_train": preprocessor.fit_transform(X_train),
+                "Xt_test": preprocessor.transform(X_test)
+            }
+        
+        if self.feature_store is None:
+            return build()
+        
+        encoding = "ordinal" if self.model_type in ORDINAL_ENCODED_MODEL_TYPES else "onehot"
+        return self.feature_store.get_or_build(
+            f"features_{encoding}",
+            dataset_hash(loss_percentage_df, loss_tonnes_df),
+            build
+        )
+    
+    def _split_data(self, loss_percentage_df, loss_tonnes_df):
+        """Reshape the loss tables into one row per state and crop, and split them."""
         # Combine data
         df = pd.merge(
             loss_percentage_df,
@@ -85,7 +254,7 @@ class LossPredictionModel:
         combined_df = combined_df[combined_df["Loss_Tonnes"] > 0]
         
         # Features and target
-        X = combined_df[["State", "Region", "Crop", "Loss_Tonnes"]]
+        X = combined_df[FEATURE_COLUMNS]
         y = combined_df["Loss_Percentage"]
         
         # Split data
@@ -95,57 +264,86 @@ class LossPredictionModel:
         
         return X_train, X_test, y_train, y_test
     
-    def train(self, loss_percentage_df, loss_tonnes_df, track_with_mlflow=True):
-        """
-        Train the model.
-        
-        Args:
-            loss_percentage_df: DataFrame with loss percentage data.
-            loss_tonnes_df: DataFrame with loss tonnage data.
-            track_with_mlflow: Whether to track the training with MLflow.
-            
-        Returns:
-            Dictionary with training metrics.
-        """
-        # Prepare data
-        X_train, X_test, y_train, y_test = self._prepare_data(
-            loss_percentage_df, loss_tonnes_df
-        )
-        
+    def _build_preprocessor(self):
+        """Build the unfitted preprocessor encoding the categorical features."""
         # Define preprocessing for categorical features
         categorical_features = ["State", "Region", "Crop"]
-        categorical_transformer = OneHotEncoder(handle_unknown="ignore")
+        if self.model_type in ORDINAL_ENCODED_MODEL_TYPES:
+            # Unknown categories become NaN, which the estimator treats as missing
+            categorical_transformer = OrdinalEncoder(
+                handle_unknown="use_encoded_value", unknown_value=np.nan
+            )
+        else:
+            categorical_transformer = OneHotEncoder(handle_unknown="ignore")
         
         # Create preprocessor
-        self.preprocessor = ColumnTransformer(
+        return ColumnTransformer(
             transformers=[
                 ("cat", categorical_transformer, categorical_features)
             ],
             remainder="passthrough"
         )
+    
+    def _build_pipeline(self, estimator_params=None, n_jobs=None, preprocessor=None):
+        """
+        Build a preprocessor/model pipeline with an unfitted model.
         
-        # Create model pipeline
-        if self.model_type == "random_forest":
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-        else:
-            model = LinearRegression()
+        Args:
+            estimator_params: Optional estimator parameters overriding the defaults.
+            n_jobs: Number of cores the estimator may use.
+            preprocessor: Fitted preprocessor to use. If None, builds an unfitted one.
+            
+        Returns:
+            The pipeline.
+        """
+        if preprocessor is None:
+            preprocessor = self._build_preprocessor()
+        
+        # Create model
+        if self.model_type not in MODEL_TYPES:
+            raise ValueError(f"Unknown model type: {self.model_type}")
+        model = MODEL_TYPES[self.model_type](n_jobs=n_jobs)
+        if estimator_params:
+            model.set_params(**estimator_params)
         
         # Create pipeline
-        pipeline = Pipeline([
-            ("preprocessor", self.preprocessor),
+        return Pipeline([
+            ("preprocessor", preprocessor),
             ("model", model)
         ])
+    
+    def train(self, loss_percentage_df, loss_tonnes_df, track_with_mlflow=True,
+              estimator_params=None):
+        """
+        Train the model.
         
-        # Train model
-        pipeline.fit(X_train, y_train)
-        self.model = pipeline
+        Args:
+            loss_percentage_df: DataFrame with loss percentage data.
+            loss_tonnes_df: DataFrame with loss tonnage data.
+            track_with_mlflow: Whether to track the training with MLflow.
+            estimator_params: Optional estimator parameters overriding the defaults,
+                              e.g. the best configuration found by tune.
+            
+        Returns:
+            Dictionary with training metrics.
+        """
+        # Prepare data
+        features = self._prepare_features(loss_percentage_df, loss_tonnes_df)
+        X_train, y_train, y_test = features["X_train"], features["y_train"], features["y_test"]
+        
+        # Create model pipeline around the fitted preprocessor
+        pipeline = self._build_pipeline(
+            estimator_params, n_jobs=self.n_jobs, preprocessor=features["preprocessor"]
+        )
+        self.preprocessor = pipeline.named_steps["preprocessor"]
+        model = pipeline.named_steps["model"]
+        
+        # Train model on the encoded matrix
+        model.fit(features["Xt_train"], y_train)
+        self._set_model(pipeline)
         
         # Evaluate model
-        y_pred = self.model.predict(X_test)
+        y_pred = model.predict(features["Xt_test"])
         
         # Calculate metrics
         mse = mean_squared_error(y_test, y_pred)
@@ -161,7 +359,7 @@ class LossPredictionModel:
         }
         
         # Save model
-        joblib.dump(self.model, self.model_path)
+        self._save()
         
         # Track with MLflow if requested
         if track_with_mlflow:
@@ -175,10 +373,13 @@ class LossPredictionModel:
                 
                 if self.model_type == "random_forest":
                     params.update({
-                        "n_estimators": 100,
-                        "max_depth": 10,
-                        "random_state": 42
+                        "n_estimators": model.n_estimators,
+                        "max_depth": model.max_depth,
+                        "random_state": model.random_state,
+                        "n_jobs": model.n_jobs
                     })
+                if estimator_params:
+                    params.update(estimator_params)
                 
                 log_params(params)
                 
@@ -186,13 +387,309 @@ class LossPredictionModel:
                 log_metrics(metrics)
                 
                 # Log model
-                mlflow.sklearn.log_model(self.model, "model")
+                log_model(self.model)
                 
                 # Log artifacts
                 log_artifacts([self.model_path])
         
         return metrics
     
+    def tune(self, loss_percentage_df, loss_tonnes_df, search_space=None, cv=5,
+             n_candidates=16, eta=3, time_budget=300.0, n_jobs=-1,
+             track_with_mlflow=True, random_state=42):
+        """
+        Tune hyperparameters with successive halving over k-fold CV, then train.
+        
+        Candidates are sampled from the search space and scored with k-fold CV at a
+        small resource (e.g. few trees). The best 1/eta are kept and scored again at
+        eta times the resource, until one candidate is left or the maximum resource
+        is reached. No new trial is started once time_budget is exhausted. The best
+        configuration is trained on the training split and saved to model_path.
+        
+        Args:
+            loss_percentage_df: DataFrame with loss percentage data.
+            loss_tonnes_df: DataFrame with loss tonnage data.
+            search_space: Search space with 'resource', 'min_resource', 'max_resource'
+                          and 'params' keys. If None, uses SEARCH_SPACES[model_type].
+            cv: Number of CV folds.
+            n_candidates: Number of configurations sampled for the first rung.
+            eta: Fraction of candidates kept per rung is 1/eta.
+            time_budget: Wall-clock budget in seconds.
+            n_jobs: Number of processes evaluating CV folds in parallel (-1 for all cores).
+            track_with_mlflow: Whether to log every trial with MLflow.
+            random_state: Seed for sampling candidates and CV splits.
+            
+        Returns:
+            Dictionary with the best parameters, its CV RMSE, all trials and the
+            metrics of the final model.
+        """
+        search_space = search_space or SEARCH_SPACES.get(self.model_type)
+        if search_space is None:
+            raise ValueError(f"No search space for model type: {self.model_type}")
+        
+        start = time.perf_counter()
+        X_train, _, y_train, _ = self._prepare_data(loss_percentage_df, loss_tonnes_df)
+        folds = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+        
+        n_candidates = min(n_candidates, len(ParameterGrid(search_space["params"])))
+        candidates = list(ParameterSampler(
+            search_space["params"], n_iter=n_candidates, random_state=random_state
+        ))
+        resource = search_space["min_resource"]
+        
+        trials = []
+        best = None
+        tracking = start_run(run_name=f"loss_prediction_{self.model_type}_tuning") \
+            if track_with_mlflow else nullcontext()
+        
+        with tracking:
+            rung = 0
+            while candidates and time.perf_counter() - start < time_budget:
+                scores = []
+                for candidate in candidates:
+                    if time.perf_counter() - start >= time_budget:
+                        break
+                    
+                    params = dict(candidate, **{search_space["resource"]: resource})
+                    fold_scores = cross_val_score(
+                        self._build_pipeline(params), X_train, y_train, cv=folds,
+                        scoring="neg_root_mean_squared_error", n_jobs=n_jobs
+                    )
+                    trial = {
+                        "rung": rung,
+                        "params": params,
+                        "cv_rmse": float(-fold_scores.mean()),
+                        "cv_rmse_std": float(fold_scores.std())
+                    }
+                    trials.append(trial)
+                    scores.append((trial["cv_rmse"], candidate, trial))
+                    
+                    if track_with_mlflow:
+                        with start_run(run_name=f"trial_{len(trials)}", nested=True):
+                            log_params(dict(params, rung=rung))
+                            log_metrics({
+                                "cv_rmse": trial["cv_rmse"],
+                                "cv_rmse_std": trial["cv_rmse_std"]
+                            })
+                
+                if not scores:
+                    break
+                
+                # Trials at a higher resource are more reliable, so the latest rung wins
+                scores.sort(key=lambda score: score[0])
+                best = scores[0][2]
+                
+                if len(scores) == 1 or resource >= search_space["max_resource"]:
+                    break
+                candidates = [candidate for _, candidate, _ in scores[:max(1, len(scores) // eta)]]
+                resource = min(resource * eta, search_space["max_resource"])
+                rung += 1
+            
+            if best is None:
+                raise RuntimeError("Time budget exhausted before any trial completed")
+            
+            if track_with_mlflow:
+                log_params({f"best_{name}": value for name, value in best["params"].items()})
+                log_metrics({"best_cv_rmse": best["cv_rmse"], "n_trials": len(trials)})
+        
+        # Persist the best configuration to model_path
+        metrics = self.train(
+            loss_percentage_df, loss_tonnes_df,
+            track_with_mlflow=track_with_mlflow,
+            estimator_params=best["params"]
+        )
+        
+        return {
+            "best_params": best["params"],
+            "cv_rmse": best["cv_rmse"],
+            "trials": trials,
+            "metrics": metrics,
+            "elapsed_seconds": time.perf_counter() - start
+        }
+    
+    def update(self, loss_percentage_df, loss_tonnes_df, n_new_estimators=20, tolerance=0.0,
+               validation_data=None, track_with_mlflow=False):
+        """
+        Incrementally update the model with a new batch of loss data.
+        
+        Forests get n_new_estimators more trees fitted on the new batch with
+        warm_start. Estimators with partial_fit are updated online. The fitted
+        preprocessor is kept, so the encoding does not change. The updated model
+        replaces the current one, with a new version, only if its RMSE on the
+        validation data does not regress.
+        
+        Args:
+            loss_percentage_df: DataFrame with the new loss percentage data.
+            loss_tonnes_df: DataFrame with the new loss tonnage data.
+            n_new_estimators: Number of trees added to a forest.
+            tolerance: Relative RMSE increase still accepted, e.g. 0.01 for 1%.
+            validation_data: Optional (loss_percentage_df, loss_tonnes_df) tuple to
+                             validate on, e.g. a fixed reference set. If None, uses
+                             the held-out part of the new batch.
+            track_with_mlflow: Whether to track the update with MLflow.
+            
+        Returns:
+            Dictionary with whether the update was 'accepted', the validation
+            RMSE before ('baseline_rmse') and after ('rmse') the update, and the
+            serving 'version'.
+            
+        Raises:
+            ValueError: If the model type cannot be updated incrementally.
+        """
+        if self.model is None and not self.load():
+            raise ValueError("Model not trained or loaded")
+        
+        X_train, X_test, y_train, y_test = self._split_data(loss_percentage_df, loss_tonnes_df)
+        if validation_data is not None:
+            _, X_test, _, y_test = self._split_data(*validation_data)
+        preprocessor = self.model.named_steps["preprocessor"]
+        Xt_train = preprocessor.transform(X_train)
+        Xt_test = preprocessor.transform(X_test)
+        
+        # Update a copy so the serving model is untouched until the update is accepted
+        estimator = copy.deepcopy(self.model.named_steps["model"])
+        baseline_rmse = float(np.sqrt(mean_squared_error(y_test, estimator.predict(Xt_test))))
+        
+        if hasattr(estimator, "partial_fit"):
+            estimator.partial_fit(Xt_train, y_train)
+        elif hasattr(estimator, "estimators_") and hasattr(estimator, "warm_start"):
+            estimator.set_params(
+                warm_start=True, n_estimators=len(estimator.estimators_) + n_new_estimators
+            )
+            estimator.fit(Xt_train, y_train)
+            estimator.set_params(warm_start=False)
+        else:
+            raise ValueError(
+                f"Model type {self.model_type} does not support incremental training"
+            )
+        
+        rmse = float(np.sqrt(mean_squared_error(y_test, estimator.predict(Xt_test))))
+        accepted = rmse <= baseline_rmse * (1 + tolerance)
+        
+        if accepted:
+            self._set_model(Pipeline([("preprocessor", preprocessor), ("model", estimator)]))
+            self._save()
+        
+        result = {
+            "accepted": accepted,
+            "baseline_rmse": baseline_rmse,
+            "rmse": rmse,
+            "n_samples": len(X_train),
+            "version": self.version
+        }
+        
+        if track_with_mlflow:
+            with start_run(run_name=f"loss_prediction_{self.model_type}_update"):
+                log_params({"model_type": self.model_type, "n_new_estimators": n_new_estimators})
+                log_metrics({
+                    "accepted": float(accepted),
+                    "baseline_rmse": baseline_rmse,
+                    "rmse": rmse,
+                    "n_samples": len(X_train)
+                })
+        
+        return result
+    
+    def distill(self, loss_percentage_df, loss_tonnes_df, max_depth=8, n_tonnage_points=50,
+                random_state=42):
+        """
+        Distill the model into a shallow decision tree for low-latency serving.
+        
+        The tree is fitted to this model's predictions over the training domain:
+        every state and crop of the data crossed with a log-spaced grid of tonnages
+        spanning the observed range of each crop. It is saved as model type
+        '{model_type}_distilled' in the same directory, with a compact artifact.
+        
+        Args:
+            loss_percentage_df: DataFrame with loss percentage data.
+            loss_tonnes_df: DataFrame with loss tonnage data.
+            max_depth: Maximum depth of the distilled tree.
+            n_tonnage_points: Number of tonnages per state and crop in the grid.
+            random_state: Seed for splitting the grid and fitting the tree.
+            
+        Returns:
+            Dictionary with the fidelity of the distilled model against this model
+            on held-out grid points and the test split, its accuracy on the test
+            split, and the per-prediction latency of both models.
+        """
+        self._ensure_loaded()
+        _, X_test, _, y_test = self._prepare_data(loss_percentage_df, loss_tonnes_df)
+        
+        # Build the training domain and label it with this model
+        locations = loss_percentage_df[["State", "Region"]].drop_duplicates()
+        grid = []
+        for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
+            observed = loss_tonnes_df.loc[loss_tonnes_df[crop] > 0, crop]
+            if observed.empty:
+                continue
+            tonnages = np.geomspace(observed.min(), observed.max(), n_tonnage_points)
+            for state, region in zip(locations["State"], locations["Region"]):
+                grid.extend((state, region, crop, tonnes) for tonnes in tonnages)
+        grid = pd.DataFrame(grid, columns=FEATURE_COLUMNS)
+        grid["Teacher"] = self._predict_uncached(
+            grid["State"].to_numpy(), grid["Region"].to_numpy(),
+            grid["Crop"].to_numpy(), grid["Loss_Tonnes"].to_numpy()
+        )
+        grid_train, grid_test = train_test_split(grid, test_size=0.2, random_state=random_state)
+        
+        # Fit the student on the teacher's predictions
+        pipeline = Pipeline([
+            ("preprocessor", ColumnTransformer(
+                transformers=[
+                    ("cat", OneHotEncoder(handle_unknown="ignore"), ["State", "Region", "Crop"])
+                ],
+                remainder="passthrough"
+            )),
+            ("model", DecisionTreeRegressor(max_depth=max_depth, random_state=random_state))
+        ])
+        pipeline.fit(grid_train[FEATURE_COLUMNS], grid_train["Teacher"])
+        
+        student = LossPredictionModel(
+            model_type=f"{self.model_type}_distilled", model_dir=self.model_dir
+        )
+        student._set_model(pipeline)
+        
+        # Fidelity against the teacher and accuracy against the data
+        student_grid = student._predict_uncached(
+            grid_test["State"].to_numpy(), grid_test["Region"].to_numpy(),
+            grid_test["Crop"].to_numpy(), grid_test["Loss_Tonnes"].to_numpy()
+        )
+        teacher_test = self.predict_many(X_test)
+        student_test = student.predict_many(X_test)
+        
+        metrics = {
+            "fidelity_r2": r2_score(grid_test["Teacher"], student_grid),
+            "fidelity_mae": mean_absolute_error(grid_test["Teacher"], student_grid),
+            "fidelity_max_error": float(np.max(np.abs(grid_test["Teacher"] - student_grid))),
+            "test_fidelity_mae": mean_absolute_error(teacher_test, student_test),
+            "rmse": float(np.sqrt(mean_squared_error(y_test, student_test))),
+            "r2": r2_score(y_test, student_test),
+            "teacher_latency_ms": self.measure_latency_ms(),
+            "latency_ms": student.measure_latency_ms()
+        }
+        
+        student._save()
+        
+        return metrics
+    
+    def measure_latency_ms(self, n_runs=50):
+        """
+        Measure the median latency of a single uncached prediction.
+        
+        Args:
+            n_runs: Number of timed predictions.
+            
+        Returns:
+            Median latency in milliseconds.
+        """
+        self._ensure_loaded()
+        timings = []
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            self._predict_uncached(["Kano"], ["Northern"], ["Maize"], [1000.0])
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1000)
+    
     def predict(self, state, region, crop, loss_tonnes):
         """
         Predict loss percentage.
@@ -206,63 +703,397 @@ class LossPredictionModel:
         Returns:
             Predicted loss percentage.
         """
-        if self.model is None:
+        return self.predict_many([state], [region], [crop], [loss_tonnes])[0]
+    
+    def predict_many(self, states, regions=None, crops=None, loss_tonnes=None):
+        """
+        Predict loss percentages for many samples with a single estimator call.
+        
+        With a prediction cache, each sample is predicted at its tonnage rounded
+        to the cache's bucket; use a bucket of 0 for exact tonnages.
+        
+        Args:
+            states: DataFrame with State, Region, Crop and Loss_Tonnes columns,
+                    or a sequence of state names.
+            regions: Sequence of region names, if states is a sequence.
+            crops: Sequence of crop names, if states is a sequence.
+            loss_tonnes: Sequence of losses in tonnes, if states is a sequence.
+            
+        Returns:
+            NumPy array of predicted loss percentages.
+        """
+        self._ensure_loaded()
+        states, regions, crops, loss_tonnes = self._input_columns(
+            states, regions, crops, loss_tonnes
+        )
+        
+        if len(states) == 0:
+            return np.empty(0)
+        
+        if self.cache is not None:
+            return self._predict_cached(states, regions, crops, loss_tonnes)
+        return self._predict_uncached(states, regions, crops, loss_tonnes)
+    
+    def predict_quantiles(self, states, regions=None, crops=None, loss_tonnes=None,
+                          quantiles=(0.05, 0.5, 0.95)):
+        """
+        Predict quantiles of the per-tree predictions of a forest.
+        
+        All trees are evaluated for all samples in one vectorized pass, and the
+        quantiles are taken along the tree axis. The spread reflects the
+        disagreement between the trees, not the noise of individual outcomes.
+        With a prediction cache, tonnages are rounded to its buckets as in
+        predict_many.
+        
+        Args:
+            states: DataFrame with State, Region, Crop and Loss_Tonnes columns,
+                    or a sequence of state names.
+            regions: Sequence of region names, if states is a sequence.
+            crops: Sequence of crop names, if states is a sequence.
+            loss_tonnes: Sequence of losses in tonnes, if states is a sequence.
+            quantiles: Quantiles to compute, between 0 and 1.
+            
+        Returns:
+            NumPy array of shape (n_samples, len(quantiles)).
+            
+        Raises:
+            ValueError: If the model is not a forest of several trees.
+        """
+        self._ensure_loaded()
+        states, regions, crops, loss_tonnes = self._input_columns(
+            states, regions, crops, loss_tonnes
+        )
+        per_tree = self._predict_per_tree(states, regions, crops, self._bucketed(loss_tonnes))
+        return np.quantile(per_tree, quantiles, axis=1).T
+    
+    def predict_interval(self, states, regions=None, crops=None, loss_tonnes=None,
+                         coverage=0.9):
+        """
+        Predict loss percentages with a central interval of the per-tree predictions.
+        
+        With a prediction cache, tonnages are rounded to its buckets as in
+        predict_many, so the prediction matches predict_many's.
+        
+        Args:
+            states: DataFrame with State, Region, Crop and Loss_Tonnes columns,
+                    or a sequence of state names.
+            regions: Sequence of region names, if states is a sequence.
+            crops: Sequence of crop names, if states is a sequence.
+            loss_tonnes: Sequence of losses in tonnes, if states is a sequence.
+            coverage: Fraction of the trees' predictions inside the interval.
+            
+        Returns:
+            Tuple of NumPy arrays (prediction, lower, upper). The prediction is the
+            mean over the trees, as returned by predict_many.
+            
+        Raises:
+            ValueError: If the model is not a forest of several trees.
+        """
+        if not 0 < coverage < 1:
+            raise ValueError("coverage must be between 0 and 1")
+        
+        self._ensure_loaded()
+        states, regions, crops, loss_tonnes = self._input_columns(
+            states, regions, crops, loss_tonnes
+        )
+        per_tree = self._predict_per_tree(states, regions, crops, self._bucketed(loss_tonnes))
+        alpha = (1 - coverage) / 2
+        lower, upper = np.quantile(per_tree, [alpha, 1 - alpha], axis=1)
+        return per_tree.mean(axis=1), lower, upper
+    
+    def _predict_per_tree(self, states, regions, crops, loss_tonnes):
+        """Predict with every tree of the forest, returning (n_samples, n_trees)."""
+        if self._tree_ensemble is None:
+            estimator = self.compiled.estimator if self.compiled is not None \
+                else self.model.named_steps["model"]
+            ensemble = as_tree_ensemble(estimator)
+            if ensemble is None or ensemble.n_trees < 2:
+                raise ValueError(
+                    f"Model type {self.model_type} has no forest to compute intervals from"
+                )
+            self._tree_ensemble = ensemble
+        
+        if len(states) == 0:
+            return np.empty((0, self._tree_ensemble.n_trees))
+        
+        if self.compiled is not None:
+            X = self.compiled.encode(states, regions, crops, loss_tonnes)
+        else:
+            X = self.model.named_steps["preprocessor"].transform(pd.DataFrame({
+                "State": states,
+                "Region": regions,
+                "Crop": crops,
+                "Loss_Tonnes": loss_tonnes
+            }, columns=FEATURE_COLUMNS))
+            X = X.toarray() if hasattr(X, "toarray") else X
+        return self._tree_ensemble.predict_per_tree(X)
+    
+    @staticmethod
+    def _input_columns(states, regions, crops, loss_tonnes):
+        """Split a feature DataFrame into columns, or check the given sequences."""
+        if isinstance(states, pd.DataFrame):
+            frame = states
+            return (
+                frame["State"].to_numpy(),
+                frame["Region"].to_numpy(),
+                frame["Crop"].to_numpy(),
+                frame["Loss_Tonnes"].to_numpy()
+            )
+        if regions is None or crops is None or loss_tonnes is None:
+            raise ValueError(
+                "regions, crops and loss_tonnes are required with a sequence of states"
+            )
+        return states, regions, crops, loss_tonnes
+    
+    def _bucketed(self, loss_tonnes):
+        """Round tonnages to the cache's buckets, so every path predicts like predict_many."""
+        if self.cache is None or not self.cache.tonnes_bucket:
+            return loss_tonnes
+        return [self.cache.bucket(tonnes) for tonnes in loss_tonnes]
+    
+    def _predict_cached(self, states, regions, crops, loss_tonnes):
+        """Predict through the cache, scoring all misses with one estimator call."""
+        version = self.version
+        keys = [
+            self.cache.make_key(version, state, region, crop, tonnes)
+            for state, region, crop, tonnes in zip(states, regions, crops, loss_tonnes)
+        ]
+        predictions = self.cache.get_many(keys)
+        
+        missing = list(dict.fromkeys(key for key, value in zip(keys, predictions) if value is None))
+        if missing:
+            # Misses are scored at their bucket's tonnage, so a cached value does
+            # not depend on which tonnage of the bucket was requested first
+            _, miss_states, miss_regions, miss_crops, miss_tonnes = zip(*missing)
+            scored = self._predict_uncached(miss_states, miss_regions, miss_crops, miss_tonnes)
+            computed = dict(zip(missing, scored))
+            self.cache.put_many(computed)
+            predictions = [
+                computed[key] if value is None else value
+                for key, value in zip(keys, predictions)
+            ]
+        
+        return np.asarray(predictions, dtype=np.float64)
+    
+    def _predict_uncached(self, states, regions, crops, loss_tonnes):
+        """Predict with the compiled path or the full pipeline."""
+        # Use the compiled path, skipping the DataFrame and ColumnTransformer
+        if self.compiled is not None:
+            return self.compiled.predict(states, regions, crops, loss_tonnes)
+        
+        input_data = pd.DataFrame({
+            "State": states,
+            "Region": regions,
+            "Crop": crops,
+            "Loss_Tonnes": loss_tonnes
+        }, columns=FEATURE_COLUMNS)
+        
+        # Make predictions
+        return self.model.predict(input_data)
+    
+    def _set_model(self, pipeline, compiled=None):
+        """
+        Set the pipeline and compile its fast inference path if possible.
+        
+        Args:
+            pipeline: Fitted pipeline, or None when serving from a compact artifact.
+            compiled: Precompiled predictor. If None, compiles the pipeline.
+        """
+        if compiled is None:
+            try:
+                compiled = CompiledPredictor.from_pipeline(pipeline)
+            except (ValueError, KeyError, AttributeError):
+                compiled = None
+        previous_version = self.version
+        self.compiled = compiled
+        self.model = pipeline
+        self._tree_ensemble = None
+        
+        # A new version keeps predictions of the previous model out of the cache
+        self.version = uuid.uuid4().hex[:12]
+        if self.cache is not None and previous_version is not None:
+            self.cache.invalidate(previous_version)
+    
+    def _ensure_loaded(self):
+        """Load the model from disk if it is not in memory yet."""
+        if self.model is None and self.compiled is None:
             if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
+                self._set_model(joblib.load(self.model_path))
             else:
                 raise ValueError("Model not trained or loaded")
+    
+    def _save(self):
+        """
+        Save the model and, when the model type supports it, a compact artifact.
         
-        # Create input data
-        input_data = pd.DataFrame({
-            "State": [state],
-            "Region": [region],
-            "Crop": [crop],
-            "Loss_Tonnes": [loss_tonnes]
-        })
+        Both are written aside and moved into place, so a server loading or
+        memory-mapping the previous files never sees them half rewritten.
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
         
-        # Make prediction
-        prediction = self.model.predict(input_data)[0]
+        # The artifact goes first; loaders fall back to the joblib file meanwhile
+        try:
+            self.export_compact()
+        except ValueError:
+            if os.path.exists(self.artifact_path):
+                # Never leave an artifact of the previous model next to the new one
+                shutil.rmtree(self.artifact_path)
         
-        return prediction
+        staging = f"{self.model_path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            joblib.dump(self.model, staging)
+            publish_path(staging, self.model_path)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
     
-    def load(self):
-        """Load the model from disk."""
+    def export_compact(self, path=None, compress=False):
+        """
+        Export the model as a compact, memory-mappable artifact.
+        
+        Args:
+            path: Directory to write to. If None, uses artifact_path.
+            compress: Whether to write a compressed archive for cold storage.
+            
+        Returns:
+            The artifact path.
+        """
+        self._ensure_loaded()
+        if self.model is None:
+            raise ValueError("Model was loaded from a compact artifact and cannot be re-exported")
+        return export_artifact(self.model, path or self.artifact_path, compress=compress)
+    
+    def load(self, compact=False, mmap=True):
+        """
+        Load the model from disk.
+        
+        Args:
+            compact: Whether to load the compact artifact when it exists. It needs
+                     no scikit-learn unpickling and its arrays are shared between
+                     processes that map them.
+            mmap: Whether to memory-map the compact artifact read-only.
+            
+        Returns:
+            True if a model was loaded.
+        """
+        if compact and artifact_exists(self.artifact_path):
+            self._set_model(None, compiled=load_artifact(self.artifact_path, mmap=mmap))
+            return True
         if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
+            self._set_model(joblib.load(self.model_path))
             return True
         return False
 
 
-def train_and_save_models():
-    """Train and save both model types."""
+def _train_variant(model_type, model_dir, n_jobs, loss_percentage_df, loss_tonnes_df,
+                   track_with_mlflow, experiment_name, feature_cache_dir=None):
+    """Train and save a single model variant. Runs in a worker process."""
+    if track_with_mlflow:
+        setup_mlflow_tracking(experiment_name=experiment_name, async_logging=True)
+    
+    feature_store = FeatureStore(feature_cache_dir) if feature_cache_dir else None
+    model = LossPredictionModel(
+        model_type=model_type, model_dir=model_dir, n_jobs=n_jobs, feature_store=feature_store
+    )
+    metrics = model.train(loss_percentage_df, loss_tonnes_df, track_with_mlflow=track_with_mlflow)
+    
+    # Worker processes may exit without running exit handlers, so send this run's
+    # records before returning
+    flush_logging(timeout=30)
+    return metrics
+
+
+def train_and_save_models(
+    model_types=DEFAULT_MODEL_TYPES,
+    max_workers=None,
+    model_dir=None,
+    track_with_mlflow=True,
+    experiment_name="loss_prediction_models",
+    feature_cache_dir=None,
+    registry_dir=None
+):
+    """
+    Train and save model variants concurrently.
+    
+    Variants are trained in a process pool, and the worker budget is split
+    between the variants so that estimators like the random forest can also
+    fit trees in parallel.
+    
+    Args:
+        model_types: Model types to train, keys of MODEL_TYPES.
+        max_workers: Total number of cores to use. If None, uses all cores.
+        model_dir: Directory to save the models to. If None, uses the package's
+                   models directory.
+        track_with_mlflow: Whether to track the training with MLflow.
+        experiment_name: Name of the MLflow experiment.
+        feature_cache_dir: Directory of the feature store. If None, uses a
+                           'feature_cache' directory inside the model directory.
+        registry_dir: Optional ModelRegistry directory. Each trained variant is
+                      registered there, and promoted if it is at least as accurate
+                      as the promoted version.
+        
+    Returns:
+        Dictionary of training metrics by model type.
+    """
+    unknown = [model_type for model_type in model_types if model_type not in MODEL_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown model types: {', '.join(unknown)}")
+    
     # Load data
     loss_percentage_df, loss_tonnes_df = load_datasets()
     
     # Set up MLflow tracking
-    setup_mlflow_tracking(experiment_name="loss_prediction_models")
+    if track_with_mlflow:
+        setup_mlflow_tracking(experiment_name=experiment_name)
     
-    # Train random forest model
-    rf_model = LossPredictionModel(model_type="random_forest")
-    rf_metrics = rf_model.train(loss_percentage_df, loss_tonnes_df)
+    # Prepare the features of each encoding once, before the variants share them
+    feature_cache_dir = feature_cache_dir or os.path.join(
+        model_dir or os.path.dirname(os.path.abspath(__file__)), FEATURE_CACHE_DIR
+    )
+    feature_store = FeatureStore(feature_cache_dir)
+    for model_type in model_types:
+        LossPredictionModel(model_type=model_type, feature_store=feature_store)._prepare_features(
+            loss_percentage_df, loss_tonnes_df
+        )
+    
+    # Split the core budget between concurrently trained variants
+    budget = max_workers or os.cpu_count() or 1
+    n_processes = max(1, min(len(model_types), budget))
+    n_jobs = max(1, budget // n_processes)
     
-    # Train linear model
-    linear_model = LossPredictionModel(model_type="linear")
-    linear_metrics = linear_model.train(loss_percentage_df, loss_tonnes_df)
+    args = (
+        loss_percentage_df, loss_tonnes_df, track_with_mlflow, experiment_name, feature_cache_dir
+    )
+    if n_processes == 1:
+        metrics = {
+            model_type: _train_variant(model_type, model_dir, n_jobs, *args)
+            for model_type in model_types
+        }
+    else:
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            futures = {
+                model_type: executor.submit(_train_variant, model_type, model_dir, n_jobs, *args)
+                for model_type in model_types
+            }
+            metrics = {model_type: future.result() for model_type, future in futures.items()}
     
-    return {
-        "random_forest": rf_metrics,
-        "linear": linear_metrics
-    }
+    if registry_dir:
+        # Imported here because the registry module imports this one
+        from agripreserve.models.registry import ModelRegistry
+        
+        registry = ModelRegistry(registry_dir)
+        for model_type, model_metrics in metrics.items():
+            model = LossPredictionModel(model_type=model_type, model_dir=model_dir)
+            registry.promote_if_better(model_type, registry.register(model, model_metrics))
+    
+    return metrics
 
 
 if __name__ == "__main__":
     metrics = train_and_save_models()
     
     print("Model Training Results:")
-    print("\nRandom Forest Model:")
-    for metric, value in metrics["random_forest"].items():
-        print(f"  - {metric}: {value:.4f}")
-    
-    print("\nLinear Model:")
-    for metric, value in metrics["linear"].items():
-        print(f"  - {metric}: {value:.4f}")
+    for model_type, model_metrics in metrics.items():
+        print(f"\n{model_type} model:")
+        for metric, value in model_metrics.items():
+            print(f"  - {metric}: {value:.4f}")
@@ -0,0 +1,274 @@
+"""Local model registry for AgriPreserve.
+
+Every registered model gets a version directory holding its model files and a
+meta.json with its accuracy metrics and serving cost: median single-prediction
+latency, batch throughput and the on-disk size of the files it is served from. A
+registry.json per model type records the promoted version and the promotion
+history used for rollback.
+
+Layout:
+    <root>/<model_type>/registry.json
+    <root>/<model_type>/<version>/meta.json
+    <root>/<model_type>/<version>/loss_prediction_<model_type>.joblib
+    <root>/<model_type>/<version>/loss_prediction_<model_type>.compact/
+    <root>/<model_type>/<version>/loss_prediction_<model_type>_distilled.joblib (optional)
+    <root>/<model_type>/<version>/loss_prediction_<model_type>_distilled.compact/ (optional)
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from agripreserve.models.artifact import artifact_exists
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+META_FILE = "meta.json"
+STATE_FILE = "registry.json"
+
+# Rows scored to measure batch throughput
+THROUGHPUT_ROWS = 1000
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    """Write a JSON file atomically."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _size_bytes(path: str) -> int:
+    """Return the size of a file, or the total size of the files in a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def measure_serving_cost(model: LossPredictionModel, n_runs: int = 50) -> Dict[str, float]:
+    """
+    Measure the serving cost of a model as it is served.
+
+    Args:
+        model: Model to measure. Its compact artifact is used if it has one.
+        n_runs: Number of timed single predictions.
+
+    Returns:
+        Dictionary with 'latency_ms', 'throughput_rows_per_s' and 'disk_bytes',
+        the size of the files the model is served from. Memory-mapped artifacts
+        are shared between processes, so this is not a per-process footprint.
+    """
+    served = LossPredictionModel(model_type=model.model_type, model_dir=model.model_dir)
+    if not served.load(compact=True):
+        raise ValueError(f"Model file {served.model_path} does not exist")
+
+    latency_ms = served.measure_latency_ms(n_runs=n_runs)
+
+    tonnes = np.geomspace(1.0, 100000.0, THROUGHPUT_ROWS)
+    start = time.perf_counter()
+    served.predict_many(
+        ["Kano"] * THROUGHPUT_ROWS, ["Northern"] * THROUGHPUT_ROWS,
+        ["Maize"] * THROUGHPUT_ROWS, tonnes
+    )
+    throughput = THROUGHPUT_ROWS / max(time.perf_counter() - start, 1e-9)
+
+    path = served.artifact_path if artifact_exists(served.artifact_path) else served.model_path
+    return {
+        "latency_ms": latency_ms,
+        "throughput_rows_per_s": throughput,
+        "disk_bytes": _size_bytes(path)
+    }
+
+
+def most_accurate_within_slo(
+    candidates: Dict[str, Tuple[float, float]],
+    latency_slo_ms: Optional[float] = None
+) -> Optional[str]:
+    """
+    Pick the most accurate candidate meeting a latency SLO.
+
+    Args:
+        candidates: (error metric, latency in ms) by name. Lower error is better.
+        latency_slo_ms: Maximum latency. If None, only accuracy counts.
+
+    Returns:
+        The name of the candidate, the fastest one if none meets the SLO, or None
+        if there are no candidates.
+    """
+    if not candidates:
+        return None
+    within = {
+        name: cost for name, cost in candidates.items()
+        if latency_slo_ms is None or cost[1] <= latency_slo_ms
+    }
+    if not within:
+        return min(candidates, key=lambda name: candidates[name][1])
+    return min(within, key=lambda name: (within[name], name))
+
+
+class ModelRegistry:
+    """Versioned store of trained models with promotion and rollback."""
+
+    def __init__(self, root_dir: str):
+        """
+        Initialize the registry.
+
+        Args:
+            root_dir: Directory of the registry. Created on first registration.
+        """
+        self.root_dir = root_dir
+
+    def _type_dir(self, model_type: str) -> str:
+        return os.path.join(self.root_dir, model_type)
+
+    def version_dir(self, model_type: str, version: str) -> str:
+        """Return the directory of a version, usable as a LossPredictionModel model_dir."""
+        return os.path.join(self._type_dir(model_type), version)
+
+    def _state(self, model_type: str) -> Dict[str, Any]:
+        path = os.path.join(self._type_dir(model_type), STATE_FILE)
+        if not os.path.exists(path):
+            return {"current": None, "history": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_state(self, model_type: str, state: Dict[str, Any]):
+        _write_json(os.path.join(self._type_dir(model_type), STATE_FILE), state)
+
+    def register(self, model: LossPredictionModel, metrics: Dict[str, float]) -> str:
+        """
+        Register a trained model as a new version.
+
+        The model's files, and those of its distilled variant when there is one,
+        are copied into the version directory and its serving cost is measured there.
+
+        Args:
+            model: Trained model whose files exist in its model directory.
+            metrics: Accuracy metrics from train, e.g. rmse, mae and r2.
+
+        Returns:
+            The new version.
+        """
+        version = time.strftime("v%Y%m%d%H%M%S") + f"-{uuid.uuid4().hex[:6]}"
+        version_dir = self.version_dir(model.model_type, version)
+        os.makedirs(version_dir)
+
+        registered = LossPredictionModel(model_type=model.model_type, model_dir=version_dir)
+        distilled = LossPredictionModel(
+            model_type=f"{model.model_type}_distilled", model_dir=model.model_dir
+        )
+        for source in [model, distilled]:
+            if source is distilled and not os.path.exists(source.model_path):
+                continue
+            target = LossPredictionModel(model_type=source.model_type, model_dir=version_dir)
+            shutil.copy2(source.model_path, target.model_path)
+            if artifact_exists(source.artifact_path):
+                shutil.copytree(source.artifact_path, target.artifact_path)
+
+        meta = {
+            "model_type": model.model_type,
+            "version": version,
+            "created_at": time.time(),
+            "metrics": {name: float(value) for name, value in metrics.items()},
+            "serving": measure_serving_cost(registered)
+        }
+        _write_json(os.path.join(version_dir, META_FILE), meta)
+        return version
+
+    def versions(self, model_type: str) -> List[Dict[str, Any]]:
+        """Return the metadata of all versions of a model type, oldest first."""
+        type_dir = self._type_dir(model_type)
+        if not os.path.isdir(type_dir):
+            return []
+        metas = [
+            self.meta(model_type, name) for name in os.listdir(type_dir)
+            if os.path.exists(os.path.join(type_dir, name, META_FILE))
+        ]
+        return sorted(metas, key=lambda meta: (meta["created_at"], meta["version"]))
+
+    def model_types(self) -> List[str]:
+        """Return the model types with at least one version."""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.isdir(os.path.join(self.root_dir, name))
+        )
+
+    def meta(self, model_type: str, version: str) -> Dict[str, Any]:
+        """
+        Return the metadata of a version.
+
+        Raises:
+            KeyError: If the version does not exist.
+        """
+        path = os.path.join(self.version_dir(model_type, version), META_FILE)
+        if not os.path.exists(path):
+            raise KeyError(f"{model_type} {version}")
+        with open(path) as f:
+            return json.load(f)
+
+    def current(self, model_type: str) -> Optional[str]:
+        """Return the promoted version of a model type, or None."""
+        return self._state(model_type)["current"]
+
+    def promote(self, model_type: str, version: str):
+        """
+        Make a version the one served for its model type.
+
+        Raises:
+            KeyError: If the version does not exist.
+        """
+        self.meta(model_type, version)
+        state = self._state(model_type)
+        if state["current"] != version:
+            state["history"].append(version)
+            state["current"] = version
+            self._save_state(model_type, state)
+
+    def promote_if_better(self, model_type: str, version: str, metric: str = "rmse") -> bool:
+        """
+        Promote a version if no version is promoted or it is at least as accurate.
+
+        Args:
+            model_type: Model type of the version.
+            version: Version to consider.
+            metric: Metric compared, lower is better.
+
+        Returns:
+            True if the version was promoted.
+        """
+        current = self.current(model_type)
+        if current is not None:
+            current_value = self.meta(model_type, current)["metrics"].get(metric, np.inf)
+            if self.meta(model_type, version)["metrics"].get(metric, np.inf) > current_value:
+                return False
+        self.promote(model_type, version)
+        return True
+
+    def rollback(self, model_type: str) -> str:
+        """
+        Promote the previously promoted version again.
+
+        Returns:
+            The version now promoted.
+
+        Raises:
+            ValueError: If there is no earlier promotion to roll back to.
+        """
+        state = self._state(model_type)
+        if len(state["history"]) < 2:
+            raise ValueError(f"No earlier version of {model_type} to roll back to")
+        state["history"].pop()
+        state["current"] = state["history"][-1]
+        self._save_state(model_type, state)
+        return state["current"]
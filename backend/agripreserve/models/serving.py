@@ -0,0 +1,248 @@
+"""Resident model serving for AgriPreserve."""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from agripreserve.models.cache import PredictionCache
+from agripreserve.models.inference_pool import InferencePool
+from agripreserve.models.loss_prediction_model import DEFAULT_MODEL_TYPES, LossPredictionModel
+from agripreserve.models.registry import ModelRegistry, most_accurate_within_slo
+
+# Variants served for each model type. The distilled variant is optional.
+VARIANTS = ("full", "distilled")
+
+# Sample used to warm up freshly loaded models
+WARMUP_SAMPLE = {"state": "Kano", "region": "Northern", "crop": "Maize", "loss_tonnes": 1000.0}
+
+
+class ModelService:
+    """Keeps trained loss prediction models resident in memory for serving."""
+
+    def __init__(
+        self,
+        model_types: Sequence[str] = DEFAULT_MODEL_TYPES,
+        model_dir: Optional[str] = None,
+        cache: Optional[PredictionCache] = None,
+        compact: bool = True,
+        latency_slo_ms: Optional[float] = None,
+        inference_pool: Optional[InferencePool] = None,
+        registry: Optional[ModelRegistry] = None
+    ):
+        """
+        Initialize the model service.
+
+        Args:
+            model_types: Model types to load.
+            model_dir: Directory containing the model files. If None, uses the
+                       package's models directory.
+            cache: Optional PredictionCache shared by the served models.
+            compact: Whether to serve from memory-mapped compact artifacts when they exist.
+            latency_slo_ms: Default latency budget used to pick between the full and
+                            distilled variants, and between model types for
+                            requests with model type 'auto'.
+            inference_pool: Optional InferencePool evaluating the estimators in
+                            worker processes instead of this process.
+            registry: Optional ModelRegistry to serve the promoted versions from,
+                      instead of the files in model_dir.
+        """
+        self.model_types = list(model_types)
+        self.model_dir = model_dir
+        self.cache = cache
+        self.compact = compact
+        self.latency_slo_ms = latency_slo_ms
+        self.inference_pool = inference_pool
+        self.registry = registry
+        self.models = {}
+        self.versions = {}
+        self.metrics = {}
+        self.latency_ms = {}
+        self.errors = {}
+        self.load_seconds = None
+        self._loaded = threading.Event()
+        self._thread = None
+
+    def load(self) -> None:
+        """Load and warm up all models. Blocks until done."""
+        start = time.perf_counter()
+        models = {}
+        versions = {}
+        metrics = {}
+        latency_ms = {}
+        errors = {}
+
+        for model_type in self.model_types:
+            model_dir = self.model_dir
+            if self.registry is not None:
+                version = self.registry.current(model_type)
+                if version is None:
+                    errors[model_type] = f"No promoted version of {model_type} in the registry."
+                    continue
+                model_dir = self.registry.version_dir(model_type, version)
+                versions[model_type] = version
+                metrics[model_type] = self.registry.meta(model_type, version)["metrics"]
+
+            for key in [model_type, f"{model_type}_distilled"]:
+                model = LossPredictionModel(model_type=key, model_dir=model_dir, cache=self.cache)
+                try:
+                    if model.load(compact=self.compact):
+                        models[key] = model
+                    elif key == model_type:
+                        # Distilled variants are optional
+                        errors[key] = f"Model file {model.model_path} does not exist."
+                except Exception as e:
+                    errors[key] = str(e)
+
+        # Route estimator evaluation of the models the workers can serve to the pool
+        if self.inference_pool is not None and models:
+            try:
+                generation, pooled = self.inference_pool.load(
+                    {key: model.model_dir for key, model in models.items()}
+                )
+                for key in pooled:
+                    model = models[key]
+                    model.compiled = self.inference_pool.predictor(
+                        generation, key, model.compiled
+                    )
+            except Exception as e:
+                errors["inference_pool"] = str(e)
+
+        for key, model in list(models.items()):
+            try:
+                model.predict(**WARMUP_SAMPLE)
+                latency_ms[key] = model.measure_latency_ms(n_runs=20)
+            except Exception as e:
+                del models[key]
+                errors[key] = str(e)
+
+        # Swap in the complete set at once so readers never see a partial load
+        previous = self.models
+        self.models = models
+        self.versions = versions
+        self.metrics = metrics
+        self.latency_ms = latency_ms
+        if self.cache is not None:
+            for model in previous.values():
+                self.cache.invalidate(model.version)
+        self.errors = errors
+        self.load_seconds = time.perf_counter() - start
+        self._loaded.set()
+
+    def start_background_load(self) -> threading.Thread:
+        """Load models in a background thread so the server can start immediately."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.load, name="model-service-loader", daemon=True
+            )
+            self._thread.start()
+        return self._thread
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for loading to finish.
+
+        Args:
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            True if at least one model is ready.
+        """
+        self._loaded.wait(timeout)
+        return self.is_ready()
+
+    def is_ready(self) -> bool:
+        """Return True once loading has finished and at least one model is warm."""
+        return self._loaded.is_set() and bool(self.models)
+
+    def get(self, model_type: str) -> LossPredictionModel:
+        """
+        Get a resident model.
+
+        Args:
+            model_type: Type of the model.
+
+        Returns:
+            The loaded model.
+
+        Raises:
+            KeyError: If the model is not loaded.
+        """
+        return self.models[model_type]
+
+    def select(
+        self,
+        model_type: str,
+        variant: str = "auto",
+        latency_budget_ms: Optional[float] = None
+    ) -> str:
+        """
+        Pick the resident model serving a request.
+
+        Args:
+            model_type: Requested model type, or 'auto' for the most accurate model
+                        whose measured latency meets the budget. Accuracy is the
+                        RMSE recorded in the registry; models without one rank last.
+            variant: 'full', 'distilled', or 'auto' to use the distilled variant only
+                     when the full model's measured latency exceeds the budget.
+            latency_budget_ms: Latency budget of the request. If None, uses latency_slo_ms.
+
+        Returns:
+            Key of the model to use with get.
+
+        Raises:
+            KeyError: If the requested model or variant is not loaded.
+            ValueError: If the variant is unknown.
+        """
+        if variant not in ("full", "distilled", "auto"):
+            raise ValueError(f"Unknown variant: {variant}")
+        if model_type == "auto":
+            return self._select_most_accurate(variant, latency_budget_ms)
+
+        distilled = f"{model_type}_distilled"
+        if variant == "full":
+            key = model_type
+        elif variant == "distilled":
+            key = distilled
+        else:
+            key = model_type
+            budget = latency_budget_ms if latency_budget_ms is not None else self.latency_slo_ms
+            if budget is not None and distilled in self.models and \
+                    self.latency_ms.get(model_type, 0.0) > budget:
+                key = distilled
+
+        if key not in self.models:
+            raise KeyError(key)
+        return key
+
+    def _select_most_accurate(self, variant: str, latency_budget_ms: Optional[float]) -> str:
+        """Pick the most accurate resident model of a variant meeting the latency budget."""
+        budget = latency_budget_ms if latency_budget_ms is not None else self.latency_slo_ms
+        candidates = {}
+        for key in self.models:
+            is_distilled = key.endswith("_distilled")
+            if (variant == "full" and is_distilled) or (variant == "distilled" and not is_distilled):
+                continue
+            rmse = self.metrics.get(key, {}).get("rmse", float("inf"))
+            candidates[key] = (rmse, self.latency_ms.get(key, 0.0))
+
+        key = most_accurate_within_slo(candidates, budget)
+        if key is None:
+            raise KeyError(f"auto ({variant})")
+        return key
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Return the prediction cache statistics, or None if caching is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def status(self) -> Dict[str, Any]:
+        """Return the readiness status of the service."""
+        return {
+            "ready": self.is_ready(),
+            "loading": not self._loaded.is_set(),
+            "models": sorted(self.models),
+            "versions": dict(self.versions),
+            "metrics": {key: dict(values) for key, values in self.metrics.items()},
+            "latency_ms": dict(self.latency_ms),
+            "errors": dict(self.errors),
+            "load_seconds": self.load_seconds
+        }
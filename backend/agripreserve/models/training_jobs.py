@@ -0,0 +1,368 @@
+"""Background training jobs for AgriPreserve."""
+
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from agripreserve.data.loader import load_datasets
+from agripreserve.models.artifact import publish_path
+from agripreserve.models.loss_prediction_model import (
+    DEFAULT_MODEL_TYPES,
+    MODEL_TYPES,
+    LossPredictionModel,
+    _train_variant
+)
+from agripreserve.models.registry import ModelRegistry
+
+# Directory inside the model directory where jobs train before publishing
+STAGING_DIR = "staging"
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+# Finished jobs kept for status queries; older ones are evicted
+MAX_FINISHED_JOBS = 100
+
+# Queue a training process reports started tasks on, set by its initializer
+_started_events = None
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+def _lower_priority(niceness: int):
+    """Lower the scheduling priority of a training worker process."""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def _init_worker(niceness: int, started_events):
+    """Initialize a training worker process."""
+    global _started_events
+    _lower_priority(niceness)
+    _started_events = started_events
+
+
+def _run_variant(job_id: str, *args):
+    """Report the task as started, then train a model variant. Runs in a worker process."""
+    if _started_events is not None:
+        _started_events.put((job_id, time.time()))
+    return _train_variant(*args)
+
+
+class TrainingJobQueue:
+    """
+    Runs training jobs in a bounded pool of background processes.
+
+    Each model type of a job is trained in its own task into a staging
+    directory, so the files being served are never written to while training.
+    When all model types of a job succeed, their files are moved into the model
+    directory, or registered in the registry and promoted if they are at least
+    as accurate as the promoted versions. Then on_complete is called, e.g. to
+    reload the serving models. Publishing runs in a thread of its own, so it
+    never delays the completion handling of other jobs.
+    """
+
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        max_workers: int = 1,
+        max_queued: int = 4,
+        niceness: int = 10,
+        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+        registry: Optional[ModelRegistry] = None,
+        max_finished: int = MAX_FINISHED_JOBS
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            model_dir: Directory the trained models are published to. If None,
+                       uses the package's models directory.
+            max_workers: Number of training processes.
+            max_queued: Maximum number of jobs waiting for a process, on top of
+                        the running ones.
+            niceness: Increment of the scheduling niceness of the training
+                      processes, so they yield the CPU to request handling.
+            on_complete: Function called with the job status after a job's models
+                         have been published.
+            registry: Optional ModelRegistry to publish the trained models to.
+            max_finished: Number of finished jobs kept for status queries. The
+                          oldest are evicted first.
+        """
+        self.model_dir = model_dir or os.path.dirname(os.path.abspath(__file__))
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.niceness = niceness
+        self.on_complete = on_complete
+        self.registry = registry
+        self.max_finished = max_finished
+        self.jobs = {}
+        self._executor = None
+        self._started_events = None
+        # Reentrant, as a done callback may run in the submitting thread
+        self._lock = threading.RLock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Spawned processes do not inherit the server's threads and event loop
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._started_events = context.Queue()
+            threading.Thread(
+                target=self._watch_started, args=(self._started_events,),
+                name="training-started", daemon=True
+            ).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.niceness, self._started_events)
+            )
+        return self._executor
+
+    def _watch_started(self, started_events):
+        """Mark jobs as running when a worker process starts one of their tasks."""
+        while True:
+            event = started_events.get()
+            if event is None:
+                break
+            job_id, started_at = event
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is not None and job["status"] == "queued":
+                    job["status"] = "running"
+                    job["started_at"] = started_at
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond max_finished. Called with the lock held."""
+        finished = [
+            job_id for job_id, job in self.jobs.items()
+            if job["status"] in ("succeeded", "failed")
+        ]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def _active_jobs(self) -> int:
+        return sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(
+        self,
+        model_types: Sequence[str] = DEFAULT_MODEL_TYPES,
+        track_with_mlflow: bool = False,
+        experiment_name: str = "loss_prediction_models"
+    ) -> str:
+        """
+        Submit a training job.
+
+        Args:
+            model_types: Model types to train, keys of MODEL_TYPES.
+            track_with_mlflow: Whether to track the training with MLflow.
+            experiment_name: Name of the MLflow experiment.
+
+        Returns:
+            The job ID.
+
+        Raises:
+            ValueError: If a model type is unknown.
+            QueueFullError: If the queue is at capacity.
+        """
+        model_types = list(dict.fromkeys(model_types))
+        unknown = [model_type for model_type in model_types if model_type not in MODEL_TYPES]
+        if unknown or not model_types:
+            raise ValueError(f"Unknown model types: {', '.join(unknown) or '(none)'}")
+
+        loss_percentage_df, loss_tonnes_df = load_datasets()
+
+        with self._lock:
+            if self._active_jobs() >= self.max_workers + self.max_queued:
+                raise QueueFullError("Training queue is full")
+
+            job_id = uuid.uuid4().hex[:12]
+            staging_dir = os.path.join(self.model_dir, STAGING_DIR, job_id)
+            job = {
+                "job_id": job_id,
+                "status": "queued",
+                "model_types": model_types,
+                "completed": [],
+                "metrics": {},
+                "versions": {},
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "staging_dir": staging_dir,
+                "futures": {}
+            }
+            self.jobs[job_id] = job
+
+            executor = self._get_executor()
+            for model_type in model_types:
+                # One core per task; the pool size is the training CPU budget
+                future = executor.submit(
+                    _run_variant, job_id, model_type, staging_dir, 1,
+                    loss_percentage_df, loss_tonnes_df, track_with_mlflow, experiment_name
+                )
+                job["futures"][model_type] = future
+                future.add_done_callback(
+                    lambda future, job=job, model_type=model_type:
+                        self._on_variant_done(job, model_type, future)
+                )
+
+        return job_id
+
+    def _on_variant_done(self, job: Dict[str, Any], model_type: str, future):
+        """Record a finished variant and publish the job once all variants are done."""
+        with self._lock:
+            if future.cancelled():
+                job["error"] = job["error"] or "Cancelled"
+            elif future.exception() is not None:
+                job["error"] = job["error"] or f"{model_type}: {future.exception()}"
+            else:
+                job["metrics"][model_type] = {
+                    name: float(value) for name, value in future.result().items()
+                }
+            job["completed"].append(model_type)
+            if job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            if len(job["completed"]) < len(job["model_types"]):
+                return
+
+        threading.Thread(
+            target=self._finish, args=(job,), name=f"training-publish-{job['job_id']}",
+            daemon=True
+        ).start()
+
+    def _finish(self, job: Dict[str, Any]):
+        """Publish a job whose variants are all done, and record its final status."""
+        if job["error"] is None:
+            try:
+                self._publish(job)
+                # The job only reports success once the new models are being served
+                if self.on_complete is not None:
+                    self.on_complete(dict(self.status(job["job_id"]), status="succeeded"))
+            except Exception as e:
+                job["error"] = f"Publishing failed: {e}"
+        shutil.rmtree(job["staging_dir"], ignore_errors=True)
+
+        with self._lock:
+            job["status"] = "failed" if job["error"] else "succeeded"
+            job["finished_at"] = time.time()
+            self._evict_finished()
+
+    def _publish(self, job: Dict[str, Any]):
+        """Move the models trained by a job into the model directory or the registry."""
+        for model_type in job["model_types"]:
+            staged = LossPredictionModel(model_type=model_type, model_dir=job["staging_dir"])
+            if self.registry is not None:
+                version = self.registry.register(staged, job["metrics"][model_type])
+                self.registry.promote_if_better(model_type, version)
+                job["versions"][model_type] = version
+                continue
+
+            target = LossPredictionModel(model_type=model_type, model_dir=self.model_dir)
+            distilled = f"{model_type}_distilled"
+            staged_distilled = LossPredictionModel(
+                model_type=distilled, model_dir=job["staging_dir"]
+            )
+            target_distilled = LossPredictionModel(model_type=distilled, model_dir=self.model_dir)
+            if not os.path.exists(staged_distilled.model_path):
+                # The distilled variant of the previous model must not be
+                # served next to the new model
+                self._remove_model(target_distilled)
+            self._publish_model(staged, target)
+            if os.path.exists(staged_distilled.model_path):
+                self._publish_model(staged_distilled, target_distilled)
+
+    @staticmethod
+    def _publish_model(staged: LossPredictionModel, target: LossPredictionModel):
+        """Move a staged model's files over those of the target."""
+        # The artifact goes first; loaders fall back to the joblib file meanwhile
+        if os.path.exists(staged.artifact_path):
+            publish_path(staged.artifact_path, target.artifact_path)
+        elif os.path.exists(target.artifact_path):
+            # Never leave an artifact of the previous model next to the new one
+            shutil.rmtree(target.artifact_path)
+        publish_path(staged.model_path, target.model_path)
+
+    @staticmethod
+    def _remove_model(target: LossPredictionModel):
+        """Remove a model's files, if there are any."""
+        if os.path.exists(target.model_path):
+            os.remove(target.model_path)
+        if os.path.exists(target.artifact_path):
+            shutil.rmtree(target.artifact_path)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get the status of a job.
+
+        Args:
+            job_id: ID returned by submit.
+
+        Returns:
+            Dictionary with the status, progress as the fraction of model types
+            trained, metrics by model type and the error of a failed job.
+
+        Raises:
+            KeyError: If the job is unknown or was evicted.
+        """
+        with self._lock:
+            job = self.jobs[job_id]
+            return {
+                "job_id": job_id,
+                "status": job["status"],
+                "model_types": list(job["model_types"]),
+                "progress": len(job["completed"]) / len(job["model_types"]),
+                "metrics": {name: dict(values) for name, values in job["metrics"].items()},
+                "versions": dict(job["versions"]),
+                "error": job["error"],
+                "submitted_at": job["submitted_at"],
+                "started_at": job["started_at"],
+                "finished_at": job["finished_at"]
+            }
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Return the status of all jobs not yet evicted, oldest first."""
+        with self._lock:
+            return [self.status(job_id) for job_id in list(self.jobs)]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for a job to finish.
+
+        Args:
+            job_id: ID returned by submit.
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            The status of the job.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.status(job_id)["status"] in ("queued", "running"):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        return self.status(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of jobs in each status and the pool capacity."""
+        with self._lock:
+            counts = {status: 0 for status in JOB_STATUSES}
+            for job in self.jobs.values():
+                counts[job["status"]] += 1
+        return dict(counts, max_workers=self.max_workers, max_queued=self.max_queued)
+
+    def shutdown(self, wait: bool = False):
+        """Stop the training processes, cancelling jobs that have not started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            # Stops the thread watching for started tasks
+            self._started_events.put(None)
+            self._started_events = None
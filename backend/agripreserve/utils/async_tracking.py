@@ -0,0 +1,384 @@
+"""Asynchronous, batched MLflow logging with an offline spool."""
+
+import atexit
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+# Limits of a single MLflow log_batch call
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+
+DEFAULT_SPOOL_PATH = os.path.join(".mlflow_spool", "spool.jsonl")
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _unsent_records(run_id: str, metrics, params, artifacts, directories) -> List[Dict[str, Any]]:
+    """Rebuild the records of a run from what is left to send."""
+    records = []
+    by_step = {}
+    for metric in metrics:
+        by_step.setdefault((metric.timestamp, metric.step), {})[metric.key] = metric.value
+    for (timestamp, step), data in by_step.items():
+        records.append({
+            "kind": "metrics", "run_id": run_id, "data": data,
+            "step": step, "timestamp": timestamp
+        })
+    if params:
+        records.append({
+            "kind": "params", "run_id": run_id,
+            "data": {param.key: param.value for param in params}
+        })
+    if artifacts:
+        records.append({"kind": "artifacts", "run_id": run_id, "data": list(artifacts)})
+    records.extend(
+        {"kind": "directory", "run_id": run_id, "data": directory} for directory in directories
+    )
+    return records
+
+
+class AsyncMlflowLogger:
+    """
+    Logs metrics, params and artifacts to MLflow from a background thread.
+
+    Callers only enqueue records. The thread drains the queue and writes every
+    run's metrics and params with a single log_batch call. Models are saved to a
+    local directory by the thread and uploaded as artifacts of their run. When a write fails, the
+    records are appended to a local JSONL spool and the remote is considered
+    unhealthy: further records go straight to the spool until the next replay
+    attempt succeeds.
+    """
+
+    def __init__(
+        self,
+        spool_path: str = DEFAULT_SPOOL_PATH,
+        flush_interval: float = 1.0,
+        replay_interval: float = 60.0,
+        max_batch: int = 1000,
+        client=None,
+        breaker=None
+    ):
+        """
+        Initialize the logger and start its thread.
+
+        Args:
+            spool_path: Append-only file holding records that could not be sent.
+            flush_interval: Maximum time in seconds records wait to be coalesced.
+            replay_interval: Time in seconds between attempts to replay the spool.
+            max_batch: Maximum number of records sent per drain of the queue.
+            client: MLflow client to use. If None, an MlflowClient is created for
+                    the tracking URI in effect when the first batch is sent.
+            breaker: Optional CircuitBreaker of the tracking server. Records are
+                     spooled without a send attempt while its circuit is open,
+                     and the outcome of every send is reported to it.
+        """
+        self.spool_path = spool_path
+        self.flush_interval = flush_interval
+        self.replay_interval = replay_interval
+        self.max_batch = max_batch
+        self.healthy = True
+        self.sent = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.batches = 0
+        self._client = client
+        self.breaker = breaker
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._spool_lock = threading.Lock()
+        # Spooled records are first replayed one interval after start
+        self._last_replay = time.monotonic()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mlflow-logger", daemon=True)
+        self._thread.start()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from mlflow.tracking import MlflowClient
+            self._client = MlflowClient()
+        return self._client
+
+    def _enqueue(self, record: Dict[str, Any]):
+        with self._idle:
+            self._pending += 1
+        self._queue.put(record)
+
+    def log_metrics(
+        self,
+        run_id: str,
+        metrics: Dict[str, Union[float, int]],
+        step: Optional[int] = None
+    ) -> None:
+        """Queue metrics of a run."""
+        self._enqueue({
+            "kind": "metrics",
+            "run_id": run_id,
+            "data": {name: float(value) for name, value in metrics.items()},
+            "step": step or 0,
+            "timestamp": int(time.time() * 1000)
+        })
+
+    def log_params(self, run_id: str, params: Dict[str, Any]) -> None:
+        """Queue params of a run."""
+        self._enqueue({
+            "kind": "params",
+            "run_id": run_id,
+            "data": {name: str(value) for name, value in params.items()}
+        })
+
+    def log_artifacts(self, run_id: str, paths: Sequence[str]) -> None:
+        """Queue artifact files of a run. Files must not change until they are sent."""
+        self._enqueue({"kind": "artifacts", "run_id": run_id, "data": list(paths)})
+
+    def log_model(
+        self,
+        run_id: str,
+        save: Callable[[str], None],
+        artifact_path: str = "model"
+    ) -> None:
+        """
+        Queue a model of a run.
+
+        Args:
+            run_id: ID of the run.
+            save: Function writing the model to the directory it is given. It is
+                  called from the logging thread, so the model must not change
+                  until it is saved.
+            artifact_path: Artifact path of the model in the run.
+        """
+        self._enqueue({
+            "kind": "model", "run_id": run_id, "save": save, "artifact_path": artifact_path
+        })
+
+    def _stage_models(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Save queued models next to the spool, so their records can be spooled."""
+        staged = []
+        for record in records:
+            if record["kind"] != "model":
+                staged.append(record)
+                continue
+            path = os.path.join(
+                os.path.dirname(os.path.abspath(self.spool_path)), "models", uuid.uuid4().hex
+            )
+            try:
+                record["save"](path)
+            except Exception as e:
+                print(f"Error saving model for MLflow: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            staged.append({
+                "kind": "directory",
+                "run_id": record["run_id"],
+                "data": {"path": path, "artifact_path": record["artifact_path"]}
+            })
+        return staged
+
+    def _run(self):
+        while not self._closed.is_set():
+            try:
+                records = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                records = []
+
+            # Coalesce everything already queued, up to a batch
+            while records and len(records) < self.max_batch:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                if records:
+                    self._process(records)
+                if time.monotonic() - self._last_replay >= self.replay_interval:
+                    self.replay()
+            except Exception as e:
+                # Never let the logging thread die, e.g. on a full disk
+                print(f"Error in MLflow logging thread: {e}")
+
+    def _process(self, records: List[Dict[str, Any]]):
+        try:
+            records = self._stage_models(records)
+            if self.healthy:
+                self._send(records)
+            else:
+                self._spool(records)
+        finally:
+            with self._idle:
+                self._pending -= len(records)
+                self._idle.notify_all()
+
+    def _send(self, records: List[Dict[str, Any]]) -> None:
+        """Send records grouped by run, spooling the groups that fail."""
+        from mlflow.entities import Metric, Param
+
+        by_run = {}
+        for record in records:
+            by_run.setdefault(record["run_id"], []).append(record)
+
+        for run_id, run_records in by_run.items():
+            if not self.healthy or (self.breaker is not None and not self.breaker.allow()):
+                self._spool(run_records)
+                continue
+
+            metrics = [
+                Metric(name, value, record["timestamp"], record["step"])
+                for record in run_records if record["kind"] == "metrics"
+                for name, value in record["data"].items()
+            ]
+            params = list({
+                name: Param(name, value)
+                for record in run_records if record["kind"] == "params"
+                for name, value in record["data"].items()
+            }.values())
+            artifacts = [
+                path for record in run_records if record["kind"] == "artifacts"
+                for path in record["data"]
+            ]
+            directories = [
+                record["data"] for record in run_records if record["kind"] == "directory"
+            ]
+
+            # Usually one call per run; more only past the log_batch limits
+            metric_chunks = _chunks(metrics, MAX_METRICS_PER_BATCH)
+            param_chunks = _chunks(params, MAX_PARAMS_PER_BATCH)
+            # What was sent so far, so a failure spools only the rest
+            progress = {"chunks": 0, "artifacts": 0, "directories": 0}
+            try:
+                for i in range(max(len(metric_chunks), len(param_chunks))):
+                    self.client.log_batch(
+                        run_id,
+                        metrics=metric_chunks[i] if i < len(metric_chunks) else [],
+                        params=param_chunks[i] if i < len(param_chunks) else []
+                    )
+                    self.batches += 1
+                    progress["chunks"] += 1
+                for path in artifacts:
+                    if os.path.exists(path):
+                        self.client.log_artifact(run_id, path)
+                    else:
+                        print(f"Warning: Artifact path {path} does not exist")
+                    progress["artifacts"] += 1
+                for directory in directories:
+                    if os.path.isdir(directory["path"]):
+                        self.client.log_artifacts(
+                            run_id, directory["path"], directory["artifact_path"]
+                        )
+                    else:
+                        print(f"Warning: Artifact directory {directory['path']} does not exist")
+                    progress["directories"] += 1
+                self.sent += len(run_records)
+                for directory in directories:
+                    shutil.rmtree(directory["path"], ignore_errors=True)
+                if self.breaker is not None:
+                    self.breaker.record_success()
+            except Exception as e:
+                print(f"Error logging to MLflow, spooling to {self.spool_path}: {e}")
+                if self.breaker is not None:
+                    self.breaker.record_failure(e)
+                self.healthy = False
+                self._last_replay = time.monotonic()
+                for directory in directories[:progress["directories"]]:
+                    shutil.rmtree(directory["path"], ignore_errors=True)
+                self._spool(_unsent_records(
+                    run_id,
+                    [metric for chunk in metric_chunks[progress["chunks"]:] for metric in chunk],
+                    [param for chunk in param_chunks[progress["chunks"]:] for param in chunk],
+                    artifacts[progress["artifacts"]:],
+                    directories[progress["directories"]:]
+                ))
+
+    def _spool(self, records: List[Dict[str, Any]]) -> None:
+        """Append records to the spool file."""
+        directory = os.path.dirname(self.spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._spool_lock, open(self.spool_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        self.spooled += len(records)
+
+    def replay(self) -> int:
+        """
+        Send the spooled records.
+
+        The spool is renamed before it is read, so records spooled meanwhile, or
+        spooled again because the remote is still failing, are kept for the next
+        attempt.
+
+        Returns:
+            Number of records sent.
+        """
+        self._last_replay = time.monotonic()
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                self.healthy = True
+                return 0
+            replaying = f"{self.spool_path}.{os.getpid()}.replaying"
+            os.replace(self.spool_path, replaying)
+
+        with open(replaying) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        os.remove(replaying)
+
+        sent_before = self.sent
+        self.healthy = True
+        for start in range(0, len(records), self.max_batch):
+            self._send(records[start:start + self.max_batch])
+        replayed = self.sent - sent_before
+        self.replayed += replayed
+        return replayed
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued record was sent or spooled.
+
+        Args:
+            timeout: Maximum time to wait in seconds.
+
+        Returns:
+            True if the queue was drained.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush, stop the thread and spool whatever could not be sent in time."""
+        self.flush(timeout)
+        self._closed.set()
+        self._thread.join(timeout)
+
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if records:
+            self._spool(self._stage_models(records))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters of sent, spooled and replayed records."""
+        return {
+            "healthy": self.healthy,
+            "pending": self._pending,
+            "sent": self.sent,
+            "batches": self.batches,
+            "spooled": self.spooled,
+            "replayed": self.replayed
+        }
+
+
+def register_close_at_exit(logger: AsyncMlflowLogger, timeout: float = 5.0) -> None:
+    """Close the logger when the interpreter exits, so queued records are not lost."""
+    atexit.register(logger.close, timeout)
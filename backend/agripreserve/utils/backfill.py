@@ -0,0 +1,262 @@
+"""Parallel backfill of tracked metrics for historical snapshots.
+
+Historical snapshots are listed in a manifest or discovered in a directory. Their
+metrics are computed in a pool of processes and written to the metrics history
+store in bulk, one transaction per batch. Every written batch is appended to a
+checkpoint file, so an interrupted backfill resumes with the snapshots that are
+still missing.
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from agripreserve.utils.metrics_store import MetricsStore, parse_timestamp
+
+DEFAULT_CHECKPOINT_FILE = "backfill_checkpoint.jsonl"
+
+# Snapshot pairs written by MetricsTracker, e.g. loss_tonnes_20250508_122802.parquet
+TRACKED_FILE_PATTERN = re.compile(
+    r"^loss_(percentage|tonnes)_(\d{8}_\d{6}(?:_\d+)?)\.(?:csv|parquet)$"
+)
+
+# Year of an APHLIS release file, e.g. ...-all-crops-2022-dry-weight-losses_in_tonnes.csv
+APHLIS_YEAR_PATTERN = re.compile(r"-(\d{4})-dry-weight")
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Load a backfill manifest.
+
+    The manifest is a JSON list, or JSON lines, of objects with a unique 'key',
+    the 'percentage' and 'tonnes' file paths, and optionally the snapshot's
+    'timestamp' (e.g. '20250508_122802') or 'recorded_at' in seconds since the
+    epoch. Relative paths are resolved against the manifest's directory.
+
+    Args:
+        path: Path of the manifest.
+
+    Returns:
+        The snapshot entries.
+
+    Raises:
+        ValueError: If an entry lacks a key or a file path.
+    """
+    with open(path) as f:
+        text = f.read()
+    stripped = text.strip()
+    if stripped.startswith("["):
+        entries = json.loads(stripped)
+    else:
+        entries = [json.loads(line) for line in stripped.splitlines() if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for entry in entries:
+        missing = [field for field in ("key", "percentage", "tonnes") if not entry.get(field)]
+        if missing:
+            raise ValueError(f"Manifest entry {entry} lacks {', '.join(missing)}")
+        for field in ("percentage", "tonnes"):
+            entry[field] = os.path.join(base_dir, entry[field])
+    return entries
+
+
+def discover_snapshots(directory: str) -> List[Dict[str, Any]]:
+    """
+    Find the historical snapshots in a directory.
+
+    Two layouts are recognized, and may be mixed: pairs of
+    loss_percentage_<timestamp> and loss_tonnes_<timestamp> files written by
+    MetricsTracker, and subdirectories holding one APHLIS release each, i.e. a
+    '*percentage*.csv' and a '*tonnes*.csv' file.
+
+    Args:
+        directory: Directory to search.
+
+    Returns:
+        The snapshot entries, sorted by key.
+    """
+    pairs = {}
+    for name in os.listdir(directory):
+        match = TRACKED_FILE_PATTERN.match(name)
+        if match:
+            kind, timestamp = match.groups()
+            pairs.setdefault(timestamp, {})[kind] = os.path.join(directory, name)
+
+    entries = [
+        {"key": timestamp, "timestamp": timestamp, **files}
+        for timestamp, files in pairs.items()
+        if "percentage" in files and "tonnes" in files
+    ]
+
+    for name in os.listdir(directory):
+        release_dir = os.path.join(directory, name)
+        if not os.path.isdir(release_dir):
+            continue
+        percentage = sorted(glob.glob(os.path.join(release_dir, "*percentage*.csv")))
+        tonnes = sorted(glob.glob(os.path.join(release_dir, "*tonnes*.csv")))
+        if len(percentage) == 1 and len(tonnes) == 1:
+            entry = {"key": name, "percentage": percentage[0], "tonnes": tonnes[0]}
+            year = APHLIS_YEAR_PATTERN.search(os.path.basename(tonnes[0]))
+            if year:
+                entry["recorded_at"] = datetime(int(year.group(1)), 1, 1).timestamp()
+            entries.append(entry)
+
+    return sorted(entries, key=lambda entry: entry["key"])
+
+
+def compute_snapshot_metrics(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Load a snapshot and compute its loss metrics. Runs in a worker process.
+
+    Args:
+        entry: Snapshot entry from load_manifest or discover_snapshots.
+
+    Returns:
+        Dictionary with the entry's 'key', the content hash as 'snapshot', the
+        'metrics', 'timestamp' and 'recorded_at', or the 'error' if it failed.
+    """
+    # Imported here so the spawned process only loads what it needs
+    from agripreserve.data.loader import assign_region
+    from agripreserve.utils.hashing import dataset_hash
+    from agripreserve.utils.loss_metrics import calculate_loss_metrics
+    from agripreserve.utils.snapshots import read_snapshot
+
+    try:
+        frames = [read_snapshot(entry["percentage"]), read_snapshot(entry["tonnes"])]
+        for df in frames:
+            # Raw APHLIS releases have no region column
+            if "Region" not in df.columns:
+                df["Region"] = df["State"].apply(assign_region)
+
+        recorded_at = entry.get("recorded_at")
+        if recorded_at is None:
+            recorded_at = (
+                parse_timestamp(entry["timestamp"]) if entry.get("timestamp")
+                else os.path.getmtime(entry["tonnes"])
+            )
+        return {
+            "key": entry["key"],
+            "snapshot": dataset_hash(*frames),
+            "metrics": {
+                name: float(value) for name, value in calculate_loss_metrics(*frames).items()
+            },
+            "timestamp": entry.get("timestamp"),
+            "recorded_at": recorded_at
+        }
+    except Exception as e:
+        return {"key": entry["key"], "error": f"{type(e).__name__}: {e}"}
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """Return the keys of the snapshots a checkpoint file records as written."""
+    if not os.path.exists(path):
+        return set()
+    keys = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                # A line cut short by an interruption
+                continue
+    return keys
+
+
+def _append_checkpoint(path: str, keys: List[str], snapshot_ids: List[int]):
+    with open(path, "a") as f:
+        for key, snapshot_id in zip(keys, snapshot_ids):
+            f.write(json.dumps({"key": key, "snapshot_id": snapshot_id}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def backfill(
+    entries: List[Dict[str, Any]],
+    metrics_store: MetricsStore,
+    checkpoint_path: str,
+    workers: Optional[int] = None,
+    batch_size: int = 100,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Compute and record the metrics of historical snapshots.
+
+    Args:
+        entries: Snapshot entries from load_manifest or discover_snapshots.
+        metrics_store: Store the metrics are written to.
+        checkpoint_path: Checkpoint file. Snapshots it records are skipped.
+        workers: Number of worker processes. If None, uses the CPU count. With 1,
+                 metrics are computed in this process.
+        batch_size: Number of snapshots written per transaction.
+        on_progress: Optional function called with the progress after each batch.
+
+    Returns:
+        Dictionary with the number of snapshots 'total', 'skipped' as already
+        checkpointed, 'written' and 'failed', the 'errors' by key and 'seconds'.
+    """
+    start = time.perf_counter()
+    done = read_checkpoint(checkpoint_path)
+    pending = [entry for entry in entries if entry["key"] not in done]
+    progress = {
+        "total": len(entries),
+        "skipped": len(entries) - len(pending),
+        "written": 0,
+        "failed": 0,
+        "errors": {}
+    }
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    batch = []
+
+    def write_batch():
+        snapshot_ids = metrics_store.record_many([
+            {
+                "metrics": result["metrics"],
+                "snapshot": result["snapshot"],
+                "run_name": f"backfill_{result['key']}",
+                "timestamp": result["timestamp"],
+                "recorded_at": result["recorded_at"]
+            }
+            for result in batch
+        ])
+        # Checkpointed only once the batch is committed
+        _append_checkpoint(checkpoint_path, [result["key"] for result in batch], snapshot_ids)
+        progress["written"] += len(batch)
+        batch.clear()
+        if on_progress is not None:
+            on_progress(dict(progress))
+
+    def consume(results):
+        for result in results:
+            if "error" in result:
+                progress["failed"] += 1
+                progress["errors"][result["key"]] = result["error"]
+                continue
+            batch.append(result)
+            if len(batch) >= batch_size:
+                write_batch()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pending) <= 1:
+        consume(map(compute_snapshot_metrics, pending))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(pending)),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            chunksize = max(1, len(pending) // (workers * 4))
+            consume(executor.map(compute_snapshot_metrics, pending, chunksize=chunksize))
+    if batch:
+        write_batch()
+
+    progress["seconds"] = time.perf_counter() - start
+    return progress
+
@@ -4,6 +4,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from agripreserve.utils.resilience import get_breaker
+
 # Load environment variables from .env file
 env_path = Path(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))).joinpath('.env')
 load_dotenv(dotenv_path=env_path)
@@ -24,17 +26,38 @@ MLFLOW_TRACKING_PASSWORD = os.getenv("MLFLOW_TRACKING_PASSWORD", DAGSHUB_TOKEN)
 DAGSHUB_REMOTE_URL = os.getenv("DAGSHUB_REMOTE_URL", f"https://dagshub.com/{DAGSHUB_USERNAME}/{DAGSHUB_REPO}.dvc")
 
 
+def _init_dagshub_client():
+    """Log in and initialize the dagshub client. Talks to DAGsHub."""
+    # Use the dagshub Python client for easy integration
+    import dagshub
+    
+    # Login with DAGsHub credentials
+    dagshub.auth.add_app_token(DAGSHUB_TOKEN)
+    
+    # MLflow is not set up by the client: a call abandoned on timeout would
+    # otherwise still change the tracking configuration when it completes
+    dagshub.init(repo_owner=DAGSHUB_USERNAME, repo_name=DAGSHUB_REPO, mlflow=False)
+
+
+def _configure_mlflow_environment():
+    """Point MLflow at the DAGsHub tracking server."""
+    os.environ["MLFLOW_TRACKING_URI"] = MLFLOW_TRACKING_URI
+    os.environ["MLFLOW_TRACKING_USERNAME"] = MLFLOW_TRACKING_USERNAME
+    os.environ["MLFLOW_TRACKING_PASSWORD"] = MLFLOW_TRACKING_PASSWORD
+
+
 def setup_dagshub_environment():
-    """Set up the DAGsHub environment variables for DVC and MLflow."""
+    """
+    Set up the DAGsHub environment variables for DVC and MLflow.
+    
+    The dagshub client is initialized through the 'dagshub' circuit breaker, so
+    an unresponsive DAGsHub only delays setup by the configured timeout, and not
+    at all once it is marked unhealthy. The environment is then configured
+    manually instead. MLflow is always configured in the calling thread.
+    """
     try:
-        # Use the dagshub Python client for easy integration
-        import dagshub
-        
-        # Login with DAGsHub credentials
-        dagshub.auth.add_app_token(DAGSHUB_TOKEN)
-        
-        # Set up MLflow tracking
-        dagshub.init(repo_owner=DAGSHUB_USERNAME, repo_name=DAGSHUB_REPO, mlflow=True)
+        get_breaker("dagshub").call(_init_dagshub_client)
+        _configure_mlflow_environment()
         
         print(f"DAGsHub environment configured for user: {DAGSHUB_USERNAME}")
         print(f"MLflow tracking URI: {MLFLOW_TRACKING_URI}")
@@ -61,9 +84,7 @@ def setup_dagshub_environment():
         print(f"Error setting up DAGsHub environment: {str(e)}")
         
         # Fall back to manual environment variables
-        os.environ["MLFLOW_TRACKING_URI"] = MLFLOW_TRACKING_URI
-        os.environ["MLFLOW_TRACKING_USERNAME"] = MLFLOW_TRACKING_USERNAME
-        os.environ["MLFLOW_TRACKING_PASSWORD"] = MLFLOW_TRACKING_PASSWORD
+        _configure_mlflow_environment()
         
         # For DVC
         os.environ["DAGSHUB_USERNAME"] = DAGSHUB_USERNAME
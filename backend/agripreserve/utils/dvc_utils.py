@@ -1,26 +1,47 @@
 """DVC utilities for AgriPreserve."""
 
+import atexit
 import os
+import re
+import signal
 import subprocess
-from typing import List, Optional, Dict, Any, Union
+import threading
+import time
+from typing import Callable, List, Optional, Dict, Any, Union
 
+from agripreserve.utils.resilience import (
+    RemoteTimeoutError, call_with_timeout, get_breaker, remote_timeout
+)
 
-def run_dvc_command(command: List[str]) -> Dict[str, Any]:
+# Summary line DVC prints after a transfer, e.g. "3 files pushed"
+TRANSFERRED_PATTERN = re.compile(r"(\d+) files? (?:pushed|fetched|downloaded|uploaded)")
+
+# Background transfers still running, waited for when the interpreter exits
+_pending_transfers = set()
+_pending_lock = threading.Lock()
+
+
+def run_dvc_command(command: List[str], timeout: Optional[float] = None) -> Dict[str, Any]:
     """
     Run a DVC command and return the result.
     
     Args:
         command: List of command parts to run.
+        timeout: Maximum time in seconds the command may run before it is killed.
+                 If None, uses the configured 'dvc' timeout.
         
     Returns:
         Dictionary with success status, stdout, and stderr.
     """
+    if timeout is None:
+        timeout = remote_timeout("dvc")
     try:
         result = subprocess.run(
             ["dvc"] + command,
             capture_output=True,
             text=True,
-            check=False
+            check=False,
+            timeout=timeout
         )
         return {
             "success": result.returncode == 0,
@@ -28,6 +49,14 @@ def run_dvc_command(command: List[str]) -> Dict[str, Any]:
             "stderr": result.stderr,
             "returncode": result.returncode
         }
+    except subprocess.TimeoutExpired:
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": f"dvc {' '.join(command)} timed out after {timeout}s",
+            "returncode": -1,
+            "timed_out": True
+        }
     except Exception as e:
         return {
             "success": False,
@@ -55,7 +84,7 @@ def track_file(file_path: str, message: Optional[str] = None) -> Dict[str, Any]:
         }
     
     # Add file to DVC
-    add_result = run_dvc_command(["add", file_path])
+    add_result = run_dvc_command(["add", file_path], timeout=remote_timeout("dvc_add"))
     if not add_result["success"]:
         return {
             "success": False,
@@ -106,7 +135,7 @@ def track_directory(dir_path: str, message: Optional[str] = None) -> Dict[str, A
         }
     
     # Add directory to DVC
-    add_result = run_dvc_command(["add", dir_path])
+    add_result = run_dvc_command(["add", dir_path], timeout=remote_timeout("dvc_add"))
     if not add_result["success"]:
         return {
             "success": False,
@@ -139,6 +168,113 @@ def track_directory(dir_path: str, message: Optional[str] = None) -> Dict[str, A
         }
 
 
+def _add_in_process(paths: List[str]) -> None:
+    """
+    Add paths to DVC with DVC's Python API, without starting a dvc process.
+    
+    Raises:
+        ImportError: If DVC is not installed in this environment.
+    """
+    from dvc.repo import Repo
+    
+    repo = Repo()
+    try:
+        repo.add(paths)
+    finally:
+        repo.close()
+
+
+def track_files(
+    paths: List[str],
+    message: Optional[str] = None,
+    in_process: bool = True
+) -> Dict[str, Any]:
+    """
+    Track several files or directories with DVC in one batch.
+    
+    All paths are added in a single DVC invocation, their .dvc files are staged
+    with a single git add, and one commit is made for the batch. Adding is
+    bounded by the 'dvc_add' timeout on both paths; an in-process add that
+    times out cannot be interrupted and is abandoned.
+    
+    Args:
+        paths: Paths of the files or directories to track.
+        message: Optional commit message.
+        in_process: Whether to use DVC's Python API in this process. Falls back to
+                    the dvc command if DVC cannot be imported.
+        
+    Returns:
+        Dictionary with success status, output and the list of tracked paths.
+    """
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        return {
+            "success": False,
+            "output": f"Paths do not exist: {', '.join(missing)}",
+            "tracked": []
+        }
+    if not paths:
+        return {"success": True, "output": "Nothing to track.", "tracked": []}
+    
+    # Add all paths to DVC at once
+    timeout = remote_timeout("dvc_add")
+    added = False
+    if in_process:
+        try:
+            call_with_timeout(_add_in_process, timeout, list(paths))
+            added = True
+        except ImportError:
+            pass
+        except RemoteTimeoutError:
+            return {
+                "success": False,
+                "output": f"Adding paths to DVC timed out after {timeout}s",
+                "tracked": []
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "output": f"Failed to add paths to DVC: {e}",
+                "tracked": []
+            }
+    if not added:
+        add_result = run_dvc_command(["add"] + list(paths), timeout=timeout)
+        if not add_result["success"]:
+            return {
+                "success": False,
+                "output": f"Failed to add paths to DVC: {add_result['stderr']}",
+                "tracked": []
+            }
+    
+    # Add the DVC files to git
+    dvc_files = [f"{path.rstrip(os.sep)}.dvc" for path in paths]
+    not_created = [dvc_file for dvc_file in dvc_files if not os.path.exists(dvc_file)]
+    if not_created:
+        return {
+            "success": False,
+            "output": f"DVC files were not created: {', '.join(not_created)}",
+            "tracked": []
+        }
+    try:
+        subprocess.run(["git", "add"] + dvc_files, check=True, capture_output=True)
+        
+        # Commit if message is provided
+        if message:
+            subprocess.run(["git", "commit", "-m", message], check=True, capture_output=True)
+        
+        return {
+            "success": True,
+            "output": f"Successfully tracked {len(paths)} paths with DVC and added to git.",
+            "tracked": list(paths)
+        }
+    except subprocess.CalledProcessError as e:
+        return {
+            "success": False,
+            "output": f"Git operation failed: {e.stderr.decode() if e.stderr else str(e)}",
+            "tracked": []
+        }
+
+
 def setup_dagshub_remote(
     repository_url: str,
     remote_name: str = "dagshub"
@@ -181,43 +317,335 @@ def setup_dagshub_remote(
     }
 
 
-def push_to_remote(remote_name: Optional[str] = None) -> Dict[str, Any]:
+def _stream_dvc_command(
+    command: List[str],
+    timeout: Optional[float],
+    on_output: Callable[[str], None]
+) -> Dict[str, Any]:
     """
-    Push tracked data to the DVC remote.
+    Run a DVC command, passing each line of its output to on_output as it arrives.
+    
+    Returns:
+        Dictionary with success status, stdout, and stderr, like run_dvc_command.
+    """
+    try:
+        process = subprocess.Popen(
+            ["dvc"] + command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            # Its own process group, so helpers it spawns are killed with it
+            start_new_session=hasattr(os, "killpg")
+        )
+    except Exception as e:
+        return {"success": False, "stdout": "", "stderr": str(e), "returncode": -1}
+    
+    timed_out = threading.Event()
+    
+    def kill():
+        timed_out.set()
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except OSError:
+            pass
+    
+    timer = threading.Timer(timeout, kill) if timeout is not None else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    lines = []
+    try:
+        for line in process.stdout:
+            lines.append(line)
+            on_output(line.rstrip())
+        returncode = process.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    
+    output = "".join(lines)
+    if timed_out.is_set():
+        return {
+            "success": False,
+            "stdout": output,
+            "stderr": f"dvc {' '.join(command)} timed out after {timeout}s",
+            "returncode": returncode,
+            "timed_out": True
+        }
+    return {
+        "success": returncode == 0,
+        "stdout": output,
+        "stderr": "" if returncode == 0 else output,
+        "returncode": returncode
+    }
+
+
+def _run_remote_command(
+    command: List[str],
+    on_output: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run a DVC command talking to the remote through the 'dvc_remote' circuit breaker.
     
     Args:
-        remote_name: Optional name of the remote to push to.
+        command: List of command parts to run.
+        on_output: Optional function called with each line of output as it arrives.
         
     Returns:
-        Dictionary with success status and output.
+        Dictionary with success status and output. Fails fast without running the
+        command while the remote is marked unhealthy.
     """
-    command = ["push"]
-    if remote_name:
-        command.extend(["-r", remote_name])
+    breaker = get_breaker("dvc_remote")
+    if not breaker.allow():
+        return {
+            "success": False,
+            "output": "DVC remote is marked unhealthy; skipped until it recovers."
+        }
     
-    push_result = run_dvc_command(command)
+    if on_output is None:
+        result = run_dvc_command(command, timeout=breaker.timeout)
+    else:
+        result = _stream_dvc_command(command, breaker.timeout, on_output)
+    if result["success"]:
+        breaker.record_success()
+    else:
+        error = RemoteTimeoutError if result.get("timed_out") else RuntimeError
+        breaker.record_failure(error(result["stderr"].strip()[-200:]))
     return {
-        "success": push_result["success"],
-        "output": push_result["stdout"] if push_result["success"] else push_result["stderr"]
+        "success": result["success"],
+        "output": result["stdout"] if result["success"] else result["stderr"]
     }
 
 
-def pull_from_remote(remote_name: Optional[str] = None) -> Dict[str, Any]:
+def _transfer_command(
+    operation: str,
+    remote_name: Optional[str] = None,
+    jobs: Optional[int] = None,
+    targets: Optional[List[str]] = None
+) -> List[str]:
+    command = [operation]
+    if remote_name:
+        command.extend(["-r", remote_name])
+    if jobs:
+        command.extend(["-j", str(jobs)])
+    command.extend(targets or [])
+    return command
+
+
+class TransferHandle:
+    """
+    Handle of a DVC push or pull running in a background thread.
+    
+    Transfers still running when the interpreter exits are waited for, up to
+    the 'dvc_exit' timeout (AGRIPRESERVE_DVC_EXIT_TIMEOUT), so the DVC process
+    is not killed mid-transfer and its result is reported.
+    
+    DVC draws its progress bars only when its output is a terminal. Piped, as
+    here, it prints little more than the final summary line, so
+    files_transferred and last_message are mostly set once the transfer ends;
+    status and elapsed_seconds are the live progress.
+    """
+    
+    def __init__(
+        self,
+        operation: str,
+        command: List[str],
+        after: Optional["TransferHandle"] = None
+    ):
+        """
+        Start the transfer.
+        
+        Args:
+            operation: 'push' or 'pull'.
+            command: DVC command to run.
+            after: Optional transfer to wait for first, so transfers of the same
+                   repository never overlap.
+        """
+        self.operation = operation
+        self.command = list(command)
+        self.after = after
+        self.status = "queued" if after is not None and not after.done() else "running"
+        self.files_transferred = 0
+        self.last_message = None
+        self.result = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+        with _pending_lock:
+            _pending_transfers.add(self)
+        self._thread = threading.Thread(
+            target=self._run, name=f"dvc-{operation}", daemon=True
+        )
+        self._thread.start()
+    
+    def _on_output(self, line: str):
+        if not line:
+            return
+        self.last_message = line
+        match = TRANSFERRED_PATTERN.search(line)
+        if match:
+            self.files_transferred = int(match.group(1))
+    
+    def _run(self):
+        if self.after is not None:
+            self.after.wait()
+            self.after = None
+            self.status = "running"
+        try:
+            self.result = _run_remote_command(self.command, on_output=self._on_output)
+        except Exception as e:
+            self.result = {"success": False, "output": str(e)}
+        self.status = "succeeded" if self.result["success"] else "failed"
+        if not self.result["success"]:
+            print(f"Warning: DVC {self.operation} failed: {self.result['output']}")
+        self.finished_at = time.time()
+        self._done.set()
+        with _pending_lock:
+            _pending_transfers.discard(self)
+    
+    def done(self) -> bool:
+        """Return whether the transfer has finished."""
+        return self._done.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the transfer to finish.
+        
+        Args:
+            timeout: Maximum time to wait in seconds.
+            
+        Returns:
+            Dictionary with success status and output, or None if the transfer is
+            still running.
+        """
+        self._done.wait(timeout)
+        return self.result
+    
+    def progress(self) -> Dict[str, Any]:
+        """Return the status, files transferred and the latest output line."""
+        end = self.finished_at or time.time()
+        return {
+            "operation": self.operation,
+            "status": self.status,
+            "files_transferred": self.files_transferred,
+            "last_message": self.last_message,
+            "elapsed_seconds": end - self.started_at,
+            "output": self.result["output"] if self.result else None
+        }
+
+
+def wait_for_transfers(timeout: Optional[float] = None) -> bool:
+    """
+    Wait for every background transfer to finish.
+    
+    Args:
+        timeout: Maximum time to wait in seconds, for all transfers together.
+                 If None, waits until they finish.
+        
+    Returns:
+        True if no transfer is still running. Otherwise the transfers still
+        running are reported.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    with _pending_lock:
+        handles = sorted(_pending_transfers, key=lambda handle: handle.started_at)
+    for handle in handles:
+        print(f"Waiting for DVC {handle.operation} to finish...")
+        handle.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if handle.done() and handle.result["success"]:
+            print(f"DVC {handle.operation} finished: {handle.last_message or 'done'}")
+    with _pending_lock:
+        pending = sorted(_pending_transfers, key=lambda handle: handle.started_at)
+    for handle in pending:
+        progress = handle.progress()
+        print(f"Warning: DVC {handle.operation} still {progress['status']} after "
+              f"{progress['elapsed_seconds']:.0f}s: dvc {' '.join(handle.command)}")
+    return not pending
+
+
+def _wait_at_exit():
+    """Wait for background transfers, at most for the 'dvc_exit' timeout."""
+    wait_for_transfers(remote_timeout("dvc_exit"))
+
+
+atexit.register(_wait_at_exit)
+
+
+def push_to_remote(
+    remote_name: Optional[str] = None,
+    jobs: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Push tracked data to the DVC remote.
+    
+    Args:
+        remote_name: Optional name of the remote to push to.
+        jobs: Number of parallel transfer jobs. If None, uses DVC's default.
+        
+    Returns:
+        Dictionary with success status and output.
+    """
+    return _run_remote_command(_transfer_command("push", remote_name, jobs))
+
+
+def pull_from_remote(
+    remote_name: Optional[str] = None,
+    jobs: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Pull tracked data from the DVC remote.
     
     Args:
         remote_name: Optional name of the remote to pull from.
+        jobs: Number of parallel transfer jobs. If None, uses DVC's default.
         
     Returns:
         Dictionary with success status and output.
     """
-    command = ["pull"]
-    if remote_name:
-        command.extend(["-r", remote_name])
+    return _run_remote_command(_transfer_command("pull", remote_name, jobs))
+
+
+def push_to_remote_async(
+    remote_name: Optional[str] = None,
+    jobs: Optional[int] = None,
+    targets: Optional[List[str]] = None,
+    after: Optional[TransferHandle] = None
+) -> TransferHandle:
+    """
+    Push tracked data to the DVC remote in the background.
     
-    pull_result = run_dvc_command(command)
-    return {
-        "success": pull_result["success"],
-        "output": pull_result["stdout"] if pull_result["success"] else pull_result["stderr"]
-    }
+    Args:
+        remote_name: Optional name of the remote to push to.
+        jobs: Number of parallel transfer jobs. If None, uses DVC's default.
+        targets: Optional paths or .dvc files to push. If None, pushes everything.
+        after: Optional transfer to wait for before starting.
+        
+    Returns:
+        Handle reporting the progress and final status of the push.
+    """
+    return TransferHandle("push", _transfer_command("push", remote_name, jobs, targets), after)
+
+
+def pull_from_remote_async(
+    remote_name: Optional[str] = None,
+    jobs: Optional[int] = None,
+    targets: Optional[List[str]] = None,
+    after: Optional[TransferHandle] = None
+) -> TransferHandle:
+    """
+    Pull tracked data from the DVC remote in the background.
+    
+    Args:
+        remote_name: Optional name of the remote to pull from.
+        jobs: Number of parallel transfer jobs. If None, uses DVC's default.
+        targets: Optional paths or .dvc files to pull. If None, pulls everything.
+        after: Optional transfer to wait for before starting.
+        
+    Returns:
+        Handle reporting the progress and final status of the pull.
+    """
+    return TransferHandle("pull", _transfer_command("pull", remote_name, jobs, targets), after)
@@ -0,0 +1,22 @@
+"""Content hashing of data frames for AgriPreserve."""
+
+import hashlib
+
+import pandas as pd
+
+
+def dataset_hash(*frames: pd.DataFrame) -> str:
+    """
+    Hash the content of data frames.
+
+    Args:
+        frames: Data frames to hash, in order.
+
+    Returns:
+        Hex digest covering the column names, index and values of every frame.
+    """
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update("\x1f".join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
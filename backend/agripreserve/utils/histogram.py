@@ -0,0 +1,47 @@
+"""Lightweight histogram for reporting runtime distributions."""
+
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+
+class Histogram:
+    """Cumulative bucketed histogram, safe to update from several threads."""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Sorted upper bounds of the buckets. Observations above the
+                     last bound are counted in an overflow bucket.
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return bucket counts, total count, sum and mean."""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            total = self.sum
+
+        buckets = {f"le_{bound:g}": n for bound, n in zip(self.buckets, counts)}
+        buckets["le_inf"] = counts[-1]
+        return {
+            "buckets": buckets,
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0
+        }
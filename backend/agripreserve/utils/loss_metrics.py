@@ -0,0 +1,51 @@
+"""Loss metrics calculated from the APHLIS loss tables."""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+CROPS = ["Maize", "Rice", "Sorghum", "Millet"]
+
+
+def calculate_loss_metrics(
+    loss_percentage_df: pd.DataFrame,
+    loss_tonnes_df: pd.DataFrame
+) -> Dict[str, float]:
+    """
+    Calculate metrics from loss data.
+
+    Args:
+        loss_percentage_df: DataFrame with loss percentage data.
+        loss_tonnes_df: DataFrame with loss tonnage data.
+
+    Returns:
+        Dictionary of calculated metrics.
+    """
+    metrics = {}
+
+    # Calculate total losses by crop
+    for crop in CROPS:
+        # Total loss in tonnes
+        metrics[f"total_loss_{crop}_tonnes"] = loss_tonnes_df[crop].sum()
+
+        # Average loss percentage
+        valid_percentages = loss_percentage_df[loss_percentage_df[crop] > 0][crop]
+        metrics[f"avg_loss_{crop}_percentage"] = valid_percentages.mean() if not valid_percentages.empty else 0
+
+    # Calculate regional metrics
+    for region in loss_percentage_df["Region"].unique():
+        region_tonnes_df = loss_tonnes_df[loss_tonnes_df["Region"] == region]
+
+        # Total loss in tonnes by region
+        total_region_loss = 0
+        for crop in CROPS:
+            total_region_loss += region_tonnes_df[crop].sum()
+
+        metrics[f"total_loss_{region}_tonnes"] = total_region_loss
+
+    # Overall metrics
+    metrics["total_food_loss_tonnes"] = sum(metrics[f"total_loss_{crop}_tonnes"] for crop in CROPS)
+    metrics["avg_loss_percentage"] = np.mean([metrics[f"avg_loss_{crop}_percentage"] for crop in CROPS])
+
+    return metrics
@@ -0,0 +1,410 @@
+"""Local metrics history store for AgriPreserve.
+
+Every tracked snapshot and its metrics are recorded in an embedded SQLite
+database, indexed by metric name and time. Metric history can then be queried,
+compared between snapshots and charted as downsampled trends without reading the
+metrics JSON files or calling the remote tracking server.
+"""
+
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+METRICS_DB_FILE = "metrics.db"
+
+# Timestamp format of the tracked metrics files, e.g. metrics_20250508_122802.json
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+METRICS_FILE_PATTERN = re.compile(r"^metrics_(\d{8}_\d{6}(?:_\d+)?)\.json$")
+
+# Prefix marking a snapshot ID in textual references, e.g. 'id:12'; other
+# references are content hashes, which may themselves be all digits
+SNAPSHOT_ID_PREFIX = "id:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot TEXT,
+    run_name TEXT,
+    timestamp TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_recorded_at ON snapshots (recorded_at);
+CREATE INDEX IF NOT EXISTS snapshots_snapshot ON snapshots (snapshot);
+CREATE TABLE IF NOT EXISTS metrics (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    name TEXT NOT NULL,
+    value REAL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (snapshot_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_name_recorded_at ON metrics (name, recorded_at);
+CREATE INDEX IF NOT EXISTS metrics_recorded_at ON metrics (recorded_at);
+"""
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Convert a tracking timestamp like '20250508_122802' to seconds since the epoch."""
+    return datetime.strptime(timestamp[:15], TIMESTAMP_FORMAT).timestamp()
+
+
+def parse_snapshot_ref(reference: str) -> Union[int, str]:
+    """
+    Parse a textual snapshot reference.
+
+    Args:
+        reference: 'id:<id>' for a snapshot ID, anything else for a content hash.
+
+    Returns:
+        The ID as an int, or the content hash as a str.
+
+    Raises:
+        ValueError: If an ID reference is not an integer.
+    """
+    if reference.startswith(SNAPSHOT_ID_PREFIX):
+        return int(reference[len(SNAPSHOT_ID_PREFIX):])
+    return reference
+
+
+class MetricsStore:
+    """SQLite store of tracked metrics, safe to use from several threads."""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the store. The database is created on first use.
+
+        Args:
+            db_path: Path of the SQLite database file.
+        """
+        self.db_path = db_path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, committing on success and rolling back on error."""
+        with self._init_lock:
+            if not self._initialized:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(self.db_path, timeout=30)
+                try:
+                    # Readers are not blocked by the tracker writing
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(SCHEMA)
+                finally:
+                    connection.close()
+                self._initialized = True
+
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record(
+        self,
+        metrics: Dict[str, float],
+        snapshot: Optional[str] = None,
+        run_name: Optional[str] = None,
+        timestamp: Optional[str] = None,
+        recorded_at: Optional[float] = None
+    ) -> int:
+        """
+        Record the metrics of a snapshot.
+
+        Args:
+            metrics: Metric values by name.
+            snapshot: Content hash of the tracked data.
+            run_name: Name of the tracking run.
+            timestamp: Tracking timestamp, e.g. '20250508_122802'.
+            recorded_at: Time of the snapshot in seconds since the epoch. If None,
+                         derived from timestamp, or the current time.
+
+        Returns:
+            The ID of the recorded snapshot.
+        """
+        return self.record_many([{
+            "metrics": metrics,
+            "snapshot": snapshot,
+            "run_name": run_name,
+            "timestamp": timestamp,
+            "recorded_at": recorded_at
+        }])[0]
+
+    def record_many(self, entries: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Record the metrics of many snapshots in a single transaction.
+
+        Args:
+            entries: Dictionaries with the arguments of record.
+
+        Returns:
+            The IDs of the recorded snapshots, in order.
+        """
+        ids = []
+        with self._connect() as connection:
+            for entry in entries:
+                timestamp = entry.get("timestamp")
+                recorded_at = entry.get("recorded_at")
+                if recorded_at is None:
+                    recorded_at = parse_timestamp(timestamp) if timestamp else time.time()
+                cursor = connection.execute(
+                    "INSERT INTO snapshots (snapshot, run_name, timestamp, recorded_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (entry.get("snapshot"), entry.get("run_name"), timestamp, recorded_at)
+                )
+                snapshot_id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT INTO metrics (snapshot_id, name, value, recorded_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (snapshot_id, name, None if value is None else float(value), recorded_at)
+                        for name, value in entry["metrics"].items()
+                    ]
+                )
+                ids.append(snapshot_id)
+        return ids
+
+    def import_json_files(self, metrics_dir: str) -> int:
+        """
+        Record the metrics files written by MetricsTracker that are not in the store yet.
+
+        Args:
+            metrics_dir: Directory containing metrics_<timestamp>.json files.
+
+        Returns:
+            Number of files imported.
+        """
+        with self._connect() as connection:
+            known = {
+                row["timestamp"] for row in connection.execute("SELECT timestamp FROM snapshots")
+            }
+
+        entries = []
+        for path in sorted(glob.glob(os.path.join(metrics_dir, "metrics_*.json"))):
+            match = METRICS_FILE_PATTERN.match(os.path.basename(path))
+            if match is None or match.group(1) in known:
+                continue
+            try:
+                with open(path) as f:
+                    metrics = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable metrics file {path}: {e}")
+                continue
+            entries.append({"metrics": metrics, "timestamp": match.group(1)})
+
+        self.record_many(entries)
+        return len(entries)
+
+    def names(self) -> List[str]:
+        """Return the names of all recorded metrics."""
+        with self._connect() as connection:
+            return [row["name"] for row in connection.execute(
+                "SELECT DISTINCT name FROM metrics ORDER BY name"
+            )]
+
+    def snapshots(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Return the recorded snapshots in a time range, newest first."""
+        where, params = self._time_range("recorded_at", start, end)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT id, snapshot, run_name, timestamp, recorded_at FROM snapshots {where} "
+                "ORDER BY recorded_at DESC, id DESC LIMIT ?",
+                params + [limit]
+            )
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    def _time_range(column: str, start: Optional[float], end: Optional[float]) -> Tuple[str, list]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(end)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(
+        self,
+        names: Optional[Sequence[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 10000
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Return the recorded values of metrics in a time range.
+
+        Args:
+            names: Metric names. If None, returns all metrics.
+            start: Earliest time in seconds since the epoch.
+            end: Latest time in seconds since the epoch.
+            limit: Maximum number of values returned per metric.
+
+        Returns:
+            Values with their snapshot ID and time, oldest first, by metric name.
+        """
+        where, params = self._time_range("recorded_at", start, end)
+        if names:
+            where += (" AND " if where else "WHERE ") + f"name IN ({', '.join('?' * len(names))})"
+            params += list(names)
+        history = {}
+        with self._connect() as connection:
+            # Limited per name, so the first metrics cannot crowd out the others
+            rows = connection.execute(
+                f"""
+                SELECT name, snapshot_id, value, recorded_at FROM (
+                    SELECT name, snapshot_id, value, recorded_at, ROW_NUMBER() OVER (
+                        PARTITION BY name ORDER BY recorded_at, snapshot_id
+                    ) AS position
+                    FROM metrics {where}
+                )
+                WHERE position <= ?
+                ORDER BY name, recorded_at, snapshot_id
+                """,
+                params + [limit]
+            )
+            for row in rows:
+                history.setdefault(row["name"], []).append({
+                    "snapshot_id": row["snapshot_id"],
+                    "value": row["value"],
+                    "recorded_at": row["recorded_at"]
+                })
+        return history
+
+    def _resolve(self, connection: sqlite3.Connection, snapshot: Union[int, str]) -> int:
+        """Return the ID of a snapshot given by ID (int) or content hash (str, latest record)."""
+        if isinstance(snapshot, int):
+            row = connection.execute(
+                "SELECT id FROM snapshots WHERE id = ?", (snapshot,)
+            ).fetchone()
+        else:
+            row = connection.execute(
+                "SELECT id FROM snapshots WHERE snapshot = ? ORDER BY recorded_at DESC, id DESC",
+                (snapshot,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"Snapshot {snapshot}")
+        return row["id"]
+
+    def diff(self, before: Union[int, str], after: Union[int, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare the metrics of two snapshots.
+
+        Args:
+            before: ID (int) or content hash (str) of the earlier snapshot.
+            after: ID (int) or content hash (str) of the later snapshot.
+
+        Returns:
+            For every metric of either snapshot, its 'before' and 'after' values,
+            the absolute 'change' and the relative 'change_pct', None where a
+            value is missing or zero.
+
+        Raises:
+            KeyError: If a snapshot does not exist.
+        """
+        with self._connect() as connection:
+            ids = [self._resolve(connection, snapshot) for snapshot in (before, after)]
+            values = [
+                {
+                    row["name"]: row["value"] for row in connection.execute(
+                        "SELECT name, value FROM metrics WHERE snapshot_id = ?", (snapshot_id,)
+                    )
+                }
+                for snapshot_id in ids
+            ]
+
+        changes = {}
+        for name in sorted(set(values[0]) | set(values[1])):
+            old, new = values[0].get(name), values[1].get(name)
+            change = new - old if old is not None and new is not None else None
+            changes[name] = {
+                "before": old,
+                "after": new,
+                "change": change,
+                "change_pct": change / abs(old) * 100 if change is not None and old else None
+            }
+        return changes
+
+    def trend(
+        self,
+        name: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        points: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Return a metric's history downsampled to at most a number of points.
+
+        The time range is split into equal buckets, aggregated in the database.
+
+        Args:
+            name: Metric name.
+            start: Earliest time in seconds since the epoch.
+            end: Latest time in seconds since the epoch.
+            points: Maximum number of points.
+
+        Returns:
+            Per non-empty bucket, oldest first: its start time, the mean, minimum,
+            maximum and last value, and the number of recorded values.
+        """
+        with self._connect() as connection:
+            bounds = connection.execute(
+                "SELECT MIN(recorded_at), MAX(recorded_at) FROM metrics WHERE name = ? "
+                "AND recorded_at >= ? AND recorded_at <= ?",
+                (name, start if start is not None else float("-inf"),
+                 end if end is not None else float("inf"))
+            ).fetchone()
+            if bounds[0] is None:
+                return []
+            first = start if start is not None else bounds[0]
+            last = end if end is not None else bounds[1]
+            width = max(last - first, 0.0) / max(points, 1) or 1.0
+
+            # One grouped query; the last value of a bucket is that of its latest record
+            rows = connection.execute(
+                """
+                SELECT bucket, AVG(value) AS mean, MIN(value) AS min, MAX(value) AS max,
+                       COUNT(*) AS count, MAX(CASE WHEN position = 1 THEN value END) AS last
+                FROM (
+                    SELECT bucket, value, ROW_NUMBER() OVER (
+                        PARTITION BY bucket ORDER BY recorded_at DESC, snapshot_id DESC
+                    ) AS position
+                    FROM (
+                        SELECT MIN(CAST((recorded_at - :first) / :width AS INTEGER), :points - 1)
+                               AS bucket, value, recorded_at, snapshot_id
+                        FROM metrics
+                        WHERE name = :name AND recorded_at >= :first AND recorded_at <= :last
+                    )
+                )
+                GROUP BY bucket ORDER BY bucket
+                """,
+                {"first": first, "last": last, "width": width, "points": points, "name": name}
+            ).fetchall()
+
+        return [
+            {
+                "start": first + row["bucket"] * width,
+                "mean": row["mean"],
+                "min": row["min"],
+                "max": row["max"],
+                "last": row["last"],
+                "count": row["count"]
+            }
+            for row in rows
+        ]
@@ -2,11 +2,21 @@
 
 import os
 import pandas as pd
-import numpy as np
 import json
+import tempfile
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 
+from agripreserve.utils.hashing import dataset_hash
+from agripreserve.utils.loss_metrics import calculate_loss_metrics
+from agripreserve.utils.metrics_store import METRICS_DB_FILE, MetricsStore
+from agripreserve.utils.snapshots import (
+    DEFAULT_MAX_CHAIN,
+    SNAPSHOT_FORMATS,
+    read_snapshot,
+    write_snapshot
+)
 from agripreserve.utils.mlflow_utils import (
     setup_mlflow_tracking,
     start_run,
@@ -16,12 +26,16 @@ from agripreserve.utils.mlflow_utils import (
     end_run
 )
 from agripreserve.utils.dvc_utils import (
-    track_file,
-    track_directory,
+    track_files,
     setup_dagshub_remote,
-    push_to_remote
+    push_to_remote,
+    push_to_remote_async
 )
 
+# Index in the metrics directory mapping content hashes of tracked frame pairs to
+# the snapshot files written for them
+SNAPSHOT_INDEX_FILE = "snapshots.json"
+
 
 class MetricsTracker:
     """Class for tracking metrics using MLflow and DVC."""
@@ -31,7 +45,13 @@ class MetricsTracker:
         experiment_name: str = "agripreserve_metrics",
         metrics_dir: str = "metrics",
         data_dir: str = "data",
-        dagshub_repo_url: Optional[str] = None
+        dagshub_repo_url: Optional[str] = None,
+        async_logging: bool = True,
+        background_push: bool = True,
+        push_jobs: Optional[int] = None,
+        snapshot_format: str = "delta",
+        max_delta_chain: int = DEFAULT_MAX_CHAIN,
+        metrics_store: Optional[MetricsStore] = None
     ):
         """
         Initialize the metrics tracker.
@@ -41,11 +61,40 @@ class MetricsTracker:
             metrics_dir: Directory to store metrics files.
             data_dir: Directory to store data files.
             dagshub_repo_url: URL of the DAGsHub repository.
+            async_logging: Whether to log to MLflow from a background thread, so
+                           tracking does not wait on the tracking server.
+            background_push: Whether to push to the DVC remote in the background, so
+                             tracking returns before the upload finishes. Use
+                             wait_for_push for its result; pushes still running
+                             when the interpreter exits are waited for, up to the
+                             'dvc_exit' timeout.
+            push_jobs: Number of parallel DVC transfer jobs. If None, uses DVC's default.
+            snapshot_format: Format of the data snapshots: 'csv' for full CSV copies,
+                             'parquet' for full compressed Parquet files, or 'delta'
+                             for Parquet files holding only the rows changed since
+                             the previous snapshot.
+            max_delta_chain: Maximum number of delta snapshots between two full ones.
+            metrics_store: Store recording the history of the tracked metrics. If
+                           None, uses metrics.db in the metrics directory.
+            
+        Raises:
+            ValueError: If the snapshot format is unknown.
         """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+
         self.experiment_name = experiment_name
         self.metrics_dir = metrics_dir
         self.data_dir = data_dir
         self.dagshub_repo_url = dagshub_repo_url
+        self.background_push = background_push
+        self.push_jobs = push_jobs
+        self.push_handle = None
+        self.snapshot_format = snapshot_format
+        self.max_delta_chain = max_delta_chain
+        self.metrics_store = metrics_store or MetricsStore(os.path.join(metrics_dir, METRICS_DB_FILE))
+        self.snapshot_index_path = os.path.join(metrics_dir, SNAPSHOT_INDEX_FILE)
+        self._index_lock = threading.Lock()
         
         # Create directories if they don't exist
         os.makedirs(self.metrics_dir, exist_ok=True)
@@ -61,21 +110,22 @@ class MetricsTracker:
                 
                 # Set MLflow tracking URI for DAGsHub
                 tracking_uri = f"https://dagshub.com/{username}/{repo_name}.mlflow"
-                setup_mlflow_tracking(tracking_uri, experiment_name)
+                setup_mlflow_tracking(tracking_uri, experiment_name, async_logging=async_logging)
                 
                 # Set up DVC remote for DAGsHub
                 setup_dagshub_remote(dagshub_repo_url)
             else:
                 print("Invalid DAGsHub repository URL")
-                setup_mlflow_tracking(experiment_name=experiment_name)
+                setup_mlflow_tracking(experiment_name=experiment_name, async_logging=async_logging)
         else:
-            setup_mlflow_tracking(experiment_name=experiment_name)
+            setup_mlflow_tracking(experiment_name=experiment_name, async_logging=async_logging)
     
     def track_loss_metrics(
         self,
         loss_percentage_df: pd.DataFrame,
         loss_tonnes_df: pd.DataFrame,
-        run_name: Optional[str] = None
+        run_name: Optional[str] = None,
+        deduplicate: bool = True
     ) -> Dict[str, Any]:
         """
         Track loss metrics using MLflow and DVC.
@@ -84,12 +134,31 @@ class MetricsTracker:
             loss_percentage_df: DataFrame with loss percentage data.
             loss_tonnes_df: DataFrame with loss tonnage data.
             run_name: Optional name for the MLflow run.
+            deduplicate: Whether to skip writing, DVC tracking and artifact upload
+                         when a snapshot of identical frames was already tracked.
+                         Only a reference to the existing snapshot is recorded.
             
         Returns:
-            Dictionary with tracking results.
+            Dictionary with tracking results. 'snapshot' is the content hash of the
+            frames and 'deduplicated' tells whether an existing snapshot was reused.
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self._unique_timestamp()
         run_name = run_name or f"loss_metrics_{timestamp}"
+        snapshot = dataset_hash(loss_percentage_df, loss_tonnes_df)
+        
+        if deduplicate:
+            existing = self._reference_snapshot(snapshot, run_name, timestamp)
+            if existing is not None:
+                print(f"Snapshot {snapshot} already tracked at {existing['timestamp']}; skipping")
+                with open(existing["files"]["metrics"]) as f:
+                    metrics = json.load(f)
+                return {
+                    "success": True,
+                    "deduplicated": True,
+                    "snapshot": snapshot,
+                    "metrics": metrics,
+                    "files": dict(existing["files"])
+                }
         
         # Calculate metrics
         metrics = self._calculate_loss_metrics(loss_percentage_df, loss_tonnes_df)
@@ -99,17 +168,30 @@ class MetricsTracker:
         with open(metrics_file, "w") as f:
             json.dump(metrics, f, indent=2)
         
-        # Save DataFrames to CSV
-        percentage_file = os.path.join(self.data_dir, f"loss_percentage_{timestamp}.csv")
-        tonnes_file = os.path.join(self.data_dir, f"loss_tonnes_{timestamp}.csv")
+        # Save DataFrames as snapshots
+        percentage_file = self._write_data_snapshot(
+            loss_percentage_df, "loss_percentage", "percentage", timestamp
+        )
+        tonnes_file = self._write_data_snapshot(loss_tonnes_df, "loss_tonnes", "tonnes", timestamp)
         
-        loss_percentage_df.to_csv(percentage_file, index=False)
-        loss_tonnes_df.to_csv(tonnes_file, index=False)
+        files = {
+            "metrics": metrics_file,
+            "percentage": percentage_file,
+            "tonnes": tonnes_file
+        }
+        self._record_snapshot(snapshot, run_name, timestamp, files)
+        try:
+            self.metrics_store.record(metrics, snapshot=snapshot, run_name=run_name, timestamp=timestamp)
+        except Exception as e:
+            print(f"Warning: Failed to record metrics history: {e}")
         
-        # Track files with DVC
-        track_file(metrics_file, f"Add metrics file for {run_name}")
-        track_file(percentage_file, f"Add loss percentage data for {run_name}")
-        track_file(tonnes_file, f"Add loss tonnage data for {run_name}")
+        # Track files with DVC in a single batch and commit
+        track_result = track_files(
+            [metrics_file, percentage_file, tonnes_file],
+            f"Add metrics and loss data for {run_name}"
+        )
+        if not track_result["success"]:
+            print(f"Warning: Failed to track files with DVC: {track_result['output']}")
         
         # Log metrics to MLflow
         with start_run(run_name=run_name):
@@ -117,7 +199,8 @@ class MetricsTracker:
             params = {
                 "num_states": len(loss_percentage_df["State"].unique()),
                 "num_regions": len(loss_percentage_df["Region"].unique()),
-                "timestamp": timestamp
+                "timestamp": timestamp,
+                "snapshot": snapshot
             }
             log_params(params)
             
@@ -128,21 +211,154 @@ class MetricsTracker:
             log_artifacts([metrics_file, percentage_file, tonnes_file])
         
         # Push to DAGsHub if URL is provided
+        push = None
         if self.dagshub_repo_url:
-            push_result = push_to_remote()
-            if not push_result["success"]:
-                print(f"Warning: Failed to push to remote: {push_result['output']}")
+            if self.background_push:
+                self.push_handle = push_to_remote_async(jobs=self.push_jobs, after=self.push_handle)
+                push = self.push_handle.progress()
+            else:
+                push_result = push_to_remote(jobs=self.push_jobs)
+                if not push_result["success"]:
+                    print(f"Warning: Failed to push to remote: {push_result['output']}")
+                push = {"status": "succeeded" if push_result["success"] else "failed"}
         
         return {
             "success": True,
+            "deduplicated": False,
+            "snapshot": snapshot,
             "metrics": metrics,
-            "files": {
-                "metrics": metrics_file,
-                "percentage": percentage_file,
-                "tonnes": tonnes_file
-            }
+            "files": files,
+            "push": push
         }
     
+    def wait_for_push(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the latest background push to finish.
+        
+        Args:
+            timeout: Maximum time to wait in seconds.
+            
+        Returns:
+            The progress of the push, or None if nothing was pushed in the background.
+        """
+        if self.push_handle is None:
+            return None
+        self.push_handle.wait(timeout)
+        return self.push_handle.progress()
+    
+    def _unique_timestamp(self) -> str:
+        """Return the current timestamp, suffixed if files of that second already exist."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        unique, n = timestamp, 1
+        while os.path.exists(os.path.join(self.metrics_dir, f"metrics_{unique}.json")):
+            unique = f"{timestamp}_{n}"
+            n += 1
+        return unique
+    
+    def _write_data_snapshot(
+        self,
+        df: pd.DataFrame,
+        name: str,
+        kind: str,
+        timestamp: str
+    ) -> str:
+        """Write a data frame in the configured snapshot format and return its path."""
+        if self.snapshot_format == "csv":
+            path = os.path.join(self.data_dir, f"{name}_{timestamp}.csv")
+            df.to_csv(path, index=False)
+            return path
+        
+        base_path = None
+        if self.snapshot_format == "delta":
+            latest = self._latest_snapshot()
+            if latest is not None and latest["files"][kind].endswith(".parquet"):
+                base_path = latest["files"][kind]
+        
+        # Full and delta snapshots share the extension; each file describes itself
+        path = os.path.join(self.data_dir, f"{name}_{timestamp}.parquet")
+        write_snapshot(df, path, base_path=base_path, max_chain=self.max_delta_chain)
+        return path
+    
+    def load_snapshot(self, snapshot: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Reconstruct the frames of a tracked snapshot.
+        
+        Args:
+            snapshot: Content hash returned by track_loss_metrics.
+            
+        Returns:
+            The loss percentage and loss tonnage data frames.
+            
+        Raises:
+            KeyError: If the snapshot is unknown.
+        """
+        entry = self._load_snapshot_index()[snapshot]
+        return read_snapshot(entry["files"]["percentage"]), read_snapshot(entry["files"]["tonnes"])
+    
+    def _latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Return the index entry of the most recently written snapshot whose files exist."""
+        entries = [
+            entry for entry in self._load_snapshot_index().values()
+            if all(os.path.exists(path) for path in entry["files"].values())
+        ]
+        return max(entries, key=lambda entry: entry["timestamp"], default=None)
+    
+    def _load_snapshot_index(self) -> Dict[str, Any]:
+        if not os.path.exists(self.snapshot_index_path):
+            return {}
+        try:
+            with open(self.snapshot_index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading snapshot index, rebuilding it: {e}")
+            return {}
+    
+    def _save_snapshot_index(self, index: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.metrics_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.snapshot_index_path)
+    
+    def _reference_snapshot(
+        self,
+        snapshot: str,
+        run_name: str,
+        timestamp: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a reference to an existing snapshot of the same content.
+        
+        Returns:
+            The index entry of the snapshot, or None if no snapshot with this hash
+            exists or its files were removed.
+        """
+        with self._index_lock:
+            index = self._load_snapshot_index()
+            entry = index.get(snapshot)
+            if entry is None or not all(os.path.exists(path) for path in entry["files"].values()):
+                return None
+            entry.setdefault("references", []).append({"run_name": run_name, "timestamp": timestamp})
+            self._save_snapshot_index(index)
+            return entry
+    
+    def _record_snapshot(
+        self,
+        snapshot: str,
+        run_name: str,
+        timestamp: str,
+        files: Dict[str, str]
+    ):
+        """Add a newly written snapshot to the index."""
+        with self._index_lock:
+            index = self._load_snapshot_index()
+            index[snapshot] = {
+                "run_name": run_name,
+                "timestamp": timestamp,
+                "files": dict(files),
+                "references": []
+            }
+            self._save_snapshot_index(index)
+    
     def _calculate_loss_metrics(
         self,
         loss_percentage_df: pd.DataFrame,
@@ -158,33 +374,7 @@ class MetricsTracker:
         Returns:
             Dictionary of calculated metrics.
         """
-        metrics = {}
-        
-        # Calculate total losses by crop
-        for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
-            # Total loss in tonnes
-            metrics[f"total_loss_{crop}_tonnes"] = loss_tonnes_df[crop].sum()
-            
-            # Average loss percentage
-            valid_percentages = loss_percentage_df[loss_percentage_df[crop] > 0][crop]
-            metrics[f"avg_loss_{crop}_percentage"] = valid_percentages.mean() if not valid_percentages.empty else 0
-        
-        # Calculate regional metrics
-        for region in loss_percentage_df["Region"].unique():
-            region_tonnes_df = loss_tonnes_df[loss_tonnes_df["Region"] == region]
-            
-            # Total loss in tonnes by region
-            total_region_loss = 0
-            for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
-                total_region_loss += region_tonnes_df[crop].sum()
-            
-            metrics[f"total_loss_{region}_tonnes"] = total_region_loss
-        
-        # Overall metrics
-        metrics["total_food_loss_tonnes"] = sum(metrics[f"total_loss_{crop}_tonnes"] for crop in ["Maize", "Rice", "Sorghum", "Millet"])
-        metrics["avg_loss_percentage"] = np.mean([metrics[f"avg_loss_{crop}_percentage"] for crop in ["Maize", "Rice", "Sorghum", "Millet"]])
-        
-        return metrics
+        return calculate_loss_metrics(loss_percentage_df, loss_tonnes_df)
 
 
 def setup_dagshub_credentials():
@@ -4,10 +4,30 @@ import os
 import mlflow
 from typing import Dict, Any, Optional, Union, List
 
+from agripreserve.utils.async_tracking import (
+    DEFAULT_SPOOL_PATH,
+    AsyncMlflowLogger,
+    register_close_at_exit
+)
+from agripreserve.utils.resilience import CircuitBreaker, get_breaker
+
+# Tracking URI used when the tracking server is unreachable or marked unhealthy,
+# the same local store MLflow uses when no URI is configured
+LOCAL_TRACKING_URI = "sqlite:///mlflow.db"
+
+# Tracking URI schemes served by a remote tracking server
+REMOTE_SCHEMES = ("http://", "https://", "databricks")
+
+# Background logger used by log_metrics, log_params, log_artifacts and log_model once
+# asynchronous logging is enabled
+_async_logger: Optional[AsyncMlflowLogger] = None
+
 
 def setup_mlflow_tracking(
     tracking_uri: Optional[str] = None,
-    experiment_name: str = "agripreserve_experiments"
+    experiment_name: str = "agripreserve_experiments",
+    async_logging: bool = False,
+    spool_path: Optional[str] = None
 ) -> None:
     """
     Set up MLflow tracking.
@@ -16,15 +36,44 @@ def setup_mlflow_tracking(
         tracking_uri: MLflow tracking URI. If None, will use MLFLOW_TRACKING_URI environment variable
                       or local 'mlruns' directory.
         experiment_name: Name of the MLflow experiment.
+        async_logging: Whether to log metrics, params and artifacts from a background
+                       thread in batches, spooling them locally while the server is
+                       unreachable.
+        spool_path: Spool file for asynchronous logging. If None, uses
+                    MLFLOW_SPOOL_PATH or DEFAULT_SPOOL_PATH.
+    
+    A tracking server that does not answer within the 'mlflow' timeout, or that
+    is marked unhealthy by earlier failures, is replaced by local tracking at
+    LOCAL_TRACKING_URI.
     """
-    # Set tracking URI from parameter, environment variable, or default to local
-    if tracking_uri:
-        mlflow.set_tracking_uri(tracking_uri)
-    elif os.environ.get("MLFLOW_TRACKING_URI"):
+    if async_logging:
+        enable_async_logging(spool_path)
+    
+    # Use the tracking URI from parameter, environment variable, or default to local
+    if not tracking_uri and os.environ.get("MLFLOW_TRACKING_URI"):
         tracking_uri = os.environ.get("MLFLOW_TRACKING_URI")
-        mlflow.set_tracking_uri(tracking_uri)
         print(f"Using MLflow tracking URI from environment: {tracking_uri}")
     
+    if tracking_uri and _is_remote(tracking_uri):
+        breaker = get_breaker("mlflow")
+        # Bound every request made later in the calling thread, e.g. by start_run
+        os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", str(max(1, int(breaker.timeout))))
+        os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "1")
+        try:
+            # Resolved with a client of its own, so a call abandoned on timeout
+            # cannot change the active experiment afterwards
+            experiment_id = breaker.call(_resolve_experiment, tracking_uri, experiment_name)
+            mlflow.set_tracking_uri(tracking_uri)
+            mlflow.set_experiment(experiment_id=experiment_id)
+            return
+        except Exception as e:
+            print(f"MLflow tracking server {tracking_uri} unavailable: {e}")
+            print(f"Falling back to local tracking at {LOCAL_TRACKING_URI}")
+            tracking_uri = LOCAL_TRACKING_URI
+    
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+    
     # Set or create the experiment
     try:
         mlflow.set_experiment(experiment_name)
@@ -33,6 +82,103 @@ def setup_mlflow_tracking(
         print("Defaulting to 'Default' experiment")
 
 
+def _is_remote(tracking_uri: str) -> bool:
+    """Return whether a tracking URI points to a tracking server."""
+    return tracking_uri.startswith(REMOTE_SCHEMES)
+
+
+def _resolve_experiment(tracking_uri: str, experiment_name: str) -> str:
+    """Return the ID of an experiment on a tracking server, creating it if needed."""
+    from mlflow.tracking import MlflowClient
+    
+    client = MlflowClient(tracking_uri)
+    experiment = client.get_experiment_by_name(experiment_name)
+    if experiment is not None:
+        return experiment.experiment_id
+    return client.create_experiment(experiment_name)
+
+
+def _tracking_breaker() -> Optional[CircuitBreaker]:
+    """Return the breaker of the tracking server, or None when tracking locally."""
+    return get_breaker("mlflow") if _is_remote(mlflow.get_tracking_uri()) else None
+
+
+def _call_tracking(description: str, func, *args, **kwargs) -> Any:
+    """
+    Call an MLflow function in the calling thread, failing fast while the
+    tracking server is marked unhealthy.
+    
+    Args:
+        description: Description of the call used in messages.
+        func: MLflow function to call.
+        *args: Positional arguments of the function.
+        **kwargs: Keyword arguments of the function.
+        
+    Returns:
+        The result of the function, or None if it failed or was skipped.
+    """
+    breaker = _tracking_breaker()
+    if breaker is not None and not breaker.allow():
+        print(f"Skipped {description}: MLflow tracking server is marked unhealthy")
+        return None
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        if breaker is not None:
+            breaker.record_failure(e)
+        print(f"Error {description}: {e}")
+        return None
+    if breaker is not None:
+        breaker.record_success()
+    return result
+
+
+def enable_async_logging(spool_path: Optional[str] = None, **options) -> AsyncMlflowLogger:
+    """
+    Log metrics, params, artifacts and models asynchronously from now on.
+    
+    Args:
+        spool_path: Spool file for records that could not be sent. If None, uses
+                    MLFLOW_SPOOL_PATH or DEFAULT_SPOOL_PATH.
+        **options: Further AsyncMlflowLogger options.
+        
+    Returns:
+        The background logger. Calling this again returns the same logger.
+    """
+    global _async_logger
+    if _async_logger is None:
+        options.setdefault("breaker", get_breaker("mlflow"))
+        _async_logger = AsyncMlflowLogger(
+            spool_path or os.environ.get("MLFLOW_SPOOL_PATH", DEFAULT_SPOOL_PATH), **options
+        )
+        register_close_at_exit(_async_logger)
+    return _async_logger
+
+
+def flush_logging(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until asynchronously logged records were sent or spooled.
+    
+    Args:
+        timeout: Maximum time to wait in seconds.
+        
+    Returns:
+        True if nothing is left to log.
+    """
+    if _async_logger is None:
+        return True
+    return _async_logger.flush(timeout)
+
+
+def _active_run_id() -> Optional[str]:
+    """Return the ID of the active run, or None."""
+    run = mlflow.active_run()
+    if run is None:
+        print("Warning: No active MLflow run to log to")
+        return None
+    return run.info.run_id
+
+
 def log_metrics(
     metrics: Dict[str, Union[float, int]],
     step: Optional[int] = None
@@ -44,10 +190,13 @@ def log_metrics(
         metrics: Dictionary of metric names and values.
         step: Step value for the metrics.
     """
-    try:
-        mlflow.log_metrics(metrics, step=step)
-    except Exception as e:
-        print(f"Error logging metrics to MLflow: {e}")
+    if _async_logger is not None:
+        run_id = _active_run_id()
+        if run_id is not None:
+            _async_logger.log_metrics(run_id, metrics, step=step)
+        return
+    
+    _call_tracking("logging metrics to MLflow", mlflow.log_metrics, metrics, step=step)
 
 
 def log_params(params: Dict[str, Any]) -> None:
@@ -57,10 +206,13 @@ def log_params(params: Dict[str, Any]) -> None:
     Args:
         params: Dictionary of parameter names and values.
     """
-    try:
-        mlflow.log_params(params)
-    except Exception as e:
-        print(f"Error logging parameters to MLflow: {e}")
+    if _async_logger is not None:
+        run_id = _active_run_id()
+        if run_id is not None:
+            _async_logger.log_params(run_id, params)
+        return
+    
+    _call_tracking("logging parameters to MLflow", mlflow.log_params, params)
 
 
 def log_artifacts(artifact_paths: List[str]) -> None:
@@ -70,19 +222,54 @@ def log_artifacts(artifact_paths: List[str]) -> None:
     Args:
         artifact_paths: List of paths to artifacts to log.
     """
-    try:
-        for path in artifact_paths:
-            if os.path.exists(path):
-                mlflow.log_artifact(path)
-            else:
-                print(f"Warning: Artifact path {path} does not exist")
-    except Exception as e:
-        print(f"Error logging artifacts to MLflow: {e}")
+    if _async_logger is not None:
+        run_id = _active_run_id()
+        if run_id is not None:
+            _async_logger.log_artifacts(run_id, artifact_paths)
+        return
+    
+    _call_tracking("logging artifacts to MLflow", _log_artifact_files, artifact_paths)
+
+
+def log_model(model, artifact_path: str = "model") -> None:
+    """
+    Log a scikit-learn model to the active MLflow run.
+    
+    Skipped when no run is active, e.g. because start_run found the tracking
+    server unhealthy, as MLflow would otherwise start a run of its own. With
+    asynchronous logging, the model is saved and uploaded by the background
+    logger, so it must not be changed afterwards.
+    
+    Args:
+        model: Fitted scikit-learn model or pipeline.
+        artifact_path: Artifact path of the model in the run.
+    """
+    run_id = _active_run_id()
+    if run_id is None:
+        return
+    
+    import mlflow.sklearn
+    if _async_logger is not None:
+        _async_logger.log_model(
+            run_id, lambda path: mlflow.sklearn.save_model(model, path), artifact_path
+        )
+        return
+    
+    _call_tracking("logging model to MLflow", mlflow.sklearn.log_model, model, artifact_path)
+
+
+def _log_artifact_files(artifact_paths: List[str]) -> None:
+    for path in artifact_paths:
+        if os.path.exists(path):
+            mlflow.log_artifact(path)
+        else:
+            print(f"Warning: Artifact path {path} does not exist")
 
 
 def start_run(
     run_name: Optional[str] = None,
-    tags: Optional[Dict[str, str]] = None
+    tags: Optional[Dict[str, str]] = None,
+    nested: bool = False
 ) -> mlflow.ActiveRun:
     """
     Start an MLflow run.
@@ -90,17 +277,19 @@ def start_run(
     Args:
         run_name: Name of the run.
         tags: Dictionary of tags for the run.
+        nested: Whether to start the run as a child of the active run.
         
     Returns:
         MLflow ActiveRun object.
     """
-    try:
-        return mlflow.start_run(run_name=run_name, tags=tags)
-    except Exception as e:
-        print(f"Error starting MLflow run: {e}")
+    run = _call_tracking(
+        "starting MLflow run", mlflow.start_run, run_name=run_name, tags=tags, nested=nested
+    )
+    if run is None:
         # Return a dummy context manager if MLflow fails
         from contextlib import nullcontext
         return nullcontext()
+    return run
 
 
 def end_run() -> None:
@@ -0,0 +1,263 @@
+"""Timeouts and circuit breakers for remote calls in AgriPreserve.
+
+Every remote AgriPreserve talks to (the MLflow tracking server, DAGsHub and the
+DVC remote) has a named circuit breaker. After failure_threshold consecutive
+failures or timeouts the circuit opens and calls fail fast, so callers fall back
+to local tracking instead of waiting on the remote again. Once reset_timeout has
+passed, a single trial call is let through; its success closes the circuit.
+
+Timeouts and thresholds can be set per remote with environment variables, e.g.
+AGRIPRESERVE_MLFLOW_TIMEOUT, AGRIPRESERVE_DVC_REMOTE_FAILURE_THRESHOLD or
+AGRIPRESERVE_DAGSHUB_RESET_TIMEOUT.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Default timeout in seconds of a single call to each remote. 'dvc_add' bounds
+# `dvc add`, which hashes the added data locally and can take long for large files.
+# 'dvc_exit' bounds the wait for background DVC transfers when the interpreter exits.
+DEFAULT_TIMEOUTS = {
+    "mlflow": 10.0,
+    "dagshub": 15.0,
+    "dvc": 60.0,
+    "dvc_add": 600.0,
+    "dvc_exit": 60.0,
+    "dvc_remote": 600.0
+}
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 60.0
+
+CIRCUIT_STATES = ("closed", "open", "half_open")
+
+
+class RemoteTimeoutError(TimeoutError):
+    """Raised when a remote call does not finish within its timeout."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a remote is called while its circuit is open."""
+
+
+def _env_float(name: str, option: str, default: float) -> float:
+    value = os.environ.get(f"AGRIPRESERVE_{name.upper()}_{option}")
+    try:
+        return float(value) if value else default
+    except ValueError:
+        print(f"Ignoring invalid AGRIPRESERVE_{name.upper()}_{option}: {value}")
+        return default
+
+
+def remote_timeout(name: str) -> float:
+    """Return the configured timeout in seconds of calls to a remote."""
+    return _env_float(name, "TIMEOUT", DEFAULT_TIMEOUTS.get(name, DEFAULT_TIMEOUTS["mlflow"]))
+
+
+def call_with_timeout(func: Callable[..., Any], timeout: Optional[float], *args, **kwargs) -> Any:
+    """
+    Call a function, giving up after a timeout.
+
+    The function runs in a daemon thread. A call that times out cannot be
+    interrupted; it is abandoned and its result discarded.
+
+    Args:
+        func: Function to call.
+        timeout: Maximum time to wait in seconds. If None, waits indefinitely.
+        *args: Positional arguments of the function.
+        **kwargs: Keyword arguments of the function.
+
+    Returns:
+        The result of the function.
+
+    Raises:
+        RemoteTimeoutError: If the call did not finish in time.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    name = getattr(func, "__name__", "call")
+    thread = threading.Thread(target=target, name=f"remote-{name}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise RemoteTimeoutError(f"{name} timed out after {timeout}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+class CircuitBreaker:
+    """Tracks the health of a remote and fails calls fast while it is unhealthy."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        timeout: Optional[float] = None
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name of the remote.
+            failure_threshold: Consecutive failures after which the circuit opens.
+            reset_timeout: Time in seconds an open circuit waits before a trial call.
+            timeout: Default timeout in seconds of calls made through the breaker.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.last_error = None
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Return 'closed', 'open' or 'half_open'."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Return whether a call may be made now.
+
+        While the circuit is half open, only one trial call is allowed at a time.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """Record a failed call, opening the circuit at the failure threshold."""
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if isinstance(error, RemoteTimeoutError):
+                self.timeouts += 1
+            if error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"
+            # A failed trial reopens the circuit for another reset_timeout
+            if self._trial_running or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    print(f"Remote '{self.name}' marked unhealthy: {self.last_error}")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def call(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Call a function through the breaker.
+
+        Args:
+            func: Function calling the remote.
+            *args: Positional arguments of the function.
+            timeout: Timeout in seconds. If None, uses the breaker's timeout.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            RemoteTimeoutError: If the call timed out.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Remote '{self.name}' is unavailable")
+        try:
+            result = call_with_timeout(
+                func, timeout if timeout is not None else self.timeout, *args, **kwargs
+            )
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def reset(self) -> None:
+        """Close the circuit and clear the failure count."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state and call counters of the breaker."""
+        with self._lock:
+            return {
+                "state": self._state(),
+                "timeout": self.timeout,
+                "consecutive_failures": self._consecutive_failures,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "successes": self.successes,
+                "rejected": self.rejected,
+                "last_error": self.last_error
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Return the process-wide breaker of a remote, creating it on first use.
+
+    Args:
+        name: Name of the remote, e.g. 'mlflow', 'dagshub' or 'dvc_remote'.
+
+    Returns:
+        The breaker, configured from the environment.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(_env_float(name, "FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+                reset_timeout=_env_float(name, "RESET_TIMEOUT", DEFAULT_RESET_TIMEOUT),
+                timeout=remote_timeout(name)
+            )
+        return _breakers[name]
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every breaker created so far, by remote name."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
@@ -0,0 +1,185 @@
+"""Compressed columnar data snapshots with delta encoding for AgriPreserve.
+
+A snapshot is a Parquet file. A full snapshot holds every row of a data frame. A
+delta snapshot holds only the rows added or changed since its base snapshot, and
+names its base and the index labels of the removed rows in the file's metadata.
+Snapshots are self-describing, so any snapshot can be reconstructed from its
+path by applying the chain of deltas to the full snapshot it starts from. Chains
+are capped at max_chain deltas, after which a full snapshot is written again.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+SNAPSHOT_FORMATS = ("csv", "parquet", "delta")
+
+# Key of the snapshot description in the Parquet schema metadata
+METADATA_KEY = b"agripreserve.snapshot"
+
+DEFAULT_COMPRESSION = "zstd"
+
+# Deltas applied on top of a full snapshot before a full snapshot is written again
+DEFAULT_MAX_CHAIN = 10
+
+# A delta is only written when it changes at most this fraction of the rows
+MAX_DELTA_FRACTION = 0.5
+
+# Reconstructed snapshots kept in memory, as the latest one is the base of the next
+_CACHE_SIZE = 8
+_cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _write_parquet(frame: pd.DataFrame, path: str, info: Dict[str, Any], compression: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(info).encode()
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+
+
+def _read_parquet(path: str):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    info = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{"kind": "full"}'))
+    return table.to_pandas(), info
+
+
+def _remember(path: str, frame: pd.DataFrame):
+    key = os.path.abspath(path)
+    with _cache_lock:
+        _cache[key] = frame
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _changed_rows(frame: pd.DataFrame, base: pd.DataFrame) -> Optional[pd.Index]:
+    """
+    Return the index labels of the rows of frame that are new or differ from base.
+
+    Returns:
+        The labels, or None if the frames cannot be delta encoded: different
+        columns or dtypes, duplicate labels, or rows reordered.
+    """
+    if list(frame.columns) != list(base.columns) or not frame.dtypes.equals(base.dtypes):
+        return None
+    if not frame.index.is_unique or not base.index.is_unique:
+        return None
+
+    kept = base.index[base.index.isin(frame.index)]
+    added = frame.index[~frame.index.isin(base.index)]
+    # Reconstruction keeps the base order and appends added rows
+    if not frame.index.equals(kept.append(added)):
+        return None
+
+    old = base.loc[kept]
+    new = frame.loc[kept]
+    differs = (new != old) & ~(new.isna() & old.isna())
+    return kept[differs.any(axis=1).to_numpy()].append(added)
+
+
+def write_snapshot(
+    frame: pd.DataFrame,
+    path: str,
+    base_path: Optional[str] = None,
+    max_chain: int = DEFAULT_MAX_CHAIN,
+    compression: str = DEFAULT_COMPRESSION
+) -> Dict[str, Any]:
+    """
+    Write a snapshot of a data frame.
+
+    Args:
+        frame: Data frame to snapshot.
+        path: Path of the Parquet file to write.
+        base_path: Previous snapshot of the same data. If given, only the rows
+                   changed since it are written, unless the delta would not be
+                   smaller or the chain of deltas reached max_chain.
+        max_chain: Maximum number of deltas between two full snapshots.
+        compression: Parquet compression codec.
+
+    Returns:
+        Description of the snapshot: 'kind' ('full' or 'delta'), 'rows' and, for
+        deltas, 'base', 'depth', 'changed' and 'removed'.
+    """
+    info = {"kind": "full", "rows": len(frame)}
+
+    if base_path is not None and os.path.exists(base_path):
+        base_info = read_snapshot_info(base_path)
+        depth = base_info.get("depth", 0) + 1
+        if depth <= max_chain:
+            base = read_snapshot(base_path)
+            changed = _changed_rows(frame, base)
+            if changed is not None and len(changed) <= MAX_DELTA_FRACTION * max(len(frame), 1):
+                removed = base.index[~base.index.isin(frame.index)]
+                info = {
+                    "kind": "delta",
+                    "rows": len(frame),
+                    # Relative, so snapshot directories can be moved or pulled elsewhere
+                    "base": os.path.relpath(base_path, os.path.dirname(os.path.abspath(path))),
+                    "depth": depth,
+                    "changed": len(changed),
+                    "removed": removed.tolist()
+                }
+                _write_parquet(frame.loc[changed], path, info, compression)
+                _remember(path, frame.copy())
+                return dict(info, removed=len(removed))
+
+    _write_parquet(frame, path, info, compression)
+    _remember(path, frame.copy())
+    return info
+
+
+def read_snapshot_info(path: str) -> Dict[str, Any]:
+    """Return the description stored in a snapshot, without reading its rows."""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(METADATA_KEY, b'{"kind": "full"}'))
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """
+    Reconstruct the data frame of a snapshot.
+
+    CSV files are read as they are. Delta snapshots are applied to their
+    reconstructed base; recently written or read snapshots come from memory.
+
+    Args:
+        path: Path of the snapshot.
+
+    Returns:
+        The data frame as it was snapshotted.
+    """
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+
+    key = os.path.abspath(path)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key].copy()
+
+    rows, info = _read_parquet(path)
+    if info["kind"] == "delta":
+        base = read_snapshot(os.path.join(os.path.dirname(key), info["base"]))
+        frame = base.drop(index=info["removed"])
+        updated = rows.index[rows.index.isin(frame.index)]
+        frame.loc[updated] = rows.loc[updated]
+        frame = pd.concat([frame, rows.loc[~rows.index.isin(frame.index)]])
+        frame = frame.astype(rows.dtypes.to_dict())
+    else:
+        frame = rows
+
+    _remember(path, frame)
+    return frame.copy()
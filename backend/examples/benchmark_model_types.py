@@ -0,0 +1,112 @@
+"""Benchmark training time, inference latency and accuracy of the model types.
+
+Usage:
+    python examples/benchmark_model_types.py [--districts-per-state N]
+
+With --districts-per-state, every state is split into N synthetic districts so the
+number of State categories grows the way it would at district (LGA) granularity.
+HistGradientBoostingRegressor supports at most 255 categories per feature.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the path so we can import the agripreserve package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agripreserve.data.loader import load_datasets
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+MODEL_TYPES = ["random_forest", "linear", "hist_gradient_boosting"]
+CROPS = ["Maize", "Rice", "Sorghum", "Millet"]
+
+
+def split_into_districts(loss_percentage_df, loss_tonnes_df, districts_per_state, seed=42):
+    """Split every state into synthetic districts with perturbed losses."""
+    rng = np.random.RandomState(seed)
+    percentage_parts, tonnes_parts = [], []
+
+    for i in range(districts_per_state):
+        percentage = loss_percentage_df.copy()
+        tonnes = loss_tonnes_df.copy()
+        percentage["State"] = percentage["State"] + f" District {i + 1}"
+        tonnes["State"] = tonnes["State"] + f" District {i + 1}"
+        for crop in CROPS:
+            percentage[crop] = percentage[crop] * rng.uniform(0.8, 1.2, len(percentage))
+            tonnes[crop] = tonnes[crop] / districts_per_state * rng.uniform(0.5, 1.5, len(tonnes))
+        percentage_parts.append(percentage)
+        tonnes_parts.append(tonnes)
+
+    return (
+        pd.concat(percentage_parts, ignore_index=True),
+        pd.concat(tonnes_parts, ignore_index=True)
+    )
+
+
+def benchmark(model_type, loss_percentage_df, loss_tonnes_df, model_dir, n_latency=200,
+              n_batch=10000):
+    """Train a model type and measure its cost and accuracy."""
+    model = LossPredictionModel(model_type=model_type, model_dir=model_dir)
+
+    start = time.perf_counter()
+    metrics = model.train(loss_percentage_df, loss_tonnes_df, track_with_mlflow=False)
+    train_seconds = time.perf_counter() - start
+
+    X_train, _, _, _ = model._prepare_data(loss_percentage_df, loss_tonnes_df)
+    n_columns = model.preprocessor.transform(X_train.head(1)).shape[1]
+
+    sample = X_train.iloc[0]
+    latencies = []
+    for _ in range(n_latency):
+        start = time.perf_counter()
+        model.predict(sample["State"], sample["Region"], sample["Crop"], sample["Loss_Tonnes"])
+        latencies.append(time.perf_counter() - start)
+
+    batch = X_train.sample(n_batch, replace=True, random_state=42)
+    start = time.perf_counter()
+    model.predict_many(batch)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "model_type": model_type,
+        "features": n_columns,
+        "train_s": train_seconds,
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p95_ms": np.percentile(latencies, 95) * 1000,
+        "batch_rows_per_s": n_batch / batch_seconds,
+        "rmse": metrics["rmse"],
+        "r2": metrics["r2"]
+    }
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--districts-per-state", type=int, default=1,
+                        help="Number of synthetic districts per state")
+    args = parser.parse_args()
+
+    loss_percentage_df, loss_tonnes_df = load_datasets()
+    if args.districts_per_state > 1:
+        loss_percentage_df, loss_tonnes_df = split_into_districts(
+            loss_percentage_df, loss_tonnes_df, args.districts_per_state
+        )
+    print(f"Benchmarking with {loss_percentage_df['State'].nunique()} State categories\n")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        results = [
+            benchmark(model_type, loss_percentage_df, loss_tonnes_df, model_dir)
+            for model_type in MODEL_TYPES
+        ]
+
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda value: f"{value:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
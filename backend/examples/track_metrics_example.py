@@ -62,6 +62,11 @@ def main():
         print("\nTracked metrics:")
         for key, value in result["metrics"].items():
             print(f"  - {key}: {value:.2f}")
+        
+        # The push to DAGsHub runs in the background; wait for its result
+        push = tracker.wait_for_push()
+        if push is not None:
+            print(f"\nPush to DAGsHub {push['status']}: {push['last_message'] or push['output']}")
     else:
         print("Failed to track metrics.")
 
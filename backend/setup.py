@@ -19,6 +19,7 @@ setup(
         # Data analysis and visualization
         "pandas>=2.1.0",
         "numpy>=1.26.0",
+        "pyarrow>=14.0.0",
         "matplotlib>=3.8.0",
         "seaborn>=0.13.0",
         "plotly>=5.18.0",
@@ -0,0 +1,20 @@
+"""Shared fixtures for the AgriPreserve tests."""
+
+import pytest
+from agripreserve.data.loader import load_datasets
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+@pytest.fixture(scope="session")
+def datasets():
+    """Load the packaged datasets once per test session."""
+    return load_datasets()
+
+@pytest.fixture(scope="session")
+def trained_model_dir(tmp_path_factory, datasets):
+    """Train all model types into a temporary directory."""
+    model_dir = str(tmp_path_factory.mktemp("models"))
+    loss_percentage_df, loss_tonnes_df = datasets
+    for model_type in ["random_forest", "linear", "hist_gradient_boosting"]:
+        model = LossPredictionModel(model_type=model_type, model_dir=model_dir)
+        model.train(loss_percentage_df, loss_tonnes_df, track_with_mlflow=False)
+    return model_dir
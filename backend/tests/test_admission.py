@@ -0,0 +1,77 @@
+"""Tests for the admission control module."""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+from agripreserve.api.admission import AdmissionController
+from agripreserve.api.routes import create_app
+
+def test_limiter_sheds_when_queue_wait_expires():
+    """Test that a request is shed after waiting max_wait for a slot."""
+    async def scenario():
+        controller = AdmissionController(
+            route_limits={"/api/summary-statistics": {"max_concurrency": 1, "max_wait": 0.01}}
+        )
+        limiter = controller.limiter_for("/api/summary-statistics")
+        assert await controller.acquire(limiter)
+        assert not await controller.acquire(limiter)
+        controller.release(limiter)
+        assert await controller.acquire(limiter)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    route = stats["routes"]["/api/summary-statistics"]
+    assert route["admitted"] == 2
+    assert route["shed"] == 1
+    assert route["in_flight"] == 1
+
+def test_limiter_sheds_immediately_when_queue_full():
+    """Test that a request is shed without waiting when the queue is full."""
+    async def scenario():
+        controller = AdmissionController(
+            route_limits={"/api/crops": {"max_concurrency": 1, "max_queue": 0, "max_wait": 10.0}}
+        )
+        limiter = controller.limiter_for("/api/crops")
+        assert await controller.acquire(limiter)
+        return await asyncio.wait_for(controller.acquire(limiter), timeout=1.0)
+
+    assert asyncio.run(scenario()) is False
+
+def test_expensive_routes_shed_before_cheap():
+    """Test that slots reserved for cheap endpoints are not used by expensive ones."""
+    async def scenario():
+        controller = AdmissionController(max_total_concurrency=2, cheap_reserve=1)
+        expensive = controller.limiter_for("/api/crop-comparison")
+        cheap = controller.limiter_for("/api/crops")
+        assert await controller.acquire(expensive)
+        assert not await controller.acquire(expensive)
+        assert await controller.acquire(cheap)
+        assert not await controller.acquire(cheap)
+
+    asyncio.run(scenario())
+
+def test_templated_routes_match_by_prefix():
+    """Test that a parameterised route limits every path it matches."""
+    controller = AdmissionController()
+    limiter = controller.limiter_for("/api/metrics/trend/rmse")
+    assert limiter is controller.limiters["/api/metrics/trend/{name}"]
+    assert controller.limiter_for("/api/metrics/trend/") is None
+    assert controller.limiter_for("/api/metrics/trend/rmse/extra") is None
+    assert controller.limiter_for("/api/metrics/names").priority == "cheap"
+
+def test_over_capacity_returns_503():
+    """Test that the API responds with 503 and Retry-After when over capacity."""
+    app = create_app(route_limits={"/api/crop-comparison": {"max_concurrency": 0, "max_queue": 0}})
+    client = TestClient(app)
+
+    response = client.get("/api/crop-comparison")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Cheap endpoints are unaffected
+    assert client.get("/api/crops").status_code == 200
+
+    stats = client.get("/api/stats").json()["admission"]
+    assert stats["shed"] == 1
+    assert stats["routes"]["/api/crop-comparison"]["shed"] == 1
+    assert stats["queue_depth"] == 0
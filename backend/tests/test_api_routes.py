@@ -177,3 +177,26 @@ def test_get_crop_comparison(client):
     # Check that all crops are included
     crops = [item["crop"] for item in data]
     assert all(crop in crops for crop in ["Maize", "Rice", "Sorghum", "Millet"])
+
+def test_metrics_history_endpoints(tmp_path):
+    """Test the metrics history, diff and trend endpoints."""
+    app = create_app(metrics_db=str(tmp_path / "metrics.db"), preload_models=False)
+    store = app.state.metrics_store
+    store.record({"total_food_loss_tonnes": 100.0}, snapshot="aaa", timestamp="20250101_000000")
+    store.record({"total_food_loss_tonnes": 120.0}, snapshot="bbb", timestamp="20250201_000000")
+    client = TestClient(app)
+
+    response = client.get("/api/metrics/history", params={"names": ["total_food_loss_tonnes"]})
+    assert response.status_code == 200
+    assert len(response.json()["history"]["total_food_loss_tonnes"]) == 2
+
+    response = client.get("/api/metrics/diff", params={"before": "aaa", "after": "bbb"})
+    assert response.json()["metrics"]["total_food_loss_tonnes"]["change"] == 20.0
+    assert client.get("/api/metrics/diff", params={"before": "aaa", "after": "zzz"}).status_code == 404
+    response = client.get("/api/metrics/diff", params={"before": "id:1", "after": "bbb"})
+    assert response.json()["metrics"]["total_food_loss_tonnes"]["change"] == 20.0
+    assert client.get("/api/metrics/diff", params={"before": "id:x", "after": "bbb"}).status_code == 400
+
+    response = client.get("/api/metrics/trend/total_food_loss_tonnes", params={"points": 1})
+    assert response.json()["trend"][0]["count"] == 2
+    assert client.get("/api/metrics/names").json() == {"names": ["total_food_loss_tonnes"]}
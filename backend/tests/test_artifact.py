@@ -0,0 +1,86 @@
+"""Tests for compact model artifacts."""
+
+import os
+
+import numpy as np
+import pytest
+from agripreserve.models.artifact import export_artifact, load_artifact
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+@pytest.fixture
+def inputs(datasets):
+    """Inputs covering every state and crop plus an unknown state."""
+    loss_percentage_df, _ = datasets
+    states, regions, crops, tonnes = [], [], [], []
+    for i, (state, region) in enumerate(zip(loss_percentage_df["State"], loss_percentage_df["Region"])):
+        for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
+            states.append(state)
+            regions.append(region)
+            crops.append(crop)
+            tonnes.append(37.5 * (i + 1))
+    states.append("Atlantis")
+    regions.append("Unknown")
+    crops.append("Rice")
+    tonnes.append(5.0)
+    return states, regions, crops, tonnes
+
+@pytest.mark.parametrize("model_type", ["random_forest", "linear"])
+@pytest.mark.parametrize("compress", [False, True])
+def test_artifact_matches_pipeline(trained_model_dir, tmp_path, inputs, model_type, compress):
+    """Test that compact artifacts predict the same as the pipeline."""
+    model = LossPredictionModel(model_type=model_type, model_dir=trained_model_dir)
+    model.load()
+    expected = model.compiled.predict(*inputs)
+
+    path = export_artifact(model.model, str(tmp_path / "artifact"), compress=compress)
+    predictor = load_artifact(path)
+    np.testing.assert_allclose(predictor.predict(*inputs), expected)
+
+def test_artifact_arrays_are_memory_mapped(trained_model_dir, tmp_path):
+    """Test that uncompressed tree arrays are mapped read-only."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    model.load()
+    path = export_artifact(model.model, str(tmp_path / "artifact"))
+
+    forest = load_artifact(path).estimator
+    assert forest.n_trees == 100
+    assert isinstance(forest.threshold, np.memmap)
+    assert not forest.threshold.flags.writeable
+
+def test_model_loads_compact_artifact(trained_model_dir, inputs):
+    """Test that training writes a compact artifact the model can serve from."""
+    full = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    full.load()
+    assert os.path.isdir(full.artifact_path)
+
+    compact = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    assert compact.load(compact=True)
+    assert compact.model is None
+    np.testing.assert_allclose(compact.predict_many(*inputs), full.predict_many(*inputs))
+
+def test_unsupported_model_types_are_not_exported(trained_model_dir, tmp_path):
+    """Test that gradient boosting pipelines are rejected."""
+    model = LossPredictionModel(model_type="hist_gradient_boosting", model_dir=trained_model_dir)
+    model.load()
+    assert not os.path.exists(model.artifact_path)
+    with pytest.raises(ValueError):
+        export_artifact(model.model, str(tmp_path / "artifact"))
+
+def test_reexport_does_not_change_mapped_artifact(trained_model_dir, tmp_path, inputs):
+    """Test that replacing an artifact leaves models that mapped the old one intact."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    model.load()
+    path = export_artifact(model.model, str(tmp_path / "artifact"))
+    served = load_artifact(path)
+    expected = served.predict(*inputs)
+
+    smaller = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    smaller.load()
+    smaller.model.named_steps["model"].estimators_ = smaller.model.named_steps["model"].estimators_[:5]
+    export_artifact(smaller.model, path, compress=True)
+    np.testing.assert_allclose(served.predict(*inputs), expected)
+
+    # Switching to a compressed archive leaves no stale arrays behind
+    assert sorted(os.listdir(path)) == ["arrays.npz", "manifest.json"]
+    assert load_artifact(path).estimator.n_trees == 5
+    assert [name for name in os.listdir(tmp_path) if name != "artifact"] == []
@@ -0,0 +1,139 @@
+"""Tests for asynchronous MLflow logging."""
+
+import os
+import pytest
+from agripreserve.utils import async_tracking
+from agripreserve.utils.async_tracking import AsyncMlflowLogger
+
+
+class RecordingClient:
+    """MLflow client double recording log_batch calls."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.artifacts = []
+
+    def log_batch(self, run_id, metrics=(), params=()):
+        if self.fail:
+            raise ConnectionError("tracking server unreachable")
+        self.batches.append((run_id, list(metrics), list(params)))
+
+    def log_artifact(self, run_id, path):
+        if self.fail:
+            raise ConnectionError("tracking server unreachable")
+        self.artifacts.append((run_id, path))
+
+    def log_artifacts(self, run_id, local_dir, artifact_path=None):
+        if self.fail:
+            raise ConnectionError("tracking server unreachable")
+        self.artifacts.append((run_id, artifact_path, sorted(os.listdir(local_dir))))
+
+
+@pytest.fixture
+def spool_path(tmp_path):
+    return str(tmp_path / "spool" / "spool.jsonl")
+
+
+def test_writes_are_coalesced_per_run(spool_path):
+    """Test that queued metrics and params of a run are sent in one call."""
+    client = RecordingClient()
+    logger = AsyncMlflowLogger(spool_path, flush_interval=0.2, replay_interval=3600, client=client)
+    try:
+        logger.log_params("run", {"model_type": "random_forest"})
+        for step in range(5):
+            logger.log_metrics("run", {"rmse": 1.0 / (step + 1)}, step=step)
+        logger.log_metrics("other", {"rmse": 2.0})
+        assert logger.flush(timeout=5)
+    finally:
+        logger.close()
+
+    by_run = {run_id: (metrics, params) for run_id, metrics, params in client.batches}
+    assert len(client.batches) == 2
+    assert [metric.step for metric in by_run["run"][0]] == [0, 1, 2, 3, 4]
+    assert by_run["run"][1][0].value == "random_forest"
+    assert not os.path.exists(spool_path)
+
+
+def test_unreachable_server_spools_and_replays(spool_path, tmp_path):
+    """Test that records are spooled while the server fails and replayed later."""
+    artifact = tmp_path / "metrics.json"
+    artifact.write_text("{}")
+    client = RecordingClient(fail=True)
+    logger = AsyncMlflowLogger(spool_path, flush_interval=0.05, replay_interval=3600, client=client)
+    try:
+        logger.log_metrics("run", {"rmse": 1.0})
+        logger.log_artifacts("run", [str(artifact)])
+        assert logger.flush(timeout=5)
+        assert not logger.healthy
+        assert logger.stats()["spooled"] == 2
+
+        # Once unhealthy, records go straight to the spool
+        logger.log_params("run", {"n_estimators": 100})
+        assert logger.flush(timeout=5)
+        assert client.batches == []
+
+        client.fail = False
+        assert logger.replay() == 3
+        assert logger.healthy
+        assert not os.path.exists(spool_path)
+        assert client.artifacts == [("run", str(artifact))]
+        assert len(client.batches) == 1
+    finally:
+        logger.close()
+
+
+def test_partially_sent_run_spools_only_unsent_chunks(spool_path, monkeypatch):
+    """Test that chunks sent before a failure are not logged again on replay."""
+    class FailingOnSecondBatch(RecordingClient):
+        calls = 0
+
+        def log_batch(self, run_id, metrics=(), params=()):
+            self.calls += 1
+            if self.calls == 2:
+                raise ConnectionError("tracking server unreachable")
+            super().log_batch(run_id, metrics, params)
+
+    monkeypatch.setattr(async_tracking, "MAX_METRICS_PER_BATCH", 2)
+    client = FailingOnSecondBatch()
+    logger = AsyncMlflowLogger(spool_path, flush_interval=0.2, replay_interval=3600, client=client)
+    try:
+        logger.log_params("run", {"model_type": "random_forest"})
+        for step in range(5):
+            logger.log_metrics("run", {"rmse": float(step)}, step=step)
+        assert logger.flush(timeout=5)
+        assert not logger.healthy
+        assert len(client.batches) == 1
+        assert logger.replay() > 0
+    finally:
+        logger.close()
+
+    sent = [(metric.step, metric.value) for _, metrics, _ in client.batches for metric in metrics]
+    assert sorted(sent) == [(step, float(step)) for step in range(5)]
+    params = [param.key for _, _, params in client.batches for param in params]
+    assert params == ["model_type"]
+
+
+def test_model_is_saved_and_uploaded_in_background(spool_path):
+    """Test that models are saved by the logging thread and survive a replay."""
+    def save(path):
+        os.makedirs(path)
+        with open(os.path.join(path, "MLmodel"), "w") as f:
+            f.write("flavors: {}")
+
+    client = RecordingClient(fail=True)
+    logger = AsyncMlflowLogger(spool_path, flush_interval=0.05, replay_interval=3600, client=client)
+    try:
+        logger.log_model("run", save)
+        assert logger.flush(timeout=5)
+        assert logger.stats()["spooled"] == 1
+        staged = os.path.join(os.path.dirname(spool_path), "models")
+        assert len(os.listdir(staged)) == 1
+
+        client.fail = False
+        assert logger.replay() == 1
+        assert client.artifacts == [("run", "model", ["MLmodel"])]
+        # Uploaded models are not kept locally
+        assert os.listdir(staged) == []
+    finally:
+        logger.close()
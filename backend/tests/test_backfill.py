@@ -0,0 +1,109 @@
+"""Tests for the historical metrics backfill."""
+
+import json
+import os
+import pandas as pd
+import pytest
+from agripreserve.utils import backfill as backfill_module
+from agripreserve.utils.backfill import backfill, discover_snapshots, load_manifest, read_checkpoint
+from agripreserve.utils.metrics_store import MetricsStore
+from agripreserve.utils.snapshots import write_snapshot
+
+
+def make_frames(maize):
+    percentage = pd.DataFrame({
+        "State": ["Kano", "Lagos"],
+        "Maize": [10.5, 8.0], "Rice": [12.0, 0.0], "Sorghum": [9.0, 7.5], "Millet": [11.0, 6.0]
+    })
+    tonnes = pd.DataFrame({
+        "State": ["Kano", "Lagos"],
+        "Maize": [maize, 500.0], "Rice": [800.0, 0.0], "Sorghum": [700.0, 300.0], "Millet": [600.0, 200.0]
+    })
+    return percentage, tonnes
+
+
+@pytest.fixture
+def releases(tmp_path):
+    """Three APHLIS releases, one per subdirectory."""
+    root = tmp_path / "releases"
+    for year, maize in [(2020, 1000.0), (2021, 1100.0), (2022, 1200.0)]:
+        release = root / str(year)
+        release.mkdir(parents=True)
+        percentage, tonnes = make_frames(maize)
+        percentage.to_csv(release / f"aphlis-{year}-dry-weight-losses_in_percentage.csv", index=False)
+        tonnes.to_csv(release / f"aphlis-{year}-dry-weight-losses_in_tonnes.csv", index=False)
+    return root
+
+
+def test_discover_tracked_and_release_snapshots(tmp_path, releases):
+    """Test that tracker snapshot pairs and release directories are both found."""
+    percentage, tonnes = make_frames(900.0)
+    write_snapshot(percentage, str(releases / "loss_percentage_20190101_000000.parquet"))
+    write_snapshot(tonnes, str(releases / "loss_tonnes_20190101_000000.parquet"))
+    # Without its pair, a file is not a snapshot
+    tonnes.to_csv(releases / "loss_tonnes_20180101_000000.csv", index=False)
+
+    entries = discover_snapshots(str(releases))
+    assert [entry["key"] for entry in entries] == ["20190101_000000", "2020", "2021", "2022"]
+    assert entries[0]["timestamp"] == "20190101_000000"
+    assert pd.Timestamp.fromtimestamp(entries[1]["recorded_at"]).year == 2020
+
+
+def test_backfill_records_metrics_in_parallel(tmp_path, releases):
+    """Test that metrics are computed in worker processes and written in batches."""
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    batches = []
+
+    summary = backfill(
+        discover_snapshots(str(releases)), store, checkpoint, workers=2, batch_size=2,
+        on_progress=batches.append
+    )
+
+    assert summary["written"] == 3 and summary["failed"] == 0
+    assert [progress["written"] for progress in batches] == [2, 3]
+    assert read_checkpoint(checkpoint) == {"2020", "2021", "2022"}
+    trend = store.trend("total_food_loss_tonnes")
+    assert [point["last"] for point in trend] == [4100.0, 4200.0, 4300.0]
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path, releases, monkeypatch):
+    """Test that a rerun skips written snapshots and retries failed ones."""
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    entries = discover_snapshots(str(releases))
+    os.rename(entries[1]["tonnes"], entries[1]["tonnes"] + ".missing")
+
+    first = backfill(entries, store, checkpoint, workers=1)
+    assert first["written"] == 2
+    assert list(first["errors"]) == ["2021"]
+
+    os.rename(entries[1]["tonnes"] + ".missing", entries[1]["tonnes"])
+    computed = []
+    compute = backfill_module.compute_snapshot_metrics
+    monkeypatch.setattr(
+        backfill_module, "compute_snapshot_metrics",
+        lambda entry: computed.append(entry["key"]) or compute(entry)
+    )
+    second = backfill(entries, store, checkpoint, workers=1)
+    assert computed == ["2021"]
+    assert second["skipped"] == 2 and second["written"] == 1
+    assert len(store.snapshots()) == 3
+
+
+def test_load_manifest(tmp_path, releases):
+    """Test that manifest paths are resolved against the manifest's directory."""
+    manifest = releases / "manifest.jsonl"
+    manifest.write_text("\n".join(json.dumps({
+        "key": year,
+        "percentage": f"{year}/aphlis-{year}-dry-weight-losses_in_percentage.csv",
+        "tonnes": f"{year}/aphlis-{year}-dry-weight-losses_in_tonnes.csv",
+        "timestamp": f"{year}0101_000000"
+    }) for year in ["2020", "2021"]))
+
+    entries = load_manifest(str(manifest))
+    assert os.path.exists(entries[0]["tonnes"])
+
+    manifest.write_text(json.dumps([{"key": "2020", "tonnes": "t.csv"}]))
+    with pytest.raises(ValueError):
+        load_manifest(str(manifest))
@@ -0,0 +1,101 @@
+"""Tests for the micro-batching module."""
+
+import asyncio
+
+import pytest
+from agripreserve.api.batching import MicroBatcher
+from agripreserve.utils.histogram import Histogram
+
+def test_concurrent_submissions_share_a_batch():
+    """Test that items submitted within the window are scored in one call."""
+    calls = []
+
+    def predict_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, batch_window_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert stats["batches"] == 1
+    assert stats["batch_size"]["count"] == 1
+    assert stats["batch_size"]["buckets"]["le_8"] == 1
+    assert stats["queue_wait_ms"]["count"] == 5
+
+def test_batches_are_capped_at_max_batch_size():
+    """Test that a full batch is run without waiting for the window."""
+    calls = []
+
+    def predict_fn(items):
+        calls.append(len(items))
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=3, batch_window_ms=10000)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(6))), timeout=5
+        )
+        await batcher.close()
+        return results
+
+    assert asyncio.run(scenario()) == list(range(6))
+    assert calls == [3, 3]
+
+def test_errors_are_propagated_to_every_caller():
+    """Test that a failing batch raises for each caller."""
+    def predict_fn(items):
+        raise ValueError("Model not trained or loaded")
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, batch_window_ms=10)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_bad_item_fails_only_its_caller():
+    """Test that one bad item in a concurrent batch does not fail the other callers."""
+    calls = []
+
+    def predict_fn(items):
+        calls.append(len(items))
+        if "unknown" in items:
+            raise ValueError("Unknown state: unknown")
+        return [item.upper() for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, batch_window_ms=50)
+        items = ["kano", "lagos", "unknown", "oyo", "kaduna"]
+        results = await asyncio.gather(
+            *(batcher.submit(item) for item in items), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[:2] == ["KANO", "LAGOS"]
+    assert isinstance(results[2], ValueError)
+    assert results[3:] == ["OYO", "KADUNA"]
+    # The good items are scored in batches, not one at a time
+    assert calls == [5, 2, 3, 1, 2]
+
+def test_histogram_snapshot():
+    """Test histogram bucketing."""
+    histogram = Histogram([1, 10])
+    for value in [0.5, 1, 5, 50]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"le_1": 2, "le_10": 1, "le_inf": 1}
+    assert snapshot["count"] == 4
+    assert snapshot["mean"] == pytest.approx(56.5 / 4)
@@ -27,3 +27,66 @@ def test_main_default(mock_run_api):
             port=8001, 
             allow_origins='http://localhost:3000,http://localhost:5173'
         )
+
+@patch('agripreserve.cli.run_train')
+def test_main_train(mock_run_train):
+    """Test the train command."""
+    mock_run_train.return_value = {"status": "queued"}
+    with patch('sys.argv', ['agripreserve', 'train', '--model-types', 'linear', '--wait']):
+        main()
+        mock_run_train.assert_called_once_with(
+            server='http://localhost:8001',
+            model_types='linear',
+            track_with_mlflow=False,
+            wait=True,
+            timeout=30.0
+        )
+
+@patch('requests.get')
+@patch('requests.post')
+def test_run_train_polls_until_done(mock_post, mock_get):
+    """Test that run_train submits a job and polls its status."""
+    from agripreserve.cli import run_train
+    mock_post.return_value = MagicMock(status_code=202, json=lambda: {
+        "job_id": "abc", "status": "queued", "progress": 0.0
+    })
+    mock_get.return_value = MagicMock(json=lambda: {
+        "job_id": "abc", "status": "succeeded", "progress": 1.0,
+        "metrics": {"linear": {"rmse": 1.0}}
+    })
+
+    job = run_train(model_types="linear", wait=True, poll_interval=0)
+
+    assert job["status"] == "succeeded"
+    assert mock_post.call_args.kwargs["json"]["model_types"] == ["linear"]
+    mock_get.assert_called_once_with("http://localhost:8001/api/train/abc", timeout=30.0)
+    assert mock_post.call_args.kwargs["timeout"] == 30.0
+
+@patch('requests.get')
+@patch('requests.post')
+def test_run_train_handles_unresponsive_server(mock_post, mock_get):
+    """Test that a server that times out ends run_train with an error instead of hanging."""
+    import requests
+    from agripreserve.cli import run_train
+    mock_post.return_value = MagicMock(status_code=202, json=lambda: {
+        "job_id": "abc", "status": "queued", "progress": 0.0
+    })
+    mock_get.side_effect = requests.Timeout("read timed out")
+
+    assert run_train(wait=True, poll_interval=0, timeout=1.0) is None
+    mock_get.assert_called_once_with("http://localhost:8001/api/train/abc", timeout=1.0)
+
+@patch('agripreserve.cli.run_backfill')
+def test_main_backfill(mock_run_backfill):
+    """Test the backfill command."""
+    mock_run_backfill.return_value = {"failed": 0}
+    with patch('sys.argv', ['agripreserve', 'backfill', 'releases', '--workers', '4', '--restart']):
+        main()
+        mock_run_backfill.assert_called_once_with(
+            'releases',
+            metrics_db='metrics/metrics.db',
+            checkpoint=None,
+            workers=4,
+            batch_size=100,
+            restart=True
+        )
@@ -0,0 +1,169 @@
+"""Tests for DVC utilities."""
+
+import os
+import time
+import pytest
+from agripreserve.utils import dvc_utils
+from agripreserve.utils.resilience import get_breaker
+
+
+@pytest.fixture
+def git_calls(monkeypatch):
+    """Record git commands instead of running them."""
+    calls = []
+
+    def run(command, **kwargs):
+        calls.append(command)
+
+    monkeypatch.setattr(dvc_utils.subprocess, "run", run)
+    return calls
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in ["metrics.json", "loss_percentage.csv", "loss_tonnes.csv"]:
+        path = tmp_path / name
+        path.write_text("data")
+        paths.append(str(path))
+    return paths
+
+
+def fake_add(paths):
+    for path in paths:
+        with open(f"{path}.dvc", "w") as f:
+            f.write("outs: []\n")
+
+
+def test_track_files_batches_add_and_commit(monkeypatch, git_calls, files):
+    """Test that many paths are added in one DVC call and one commit."""
+    added = []
+    monkeypatch.setattr(
+        dvc_utils, "_add_in_process", lambda paths: added.append(paths) or fake_add(paths)
+    )
+
+    result = dvc_utils.track_files(files, "Add snapshot")
+
+    assert result["success"]
+    assert result["tracked"] == files
+    assert added == [files]
+    assert git_calls == [
+        ["git", "add"] + [f"{path}.dvc" for path in files],
+        ["git", "commit", "-m", "Add snapshot"]
+    ]
+
+
+def test_track_files_falls_back_to_dvc_command(monkeypatch, git_calls, files):
+    """Test that the dvc command is used when DVC cannot be imported."""
+    def add_in_process(paths):
+        raise ImportError("No module named 'dvc'")
+
+    commands = []
+
+    def run_dvc_command(command, timeout=None):
+        commands.append(command)
+        fake_add(command[1:])
+        return {"success": True, "stdout": "", "stderr": "", "returncode": 0}
+
+    monkeypatch.setattr(dvc_utils, "_add_in_process", add_in_process)
+    monkeypatch.setattr(dvc_utils, "run_dvc_command", run_dvc_command)
+
+    assert dvc_utils.track_files(files)["success"]
+    assert commands == [["add"] + files]
+    # No commit without a message
+    assert len(git_calls) == 1
+
+
+def test_track_files_add_times_out(monkeypatch, git_calls, files):
+    """Test that an in-process add is bounded by the 'dvc_add' timeout."""
+    monkeypatch.setenv("AGRIPRESERVE_DVC_ADD_TIMEOUT", "0.1")
+    monkeypatch.setattr(dvc_utils, "_add_in_process", lambda paths: time.sleep(2))
+
+    result = dvc_utils.track_files(files)
+    assert not result["success"]
+    assert "timed out" in result["output"]
+    assert git_calls == []
+
+
+def test_track_files_rejects_missing_paths(git_calls, files, tmp_path):
+    """Test that nothing is tracked when a path is missing."""
+    result = dvc_utils.track_files(files + [str(tmp_path / "missing.csv")])
+    assert not result["success"]
+    assert "missing.csv" in result["output"]
+    assert git_calls == []
+
+
+@pytest.fixture
+def fake_dvc(tmp_path, monkeypatch):
+    """Put a fake dvc executable on the PATH that logs its arguments."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "dvc"
+    script.write_text(
+        "#!/bin/sh\n"
+        f"echo \"$@\" >> {tmp_path / 'calls.log'}\n"
+        "echo \"Collecting\"\n"
+        "sleep ${FAKE_DVC_SLEEP:-0.2}\n"
+        "echo \"3 files pushed\"\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    breaker = get_breaker("dvc_remote")
+    breaker.reset()
+    yield tmp_path / "calls.log"
+    breaker.reset()
+
+
+def test_push_runs_in_background_with_progress(fake_dvc):
+    """Test that an async push returns immediately and reports its progress."""
+    first = dvc_utils.push_to_remote_async(jobs=8)
+    second = dvc_utils.push_to_remote_async(targets=["data/loss.csv.dvc"], after=first)
+    assert not first.done()
+    assert second.progress()["status"] == "queued"
+
+    result = second.wait(timeout=10)
+    assert result["success"]
+    assert first.done()
+    progress = second.progress()
+    assert progress["status"] == "succeeded"
+    assert progress["files_transferred"] == 3
+    assert progress["last_message"] == "3 files pushed"
+    # Transfers ran one after the other, with the requested parallelism
+    assert fake_dvc.read_text().splitlines() == ["push -j 8", "push data/loss.csv.dvc"]
+
+
+def test_async_push_times_out(fake_dvc, monkeypatch):
+    """Test that a hanging push is killed after the remote timeout."""
+    monkeypatch.setenv("FAKE_DVC_SLEEP", "10")
+    monkeypatch.setattr(get_breaker("dvc_remote"), "timeout", 0.3)
+
+    handle = dvc_utils.pull_from_remote_async()
+    result = handle.wait(timeout=5)
+    assert not result["success"]
+    assert "timed out" in result["output"]
+    assert handle.progress()["status"] == "failed"
+
+
+def test_pending_transfers_are_waited_for(fake_dvc):
+    """Test that background transfers still running can be waited for at exit."""
+    handle = dvc_utils.push_to_remote_async()
+    assert handle in dvc_utils._pending_transfers
+
+    assert dvc_utils.wait_for_transfers(timeout=10)
+    assert handle.progress()["status"] == "succeeded"
+    assert handle not in dvc_utils._pending_transfers
+
+
+def test_exit_wait_is_bounded(fake_dvc, monkeypatch, capsys):
+    """Test that the wait at exit gives up after its timeout and reports pending transfers."""
+    monkeypatch.setenv("FAKE_DVC_SLEEP", "2")
+    monkeypatch.setenv("AGRIPRESERVE_DVC_EXIT_TIMEOUT", "0.2")
+    handle = dvc_utils.push_to_remote_async(jobs=4)
+
+    start = time.monotonic()
+    dvc_utils._wait_at_exit()
+    assert time.monotonic() - start < 1.5
+    output = capsys.readouterr().out
+    assert "Warning: DVC push still running" in output
+    assert "dvc push -j 4" in output
+    assert handle.wait(timeout=10)["success"]
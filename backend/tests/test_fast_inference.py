@@ -0,0 +1,57 @@
+"""Tests for the compiled inference path."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from agripreserve.models.fast_inference import CompiledPredictor
+from agripreserve.models.loss_prediction_model import LossPredictionModel, FEATURE_COLUMNS
+
+@pytest.fixture
+def inputs(datasets):
+    """Every state and crop from the dataset plus some unknown categories."""
+    loss_percentage_df, _ = datasets
+    rows = []
+    for i, (state, region) in enumerate(zip(loss_percentage_df["State"], loss_percentage_df["Region"])):
+        for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
+            rows.append((state, region, crop, 100.0 * (i + 1)))
+    rows.append(("Atlantis", "Unknown", "Maize", 10.0))
+    rows.append(("Kano", "Northern", "Cassava", 0.0))
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+
+@pytest.mark.parametrize("model_type", ["random_forest", "linear", "hist_gradient_boosting"])
+def test_compiled_predictions_match_pipeline(trained_model_dir, inputs, model_type):
+    """Test that the compiled path matches the full pipeline."""
+    model = LossPredictionModel(model_type=model_type, model_dir=trained_model_dir)
+    assert model.load()
+    assert model.compiled is not None
+
+    expected = model.model.predict(inputs)
+    compiled = model.compiled.predict(
+        inputs["State"].tolist(), inputs["Region"].tolist(),
+        inputs["Crop"].tolist(), inputs["Loss_Tonnes"].tolist()
+    )
+    np.testing.assert_allclose(compiled, expected)
+    np.testing.assert_allclose(model.predict_many(inputs), expected)
+
+@pytest.mark.parametrize("model_type", ["random_forest", "hist_gradient_boosting"])
+def test_encode_matches_column_transformer(trained_model_dir, inputs, model_type):
+    """Test that the encoded matrix equals the ColumnTransformer output."""
+    model = LossPredictionModel(model_type=model_type, model_dir=trained_model_dir)
+    model.load()
+
+    expected = model.model.named_steps["preprocessor"].transform(inputs)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    encoded = model.compiled.encode(
+        inputs["State"].tolist(), inputs["Region"].tolist(),
+        inputs["Crop"].tolist(), inputs["Loss_Tonnes"].tolist()
+    )
+    np.testing.assert_array_equal(encoded, expected)
+
+def test_unsupported_pipeline_is_rejected(trained_model_dir):
+    """Test that pipelines without a OneHotEncoder cannot be compiled."""
+    model = LossPredictionModel(model_type="linear", model_dir=trained_model_dir)
+    model.load()
+    model.model.named_steps["preprocessor"].transformers_[0] = ("cat", "drop", ["State"])
+    with pytest.raises(ValueError):
+        CompiledPredictor.from_pipeline(model.model)
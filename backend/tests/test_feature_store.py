@@ -0,0 +1,45 @@
+"""Tests for the prepared feature store."""
+
+import numpy as np
+from agripreserve.models.feature_store import FeatureStore
+from agripreserve.utils.hashing import dataset_hash
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+
+def test_dataset_hash_tracks_content(datasets):
+    """Test that the hash changes with the data and only with the data."""
+    loss_percentage_df, loss_tonnes_df = datasets
+    changed = loss_tonnes_df.copy()
+    changed.iloc[0, changed.columns.get_loc("Maize")] += 1
+
+    assert dataset_hash(loss_percentage_df, loss_tonnes_df) == \
+        dataset_hash(loss_percentage_df.copy(), loss_tonnes_df.copy())
+    assert dataset_hash(loss_percentage_df, loss_tonnes_df) != \
+        dataset_hash(loss_percentage_df, changed)
+
+
+def test_features_are_reused_across_runs_and_variants(datasets, tmp_path):
+    """Test that training reuses stored features and matches training without a store."""
+    store = FeatureStore(str(tmp_path / "features"))
+    cached = LossPredictionModel(model_dir=str(tmp_path / "a"), feature_store=store)
+    cached_metrics = cached.train(*datasets, track_with_mlflow=False)
+    LossPredictionModel(model_dir=str(tmp_path / "a"), feature_store=store).train(
+        *datasets, track_with_mlflow=False
+    )
+    assert store.stats()["builds"] == 2  # the split and the one-hot features
+
+    # Another process sharing the directory loads the entries from disk
+    other_store = FeatureStore(str(tmp_path / "features"))
+    LossPredictionModel(
+        model_type="linear", model_dir=str(tmp_path / "a"), feature_store=other_store
+    ).train(*datasets, track_with_mlflow=False)
+    assert other_store.stats()["builds"] == 0
+    assert other_store.stats()["disk_hits"] == 1
+
+    plain = LossPredictionModel(model_dir=str(tmp_path / "b"))
+    plain_metrics = plain.train(*datasets, track_with_mlflow=False)
+    assert cached_metrics["rmse"] == plain_metrics["rmse"]
+    np.testing.assert_allclose(
+        cached.predict_many(["Kano"], ["Northern"], ["Maize"], [1000.0]),
+        plain.predict_many(["Kano"], ["Northern"], ["Maize"], [1000.0])
+    )
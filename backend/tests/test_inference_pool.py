@@ -0,0 +1,137 @@
+"""Tests for the out-of-process inference worker pool."""
+
+import threading
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+from agripreserve.api.routes import create_app
+from agripreserve.models.inference_pool import InferencePool
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+
+def test_pool_matches_in_process_predictions(trained_model_dir):
+    """Test that predictions from worker processes match in-process predictions."""
+    local = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    local.load(compact=True)
+    states = ["Kano", "Lagos", "Oyo"] * 40
+    regions = ["Northern", "Southern", "Southern"] * 40
+    crops = ["Maize", "Rice", "Millet"] * 40
+    tonnes = np.linspace(10, 50000, 120)
+    expected = local.predict_many(states, regions, crops, tonnes)
+
+    # A tiny buffer forces the batch to be split into chunks
+    pool = InferencePool(n_workers=2, model_dir=trained_model_dir, buffer_floats=500)
+    try:
+        generation, keys = pool.load(["random_forest", "linear", "missing"])
+        assert keys == ["linear", "random_forest"]
+
+        predictor = pool.predictor(generation, "random_forest", local.compiled)
+        np.testing.assert_allclose(predictor.predict(states, regions, crops, tonnes), expected)
+
+        # Predictors of the previous generation keep working after a reload
+        pool.load(["random_forest"])
+        np.testing.assert_allclose(predictor.predict(states, regions, crops, tonnes), expected)
+
+        stats = pool.stats()
+        assert stats["alive"] == 2
+        assert stats["rows"] == 240
+        assert stats["requests"] > 2
+        assert 0.0 < stats["utilization"] <= 1.0
+    finally:
+        pool.close()
+
+
+def test_api_serves_from_pool(trained_model_dir):
+    """Test that the API routes predictions through the worker pool."""
+    app = create_app(model_dir=trained_model_dir, inference_workers=1,
+                     prediction_cache_size=0)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=60)
+        response = client.post("/api/predict", json={
+            "state": "Kano", "crop": "Maize", "loss_tonnes": 1000
+        })
+        assert response.status_code == 200
+
+        stats = client.get("/api/stats").json()["inference_pool"]
+        assert stats["n_workers"] == 1
+        assert stats["rows"] > 0
+
+
+def test_exited_worker_falls_back_and_restarts(trained_model_dir):
+    """Test that a crashed worker does not fail requests and is replaced."""
+    local = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    local.load(compact=True)
+    inputs = (["Kano", "Lagos"], ["Northern", "Southern"], ["Maize", "Rice"], [100.0, 2500.0])
+    expected = local.predict_many(*inputs)
+
+    pool = InferencePool(n_workers=1, model_dir=trained_model_dir)
+    try:
+        generation, _ = pool.load(["random_forest"])
+        predictor = pool.predictor(generation, "random_forest", local.compiled)
+        pool._workers[0].process.kill()
+        pool._workers[0].process.join()
+
+        # Answered in process while the worker is restarted
+        np.testing.assert_allclose(predictor.predict(*inputs), expected)
+        assert pool.stats()["fallbacks"] == 1
+
+        np.testing.assert_allclose(predictor.predict(*inputs), expected)
+        stats = pool.stats()
+        assert stats["restarts"] == 1
+        assert stats["alive"] == 1
+        assert stats["fallbacks"] == 1
+    finally:
+        pool.close()
+
+
+def test_worker_exit_during_load_does_not_deadlock(trained_model_dir):
+    """Test that a worker exiting while a load waits for it is restarted and loaded."""
+    local = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    local.load(compact=True)
+    inputs = (["Kano"], ["Northern"], ["Maize"], [100.0])
+    expected = local.predict_many(*inputs)
+
+    pool = InferencePool(n_workers=1, model_dir=trained_model_dir)
+    try:
+        generation, _ = pool.load(["random_forest"])
+        predictor = pool.predictor(generation, "random_forest", local.compiled)
+        worker = pool._workers[0]
+        call = worker.call
+        predicting = threading.Event()
+        crash = threading.Event()
+
+        def crashing_call(message):
+            if message[0] == "predict":
+                predicting.set()
+                crash.wait(10)
+                worker.process.kill()
+                worker.process.join()
+            return call(message)
+
+        worker.call = crashing_call
+        results = {}
+        predict_thread = threading.Thread(
+            target=lambda: results.update(predicted=predictor.predict(*inputs))
+        )
+        predict_thread.start()
+        assert predicting.wait(10)
+
+        load_thread = threading.Thread(
+            target=lambda: results.update(loaded=pool.load(["random_forest"]))
+        )
+        load_thread.start()
+        # The load holds the pool lock while it waits for the busy worker
+        deadline = time.monotonic() + 10
+        while not pool._lock.locked() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        crash.set()
+
+        predict_thread.join(30)
+        load_thread.join(30)
+        assert not predict_thread.is_alive() and not load_thread.is_alive()
+        np.testing.assert_allclose(results["predicted"], expected)
+        assert results["loaded"] == (generation + 1, ["random_forest"])
+        assert pool.stats()["fallbacks"] == 1
+    finally:
+        pool.close()
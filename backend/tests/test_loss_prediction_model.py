@@ -0,0 +1,183 @@
+"""Tests for the loss prediction model."""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+from agripreserve.models.loss_prediction_model import LossPredictionModel, train_and_save_models
+
+def test_unknown_model_type_is_rejected(datasets, tmp_path):
+    """Test that training an unknown model type fails."""
+    model = LossPredictionModel(model_type="unknown", model_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        model.train(*datasets, track_with_mlflow=False)
+
+    with pytest.raises(ValueError):
+        train_and_save_models(model_types=["unknown"], track_with_mlflow=False)
+
+def test_random_forest_uses_worker_budget(datasets, tmp_path):
+    """Test that the random forest is fitted with the requested number of cores."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path), n_jobs=2)
+    model.train(*datasets, track_with_mlflow=False)
+    assert model.model.named_steps["model"].n_jobs == 2
+
+def test_train_and_save_models_in_parallel(tmp_path):
+    """Test that variants trained in a process pool are all saved."""
+    metrics = train_and_save_models(
+        model_types=["random_forest", "linear"],
+        max_workers=2,
+        model_dir=str(tmp_path),
+        track_with_mlflow=False
+    )
+
+    assert set(metrics) == {"random_forest", "linear"}
+    assert all("r2" in model_metrics for model_metrics in metrics.values())
+    for model_type in metrics:
+        assert os.path.exists(tmp_path / f"loss_prediction_{model_type}.joblib")
+
+def test_tune_with_successive_halving(datasets, tmp_path):
+    """Test that tuning halves candidates, grows the resource and saves the best model."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    search_space = {
+        "resource": "n_estimators",
+        "min_resource": 5,
+        "max_resource": 20,
+        "params": {"max_depth": [3, 5, 10, None], "min_samples_leaf": [1, 2]},
+    }
+    result = model.tune(
+        *datasets, search_space=search_space, cv=3, n_candidates=6, eta=2,
+        n_jobs=2, track_with_mlflow=False
+    )
+
+    rungs = [trial["rung"] for trial in result["trials"]]
+    assert rungs.count(0) == 6
+    assert rungs.count(1) == 3
+    assert result["trials"][-1]["params"]["n_estimators"] == 20
+    assert result["best_params"]["n_estimators"] == 20
+    assert model.model.named_steps["model"].n_estimators == 20
+    assert os.path.exists(model.model_path)
+
+def test_tune_respects_time_budget(datasets, tmp_path):
+    """Test that no trial is started after the budget is exhausted."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        model.tune(*datasets, time_budget=0, track_with_mlflow=False)
+
+    with pytest.raises(ValueError):
+        LossPredictionModel(model_type="linear").tune(*datasets, track_with_mlflow=False)
+
+def test_hist_gradient_boosting_uses_native_categoricals(trained_model_dir):
+    """Test that the gradient boosting model consumes ordinal-coded categoricals."""
+    model = LossPredictionModel(model_type="hist_gradient_boosting", model_dir=trained_model_dir)
+    assert model.load()
+
+    preprocessor = model.model.named_steps["preprocessor"]
+    assert type(preprocessor.named_transformers_["cat"]).__name__ == "OrdinalEncoder"
+    assert list(model.model.named_steps["model"].is_categorical_) == [True, True, True, False]
+
+    # Unknown categories are treated as missing values
+    prediction = model.predict("Atlantis", "Unknown", "Maize", 100.0)
+    assert prediction == prediction
+
+def test_distill_reports_fidelity(datasets, tmp_path):
+    """Test that the distilled model is saved and tracks the full model closely."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    model.train(*datasets, track_with_mlflow=False)
+    metrics = model.distill(*datasets, max_depth=6, n_tonnage_points=10)
+
+    assert metrics["fidelity_r2"] > 0.9
+    assert metrics["latency_ms"] < metrics["teacher_latency_ms"]
+
+    student = LossPredictionModel(model_type="random_forest_distilled", model_dir=str(tmp_path))
+    assert student.load(compact=True)
+    assert student.predict("Kano", "Northern", "Maize", 1000.0) == pytest.approx(
+        model.predict("Kano", "Northern", "Maize", 1000.0), abs=5.0
+    )
+
+def test_update_adds_trees_without_regression(datasets, tmp_path):
+    """Test that an incremental update adds trees and bumps the version when accepted."""
+    loss_percentage_df, loss_tonnes_df = datasets
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    model.train(loss_percentage_df, loss_tonnes_df, track_with_mlflow=False)
+    version = model.version
+    served = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    served.load(compact=True)
+    inputs = (["Kano", "Lagos"], ["Northern", "Southern"], ["Maize", "Rice"], [100.0, 250.0])
+    expected = served.predict_many(*inputs)
+
+    result = model.update(loss_percentage_df, loss_tonnes_df, n_new_estimators=10, tolerance=1.0)
+
+    assert result["accepted"]
+    assert result["version"] != version
+    assert len(model.model.named_steps["model"].estimators_) == 110
+
+    reloaded = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    assert reloaded.load()
+    assert len(reloaded.model.named_steps["model"].estimators_) == 110
+
+    # The files are replaced, not rewritten under the model serving from them
+    np.testing.assert_allclose(served.predict_many(*inputs), expected)
+    assert served.load(compact=True)
+    assert served.compiled.estimator.n_trees == 110
+    assert sorted(os.listdir(tmp_path)) == [
+        "loss_prediction_random_forest.compact", "loss_prediction_random_forest.joblib"
+    ]
+
+
+def test_update_rejects_regression(datasets, tmp_path):
+    """Test that an update making validation worse keeps the current model."""
+    loss_percentage_df, loss_tonnes_df = datasets
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    model.train(loss_percentage_df, loss_tonnes_df, track_with_mlflow=False)
+    version = model.version
+
+    # Trees fitted on inflated targets make the reference set worse
+    noisy = loss_percentage_df.copy()
+    for crop in ["Maize", "Rice", "Sorghum", "Millet"]:
+        noisy[crop] = noisy[crop] * 3
+    result = model.update(
+        noisy, loss_tonnes_df, n_new_estimators=100, validation_data=datasets
+    )
+
+    assert not result["accepted"]
+    assert model.version == version
+    assert len(model.model.named_steps["model"].estimators_) == 100
+
+
+def test_update_unsupported_model_type(datasets, tmp_path):
+    """Test that models without warm start or partial_fit cannot be updated."""
+    model = LossPredictionModel(model_type="linear", model_dir=str(tmp_path))
+    model.train(*datasets, track_with_mlflow=False)
+
+    with pytest.raises(ValueError):
+        model.update(*datasets)
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_predict_interval_from_trees(trained_model_dir, datasets, compact):
+    """Test that intervals are quantiles of the per-tree predictions."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    assert model.load(compact=compact)
+    X_train, _, _, _ = model._prepare_data(*datasets)
+    batch = X_train.head(50)
+
+    predictions, lower, upper = model.predict_interval(batch, coverage=0.8)
+
+    np.testing.assert_allclose(predictions, model.predict_many(batch))
+    assert np.all(lower <= upper)
+
+    # Reference: quantiles over each fitted tree's own predictions
+    pipeline = joblib.load(model.model_path)
+    encoded = pipeline.named_steps["preprocessor"].transform(batch)
+    per_tree = np.stack([tree.predict(encoded) for tree in pipeline.named_steps["model"].estimators_])
+    np.testing.assert_allclose(lower, np.quantile(per_tree, 0.1, axis=0))
+    np.testing.assert_allclose(
+        model.predict_quantiles(batch, quantiles=[0.5]), np.quantile(per_tree, [0.5], axis=0).T
+    )
+
+
+def test_predict_interval_needs_forest(trained_model_dir):
+    """Test that models without trees do not produce intervals."""
+    model = LossPredictionModel(model_type="linear", model_dir=trained_model_dir)
+    with pytest.raises(ValueError):
+        model.predict_interval(["Kano"], ["Northern"], ["Maize"], [1000.0])
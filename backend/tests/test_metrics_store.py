@@ -0,0 +1,83 @@
+"""Tests for the metrics history store."""
+
+import json
+import pytest
+from agripreserve.utils.metrics_store import MetricsStore, parse_snapshot_ref, parse_timestamp
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(str(tmp_path / "metrics.db"))
+
+
+def test_range_query_and_diff(store):
+    """Test that metrics are queried by name and time and diffed between snapshots."""
+    first = store.record({"total_food_loss_tonnes": 100.0, "avg_loss_percentage": 10.0},
+                         snapshot="aaa", timestamp="20250101_000000")
+    second = store.record({"total_food_loss_tonnes": 150.0, "avg_loss_percentage": 8.0},
+                          snapshot="bbb", timestamp="20250201_000000")
+
+    assert store.names() == ["avg_loss_percentage", "total_food_loss_tonnes"]
+    history = store.query(["total_food_loss_tonnes"], start=parse_timestamp("20250115_000000"))
+    assert list(history) == ["total_food_loss_tonnes"]
+    assert [point["value"] for point in history["total_food_loss_tonnes"]] == [150.0]
+    assert [snapshot["id"] for snapshot in store.snapshots()] == [second, first]
+
+    diff = store.diff("aaa", second)
+    assert diff["total_food_loss_tonnes"]["change"] == 50.0
+    assert diff["total_food_loss_tonnes"]["change_pct"] == 50.0
+    assert diff["avg_loss_percentage"]["change"] == -2.0
+    with pytest.raises(KeyError):
+        store.diff("aaa", "missing")
+
+
+def test_query_limit_applies_per_metric(store):
+    """Test that a multi-metric query is limited per metric, not in total."""
+    store.record_many([
+        {"metrics": {"a_rmse": float(i), "b_rmse": float(-i)}, "recorded_at": 1000.0 + i}
+        for i in range(5)
+    ])
+
+    history = store.query(["a_rmse", "b_rmse"], limit=3)
+    assert [point["value"] for point in history["a_rmse"]] == [0.0, 1.0, 2.0]
+    assert [point["value"] for point in history["b_rmse"]] == [0.0, -1.0, -2.0]
+
+
+def test_numeric_hash_is_not_taken_for_an_id(store):
+    """Test that an all-digit content hash is looked up as a hash, not an ID."""
+    first = store.record({"rmse": 2.0}, snapshot="123456", timestamp="20250101_000000")
+    second = store.record({"rmse": 1.0}, snapshot="654321", timestamp="20250201_000000")
+
+    assert store.diff("123456", "654321")["rmse"]["change"] == -1.0
+    assert store.diff(first, second)["rmse"]["change"] == -1.0
+    with pytest.raises(KeyError):
+        store.diff(str(first), str(second))
+    assert parse_snapshot_ref(f"id:{second}") == second
+    assert parse_snapshot_ref("654321") == "654321"
+
+
+def test_trend_is_downsampled(store):
+    """Test that a long history is aggregated into at most the requested points."""
+    store.record_many([
+        {"metrics": {"rmse": float(i)}, "recorded_at": 1000.0 + i * 60}
+        for i in range(100)
+    ])
+
+    trend = store.trend("rmse", points=10)
+    assert len(trend) == 10
+    assert sum(point["count"] for point in trend) == 100
+    assert trend[0]["min"] == 0.0
+    assert trend[-1]["last"] == 99.0
+    assert trend[0]["mean"] == 4.5
+    assert store.trend("missing") == []
+
+
+def test_import_json_files(store, tmp_path):
+    """Test that existing metrics files are imported once."""
+    for timestamp, value in [("20250508_122802", 1.0), ("20250508_123954", 2.0)]:
+        (tmp_path / f"metrics_{timestamp}.json").write_text(json.dumps({"rmse": value}))
+    (tmp_path / "snapshots.json").write_text("{}")
+
+    assert store.import_json_files(str(tmp_path)) == 2
+    assert store.import_json_files(str(tmp_path)) == 0
+    assert [point["value"] for point in store.query()["rmse"]] == [1.0, 2.0]
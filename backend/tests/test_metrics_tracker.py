@@ -0,0 +1,148 @@
+"""Tests for metrics tracking."""
+
+import os
+import pandas as pd
+import pytest
+from contextlib import nullcontext
+from agripreserve.utils import metrics_tracker
+from agripreserve.utils.metrics_tracker import MetricsTracker
+from agripreserve.utils.snapshots import read_snapshot_info
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace MLflow and DVC calls with recorders."""
+    calls = {"track_files": [], "log_artifacts": [], "log_metrics": []}
+    monkeypatch.setattr(metrics_tracker, "setup_mlflow_tracking", lambda *args, **kwargs: None)
+    monkeypatch.setattr(metrics_tracker, "start_run", lambda run_name=None: nullcontext())
+    monkeypatch.setattr(metrics_tracker, "log_params", lambda params: None)
+    monkeypatch.setattr(metrics_tracker, "log_metrics", calls["log_metrics"].append)
+    monkeypatch.setattr(metrics_tracker, "log_artifacts", calls["log_artifacts"].append)
+    monkeypatch.setattr(
+        metrics_tracker, "track_files",
+        lambda paths, message=None: calls["track_files"].append(paths) or {"success": True}
+    )
+    return calls
+
+
+@pytest.fixture
+def tracker(tmp_path, calls):
+    return MetricsTracker(metrics_dir=str(tmp_path / "metrics"), data_dir=str(tmp_path / "data"))
+
+
+@pytest.fixture
+def frames():
+    percentage = pd.DataFrame({
+        "State": ["Kano", "Lagos"],
+        "Region": ["Northern", "Southern"],
+        "Maize": [10.5, 8.0], "Rice": [12.0, 0.0], "Sorghum": [9.0, 7.5], "Millet": [11.0, 6.0]
+    })
+    tonnes = pd.DataFrame({
+        "State": ["Kano", "Lagos"],
+        "Region": ["Northern", "Southern"],
+        "Maize": [1000.0, 500.0], "Rice": [800.0, 0.0], "Sorghum": [700.0, 300.0], "Millet": [600.0, 200.0]
+    })
+    return percentage, tonnes
+
+
+def test_identical_snapshot_is_deduplicated(tracker, calls, frames):
+    """Test that tracking unchanged frames only records a reference."""
+    first = tracker.track_loss_metrics(*frames, run_name="first")
+    assert not first["deduplicated"]
+    # One batch for the metrics and both frames
+    assert [len(paths) for paths in calls["track_files"]] == [3]
+
+    second = tracker.track_loss_metrics(frames[0].copy(), frames[1].copy(), run_name="second")
+    assert second["deduplicated"]
+    assert second["snapshot"] == first["snapshot"]
+    assert second["files"] == first["files"]
+    assert second["metrics"]["total_food_loss_tonnes"] == first["metrics"]["total_food_loss_tonnes"]
+    # Nothing was written, tracked or uploaded again
+    assert len(calls["track_files"]) == 1
+    assert len(calls["log_artifacts"]) == 1
+    assert len(os.listdir(tracker.data_dir)) == 2
+    assert len(tracker.metrics_store.snapshots()) == 1
+
+    index = tracker._load_snapshot_index()
+    assert [ref["run_name"] for ref in index[first["snapshot"]]["references"]] == ["second"]
+
+
+def test_changed_or_missing_snapshot_is_tracked(tracker, calls, frames):
+    """Test that changed data, or a snapshot whose files are gone, is tracked again."""
+    first = tracker.track_loss_metrics(*frames)
+
+    changed = frames[1].copy()
+    changed.loc[0, "Maize"] = 1200.0
+    second = tracker.track_loss_metrics(frames[0], changed)
+    assert not second["deduplicated"]
+    assert second["snapshot"] != first["snapshot"]
+
+    os.remove(first["files"]["percentage"])
+    third = tracker.track_loss_metrics(*frames, deduplicate=True)
+    assert not third["deduplicated"]
+    assert os.path.exists(third["files"]["percentage"])
+
+
+def test_push_runs_in_background(tmp_path, calls, frames, monkeypatch):
+    """Test that tracking returns before the push to the remote finishes."""
+    class Handle:
+        def __init__(self, after):
+            self.after = after
+
+        def progress(self):
+            return {"status": "running"}
+
+        def wait(self, timeout=None):
+            return {"success": True}
+
+    pushes = []
+    monkeypatch.setattr(metrics_tracker, "setup_dagshub_remote", lambda url: None)
+    monkeypatch.setattr(
+        metrics_tracker, "push_to_remote_async",
+        lambda jobs=None, after=None: pushes.append(jobs) or Handle(after)
+    )
+    tracker = MetricsTracker(
+        metrics_dir=str(tmp_path / "metrics"), data_dir=str(tmp_path / "data"),
+        dagshub_repo_url="https://github.com/user/agripreserve", push_jobs=8
+    )
+
+    first = tracker.track_loss_metrics(*frames)
+    assert first["push"] == {"status": "running"}
+    changed = frames[1].copy()
+    changed.loc[0, "Maize"] = 1200.0
+    tracker.track_loss_metrics(frames[0], changed)
+
+    assert pushes == [8, 8]
+    # Each push waits for the previous one
+    assert tracker.push_handle.after is not None
+    assert tracker.wait_for_push(timeout=1) == {"status": "running"}
+
+
+def test_snapshots_are_deltas_and_reconstruct(tracker, frames):
+    """Test that later snapshots store only changed rows and load back exactly."""
+    first = tracker.track_loss_metrics(*frames)
+    changed = frames[1].copy()
+    changed.loc[1, "Rice"] = 50.0
+    second = tracker.track_loss_metrics(frames[0], changed)
+
+    assert second["files"]["tonnes"].endswith(".parquet")
+    assert read_snapshot_info(second["files"]["tonnes"])["changed"] == 1
+    assert read_snapshot_info(second["files"]["percentage"])["changed"] == 0
+
+    percentage, tonnes = tracker.load_snapshot(second["snapshot"])
+    pd.testing.assert_frame_equal(percentage, frames[0])
+    pd.testing.assert_frame_equal(tonnes, changed)
+    pd.testing.assert_frame_equal(tracker.load_snapshot(first["snapshot"])[1], frames[1])
+
+
+def test_csv_snapshot_format(tmp_path, calls, frames):
+    """Test that full CSV copies can still be written."""
+    tracker = MetricsTracker(
+        metrics_dir=str(tmp_path / "metrics"), data_dir=str(tmp_path / "data"),
+        snapshot_format="csv"
+    )
+    result = tracker.track_loss_metrics(*frames)
+    assert result["files"]["percentage"].endswith(".csv")
+
+    with pytest.raises(ValueError):
+        MetricsTracker(metrics_dir=str(tmp_path / "metrics"), snapshot_format="xlsx")
@@ -0,0 +1,259 @@
+"""Tests for resident model serving."""
+
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from agripreserve.api.routes import create_app
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+from agripreserve.models.serving import ModelService
+from agripreserve.models.training_jobs import TrainingJobQueue
+
+def test_model_service_loads_models(trained_model_dir):
+    """Test that the service loads and warms up all models."""
+    service = ModelService(model_dir=trained_model_dir)
+    assert not service.is_ready()
+
+    service.load()
+    assert service.is_ready()
+    assert service.status()["models"] == ["linear", "random_forest"]
+    assert service.get("random_forest").compiled is not None
+
+def test_model_service_reports_missing_models(tmp_path):
+    """Test that missing model files are reported and the service is not ready."""
+    service = ModelService(model_dir=str(tmp_path))
+    service.start_background_load()
+
+    assert not service.wait_until_ready(timeout=10)
+    status = service.status()
+    assert not status["loading"]
+    assert set(status["errors"]) == {"random_forest", "linear"}
+
+def test_predict_endpoint(trained_model_dir):
+    """Test the predict endpoint once the models are warm."""
+    app = create_app(model_dir=trained_model_dir)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+
+        response = client.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+
+        response = client.post("/api/predict", json={
+            "state": "Kano", "crop": "Maize", "loss_tonnes": 1000
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["region"] == "Northern"
+        assert data["model_type"] == "random_forest"
+        assert isinstance(data["predicted_loss_percentage"], float)
+
+        response = client.post("/api/predict", json={
+            "state": "Kano", "crop": "Cassava", "loss_tonnes": 1000
+        })
+        assert response.status_code == 400
+
+        response = client.post("/api/predict", json={
+            "state": "Kano", "crop": "Maize", "loss_tonnes": 1000, "model_type": "unknown"
+        })
+        assert response.status_code == 404
+
+def test_predict_before_ready():
+    """Test that predictions are refused until the models are loaded."""
+    client = TestClient(create_app(preload_models=False))
+
+    assert client.get("/api/ready").status_code == 503
+    response = client.post("/api/predict", json={
+        "state": "Kano", "crop": "Maize", "loss_tonnes": 1000
+    })
+    assert response.status_code == 503
+
+def test_predict_many_matches_predict(trained_model_dir):
+    """Test that batch predictions match single predictions."""
+    service = ModelService(model_dir=trained_model_dir)
+    service.load()
+    model = service.get("random_forest")
+
+    states = ["Kano", "Lagos", "Plateau"]
+    regions = ["Northern", "Southern", "Middle Belt"]
+    crops = ["Maize", "Rice", "Sorghum"]
+    tonnes = [1000.0, 500.0, 750.0]
+
+    predictions = model.predict_many(states, regions, crops, tonnes)
+    assert len(predictions) == 3
+    for i in range(3):
+        assert predictions[i] == pytest.approx(model.predict(states[i], regions[i], crops[i], tonnes[i]))
+
+    frame = pd.DataFrame({"State": states, "Region": regions, "Crop": crops, "Loss_Tonnes": tonnes})
+    assert list(model.predict_many(frame)) == pytest.approx(list(predictions))
+    assert len(model.predict_many([], [], [], [])) == 0
+
+def test_predict_batch_endpoint(trained_model_dir):
+    """Test the batch predict endpoint."""
+    app = create_app(model_dir=trained_model_dir)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+
+        items = [
+            {"state": "Kano", "crop": "Maize", "loss_tonnes": 1000},
+            {"state": "Lagos", "crop": "Rice", "loss_tonnes": 500, "region": "Southern"}
+        ]
+        response = client.post("/api/predict/batch", json={"items": items, "model_type": "linear"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["model_type"] == "linear"
+        assert [p["state"] for p in data["predictions"]] == ["Kano", "Lagos"]
+        assert data["predictions"][0]["region"] == "Northern"
+
+        single = client.post("/api/predict", json=dict(items[0], model_type="linear")).json()
+        assert data["predictions"][0]["predicted_loss_percentage"] == pytest.approx(
+            single["predicted_loss_percentage"]
+        )
+
+        items.append({"state": "Kano", "crop": "Cassava", "loss_tonnes": 10})
+        response = client.post("/api/predict/batch", json={"items": items})
+        assert response.status_code == 400
+
+def test_predict_reports_batching_stats(trained_model_dir):
+    """Test that single predictions are micro-batched and reported."""
+    app = create_app(model_dir=trained_model_dir)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+        client.post("/api/predict", json={"state": "Kano", "crop": "Maize", "loss_tonnes": 10})
+
+        stats = client.get("/api/stats").json()["batching"]["random_forest"]
+        assert stats["batches"] == 1
+        assert stats["batch_size"]["count"] == 1
+
+def test_select_distilled_variant(datasets, tmp_path):
+    """Test choosing the full or distilled model per request and by SLO."""
+    model = LossPredictionModel(model_type="random_forest", model_dir=str(tmp_path))
+    model.train(*datasets, track_with_mlflow=False)
+    model.distill(*datasets, max_depth=4, n_tonnage_points=5)
+
+    service = ModelService(model_types=["random_forest"], model_dir=str(tmp_path))
+    service.load()
+    assert service.select("random_forest", "full") == "random_forest"
+    assert service.select("random_forest", "distilled") == "random_forest_distilled"
+    assert service.select("random_forest", "auto") == "random_forest"
+    assert service.select("random_forest", "auto", latency_budget_ms=1e-6) == \
+        "random_forest_distilled"
+    assert service.select("random_forest", "auto", latency_budget_ms=1e6) == "random_forest"
+
+    service.latency_slo_ms = 1e-6
+    assert service.select("random_forest") == "random_forest_distilled"
+
+    app = create_app(model_dir=str(tmp_path))
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+        response = client.post("/api/predict", json={
+            "state": "Kano", "crop": "Maize", "loss_tonnes": 1000, "variant": "distilled"
+        })
+        assert response.json()["variant"] == "distilled"
+
+        response = client.post("/api/predict/batch", json={
+            "items": [{"state": "Kano", "crop": "Maize", "loss_tonnes": 1000}],
+            "variant": "distilled", "model_type": "linear"
+        })
+        assert response.status_code == 404
+
+def test_training_job_hot_swaps_models(datasets, tmp_path):
+    """Test that a training job runs in the background and its model is swapped in."""
+    LossPredictionModel(model_type="linear", model_dir=str(tmp_path)).train(
+        *datasets, track_with_mlflow=False
+    )
+    app = create_app(model_dir=str(tmp_path), training_queue_size=0)
+    with TestClient(app) as client:
+        service = app.state.model_service
+        assert service.wait_until_ready(timeout=30)
+        version = service.get("linear").version
+
+        response = client.post("/api/train", json={"model_types": ["linear"]})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        # One worker and no queue slots: a second job is rejected
+        assert client.post("/api/train", json={"model_types": ["linear"]}).status_code == 429
+        assert client.post("/api/train", json={"model_types": ["nope"]}).status_code == 400
+
+        job = app.state.training_jobs.wait(job_id, timeout=120)
+        assert job["status"] == "succeeded"
+        assert job["progress"] == 1.0
+        assert "rmse" in job["metrics"]["linear"]
+        assert service.get("linear").version != version
+
+        response = client.get(f"/api/train/{job_id}")
+        assert response.json()["status"] == "succeeded"
+        assert client.get("/api/train/unknown").status_code == 404
+        assert client.get("/api/stats").json()["training"]["succeeded"] == 1
+
+def test_retraining_drops_stale_distilled_variant(datasets, tmp_path):
+    """Test that a retrained model is not served next to the previous model's student."""
+    model = LossPredictionModel(model_type="linear", model_dir=str(tmp_path))
+    model.train(*datasets, track_with_mlflow=False)
+    model.distill(*datasets, max_depth=4, n_tonnage_points=5)
+    student = LossPredictionModel(model_type="linear_distilled", model_dir=str(tmp_path))
+    assert os.path.exists(student.model_path)
+
+    queue = TrainingJobQueue(model_dir=str(tmp_path), max_workers=1)
+    try:
+        job_id = queue.submit(["linear"])
+        assert queue.wait(job_id, timeout=120)["status"] == "succeeded"
+    finally:
+        queue.shutdown()
+
+    assert not os.path.exists(student.model_path)
+    assert not os.path.exists(student.artifact_path)
+    service = ModelService(model_types=["linear"], model_dir=str(tmp_path))
+    service.load()
+    assert "linear_distilled" not in service.models
+    assert service.select("linear", "auto", latency_budget_ms=1e-6) == "linear"
+
+def test_training_queue_reports_running_and_evicts(tmp_path):
+    """Test job states without polling, publishing off the callback thread, and eviction."""
+    completed = []
+    queue = TrainingJobQueue(
+        model_dir=str(tmp_path), max_workers=1, max_finished=1,
+        on_complete=lambda job: completed.append(threading.current_thread().name)
+    )
+    try:
+        first = queue.submit(["linear"])
+        second = queue.submit(["linear"])
+        deadline = time.monotonic() + 60
+        while queue.stats()["running"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert queue.stats()["running"] == 1
+        assert queue.stats()["queued"] == 1
+
+        assert queue.wait(second, timeout=120)["status"] == "succeeded"
+        assert all(name.startswith("training-publish") for name in completed)
+        # Only the latest finished job is kept
+        assert [job["job_id"] for job in queue.list_jobs()] == [second]
+        with pytest.raises(KeyError):
+            queue.status(first)
+    finally:
+        queue.shutdown()
+
+def test_predict_endpoints_return_intervals(trained_model_dir):
+    """Test prediction intervals on the single and batch endpoints."""
+    app = create_app(model_dir=trained_model_dir)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+        item = {"state": "Kano", "crop": "Maize", "loss_tonnes": 1000}
+
+        single = client.post("/api/predict", json=dict(item, interval_coverage=0.9)).json()
+        assert single["lower_loss_percentage"] <= single["upper_loss_percentage"]
+
+        batch = client.post("/api/predict/batch", json={
+            "items": [item, dict(item, crop="Rice")], "interval_coverage": 0.9
+        }).json()
+        assert batch["interval_coverage"] == 0.9
+        assert batch["predictions"][0]["upper_loss_percentage"] == single["upper_loss_percentage"]
+
+        response = client.post("/api/predict/batch", json={
+            "items": [item], "interval_coverage": 0.9, "model_type": "linear"
+        })
+        assert response.status_code == 400
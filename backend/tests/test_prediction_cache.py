@@ -0,0 +1,81 @@
+"""Tests for the prediction cache."""
+
+import time
+
+import pytest
+from agripreserve.models.cache import PredictionCache
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+
+def test_tonnages_share_a_bucket():
+    """Test that near-identical tonnages map to the same key."""
+    cache = PredictionCache(tonnes_bucket=10.0)
+    assert cache.make_key("v1", "Kano", "Northern", "Maize", 1001.0) == \
+        cache.make_key("v1", "Kano", "Northern", "Maize", 1004.9)
+    assert cache.make_key("v1", "Kano", "Northern", "Maize", 1001.0) != \
+        cache.make_key("v1", "Kano", "Northern", "Maize", 1006.0)
+    assert cache.make_key("v1", "Kano", "Northern", "Maize", 1001.0) != \
+        cache.make_key("v2", "Kano", "Northern", "Maize", 1001.0)
+
+def test_lru_eviction_and_ttl():
+    """Test that entries are evicted by size and expire after the TTL."""
+    cache = PredictionCache(max_size=2, ttl_seconds=0.05)
+    cache.put_many({"a": 1.0, "b": 2.0})
+    assert cache.get_many(["a"]) == [1.0]
+    cache.put_many({"c": 3.0})
+    assert cache.get_many(["b", "a", "c"]) == [None, 1.0, 3.0]
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.06)
+    assert cache.get_many(["a", "c"]) == [None, None]
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+    assert stats["hit_ratio"] == pytest.approx(0.5)
+
+def test_model_predictions_are_cached(trained_model_dir):
+    """Test that repeated predictions are served from the cache."""
+    cache = PredictionCache(tonnes_bucket=10.0)
+    model = LossPredictionModel(model_dir=trained_model_dir, cache=cache)
+    model.load()
+
+    first = model.predict_many(["Kano", "Kano"], ["Northern"] * 2, ["Maize"] * 2, [1001.0, 1002.0])
+    assert first[0] == first[1]
+    expected = model.compiled.predict(["Kano"], ["Northern"], ["Maize"], [1000.0])[0]
+    assert first[0] == pytest.approx(expected)
+    assert cache.stats()["size"] == 1
+
+    second = model.predict("Kano", "Northern", "Maize", 999.0)
+    assert second == first[0]
+    assert cache.stats()["hits"] == 1
+
+def test_cached_predictions_do_not_depend_on_request_order(trained_model_dir):
+    """Test that a bucket's prediction is the same whichever tonnage comes first."""
+    results = []
+    for tonnages in ([996.0, 1004.0], [1004.0, 996.0]):
+        model = LossPredictionModel(
+            model_dir=trained_model_dir, cache=PredictionCache(tonnes_bucket=10.0)
+        )
+        model.load()
+        results.append([model.predict("Kano", "Northern", "Maize", t) for t in tonnages])
+    assert results[0] == results[1][::-1]
+    assert results[0][0] == results[0][1]
+
+    # Intervals are computed at the same bucketed tonnage
+    prediction, _, _ = model.predict_interval(["Kano"], ["Northern"], ["Maize"], [1004.0])
+    assert prediction[0] == pytest.approx(results[0][0])
+
+def test_reload_invalidates_cache(trained_model_dir):
+    """Test that reloading the model drops predictions of the previous version."""
+    cache = PredictionCache()
+    model = LossPredictionModel(model_dir=trained_model_dir, cache=cache)
+    model.load()
+    version = model.version
+    model.predict("Kano", "Northern", "Maize", 1000.0)
+    assert cache.stats()["size"] == 1
+
+    model.load()
+    assert model.version != version
+    assert cache.stats()["size"] == 0
+    model.predict("Kano", "Northern", "Maize", 1000.0)
+    assert cache.stats()["hits"] == 0
@@ -0,0 +1,104 @@
+"""Tests for the local model registry."""
+
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+from agripreserve.api.routes import create_app
+from agripreserve.models.loss_prediction_model import LossPredictionModel
+from agripreserve.models.registry import ModelRegistry, most_accurate_within_slo
+
+
+@pytest.fixture
+def registry(trained_model_dir, tmp_path):
+    """A registry with the random forest and linear models promoted."""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    for model_type, rmse in [("random_forest", 1.0), ("linear", 2.0)]:
+        model = LossPredictionModel(model_type=model_type, model_dir=trained_model_dir)
+        assert registry.promote_if_better(model_type, registry.register(model, {"rmse": rmse}))
+    return registry
+
+
+def test_register_records_metrics_and_serving_cost(registry):
+    """Test that a version stores its metrics and measured serving cost."""
+    version = registry.current("random_forest")
+    meta = registry.meta("random_forest", version)
+
+    assert meta["metrics"] == {"rmse": 1.0}
+    assert meta["serving"]["latency_ms"] > 0
+    assert meta["serving"]["throughput_rows_per_s"] > 0
+    assert meta["serving"]["disk_bytes"] > 0
+    assert LossPredictionModel(
+        model_type="random_forest", model_dir=registry.version_dir("random_forest", version)
+    ).load(compact=True)
+
+
+def test_register_copies_distilled_variant(trained_model_dir, tmp_path):
+    """Test that a registered version can serve its distilled variant compactly."""
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    model = LossPredictionModel(model_type="linear", model_dir=str(model_dir))
+    source = LossPredictionModel(model_type="linear", model_dir=trained_model_dir)
+    shutil.copy2(source.model_path, model.model_path)
+    # Any exportable model stands in for the distilled tree
+    distilled = LossPredictionModel(model_type="linear_distilled", model_dir=str(model_dir))
+    shutil.copy2(source.model_path, distilled.model_path)
+    distilled.load()
+    distilled.export_compact()
+
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    version_dir = registry.version_dir("linear", registry.register(model, {"rmse": 1.0}))
+    served = LossPredictionModel(model_type="linear_distilled", model_dir=version_dir)
+    assert os.path.isdir(served.artifact_path)
+    assert served.load(compact=True) and served.model is None
+
+
+def test_promote_and_rollback(registry, trained_model_dir):
+    """Test promotion rules and rolling back to the previous version."""
+    first = registry.current("random_forest")
+    model = LossPredictionModel(model_type="random_forest", model_dir=trained_model_dir)
+    worse = registry.register(model, {"rmse": 5.0})
+
+    assert not registry.promote_if_better("random_forest", worse)
+    assert registry.current("random_forest") == first
+
+    registry.promote("random_forest", worse)
+    assert registry.current("random_forest") == worse
+    assert registry.rollback("random_forest") == first
+    assert [meta["version"] for meta in registry.versions("random_forest")] == [first, worse]
+
+    with pytest.raises(ValueError):
+        registry.rollback("random_forest")
+    with pytest.raises(KeyError):
+        registry.promote("random_forest", "v0")
+
+
+def test_select_trades_accuracy_for_latency():
+    """Test picking the most accurate model within the SLO."""
+    candidates = {"forest": (1.0, 5.0), "linear": (2.0, 0.5), "tree": (1.5, 1.0)}
+
+    assert most_accurate_within_slo(candidates) == "forest"
+    assert most_accurate_within_slo(candidates, latency_slo_ms=2.0) == "tree"
+    assert most_accurate_within_slo(candidates, latency_slo_ms=0.1) == "linear"
+    assert most_accurate_within_slo({}) is None
+
+
+def test_api_serves_promoted_versions(registry, tmp_path):
+    """Test that the server picks models from the registry and supports rollback."""
+    app = create_app(model_dir=str(tmp_path / "unused"), registry_dir=registry.root_dir)
+    with TestClient(app) as client:
+        assert app.state.model_service.wait_until_ready(timeout=30)
+        item = {"state": "Kano", "crop": "Maize", "loss_tonnes": 1000, "model_type": "auto"}
+
+        assert client.post("/api/predict", json=item).json()["model_type"] == "random_forest"
+        fast = client.post("/api/predict", json=dict(item, latency_budget_ms=1e-6)).json()
+        assert fast["model_type"] == min(
+            app.state.model_service.latency_ms, key=app.state.model_service.latency_ms.get
+        )
+
+        models = client.get("/api/models").json()
+        assert models["linear"]["current"] == registry.current("linear")
+        assert client.post("/api/models/linear/rollback").status_code == 409
+        response = client.post("/api/models/linear/promote", json={"version": "v0"})
+        assert response.status_code == 404
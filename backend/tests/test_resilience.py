@@ -0,0 +1,201 @@
+"""Tests for timeouts and circuit breakers around remote calls."""
+
+import os
+import ssl
+import sys
+import time
+import types
+import pytest
+from agripreserve.utils import dvc_utils, mlflow_utils
+from agripreserve.utils.async_tracking import AsyncMlflowLogger
+from agripreserve.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RemoteTimeoutError,
+    call_with_timeout,
+    get_breaker
+)
+
+
+def failing():
+    raise ConnectionError("remote unreachable")
+
+
+def test_call_with_timeout():
+    """Test that slow calls time out and errors are raised in the caller."""
+    assert call_with_timeout(lambda: 42, 1.0) == 42
+
+    start = time.perf_counter()
+    with pytest.raises(RemoteTimeoutError):
+        call_with_timeout(time.sleep, 0.05, 5)
+    assert time.perf_counter() - start < 1.0
+
+    with pytest.raises(ConnectionError):
+        call_with_timeout(failing, 1.0)
+
+
+def test_breaker_opens_and_recovers():
+    """Test that the circuit opens after repeated failures and closes after a trial."""
+    breaker = CircuitBreaker("remote", failure_threshold=2, reset_timeout=0.1, timeout=1.0)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    assert breaker.state == "open"
+
+    # Open circuits fail fast without calling the remote
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == []
+    assert breaker.stats()["rejected"] == 1
+
+    time.sleep(0.15)
+    assert breaker.state == "half_open"
+    # Only one trial at a time
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_failed_trial_reopens_circuit():
+    """Test that a failed trial call opens the circuit again."""
+    breaker = CircuitBreaker("remote", failure_threshold=1, reset_timeout=0.05, timeout=0.05)
+    with pytest.raises(RemoteTimeoutError):
+        breaker.call(time.sleep, 1)
+    time.sleep(0.1)
+    with pytest.raises(RemoteTimeoutError):
+        breaker.call(time.sleep, 1)
+    assert breaker.state == "open"
+    assert breaker.stats()["timeouts"] == 2
+
+
+def test_run_dvc_command_times_out(monkeypatch):
+    """Test that DVC commands are killed after their timeout."""
+    def run(*args, **kwargs):
+        raise dvc_utils.subprocess.TimeoutExpired(args[0], kwargs["timeout"])
+
+    monkeypatch.setattr(dvc_utils.subprocess, "run", run)
+    result = dvc_utils.run_dvc_command(["push"], timeout=0.5)
+    assert not result["success"]
+    assert result["timed_out"]
+    assert "timed out" in result["stderr"]
+
+
+def test_push_fails_fast_while_remote_unhealthy(monkeypatch):
+    """Test that pushes are skipped once the DVC remote is marked unhealthy."""
+    breaker = get_breaker("dvc_remote")
+    breaker.reset()
+    calls = []
+
+    def run_dvc_command(command, timeout=None):
+        calls.append(command)
+        return {"success": False, "stdout": "", "stderr": "connection refused", "returncode": 1}
+
+    monkeypatch.setattr(dvc_utils, "run_dvc_command", run_dvc_command)
+    try:
+        for _ in range(breaker.failure_threshold):
+            assert not dvc_utils.push_to_remote()["success"]
+        result = dvc_utils.pull_from_remote()
+        assert not result["success"]
+        assert "unhealthy" in result["output"]
+        assert len(calls) == breaker.failure_threshold
+    finally:
+        breaker.reset()
+
+
+def test_abandoned_dagshub_init_leaves_mlflow_alone(monkeypatch):
+    """Test that MLflow is configured by setup, not by a dagshub call that may be abandoned."""
+    from agripreserve.utils import dagshub_config
+
+    calls = []
+    fake = types.SimpleNamespace(
+        auth=types.SimpleNamespace(add_app_token=lambda token: None),
+        init=lambda **kwargs: calls.append(kwargs) or time.sleep(0.5)
+    )
+    monkeypatch.setitem(sys.modules, "dagshub", fake)
+    monkeypatch.setattr(ssl, "_create_default_https_context", ssl._create_default_https_context)
+    for name in ["MLFLOW_TRACKING_URI", "MLFLOW_TRACKING_USERNAME", "MLFLOW_TRACKING_PASSWORD",
+                 "DAGSHUB_USERNAME", "DAGSHUB_TOKEN", "DAGSHUB_REPO_URL"]:
+        monkeypatch.setenv(name, "")
+    breaker = get_breaker("dagshub")
+    breaker.reset()
+    monkeypatch.setattr(breaker, "timeout", 0.1)
+    try:
+        assert not dagshub_config.setup_dagshub_environment()
+        assert os.environ["MLFLOW_TRACKING_URI"] == dagshub_config.MLFLOW_TRACKING_URI
+        assert calls[0]["mlflow"] is False
+    finally:
+        breaker.reset()
+
+
+def test_unresponsive_tracking_server_falls_back_to_local(monkeypatch, tmp_path):
+    """Test that setup falls back to local tracking when the server hangs."""
+    breaker = get_breaker("mlflow")
+    breaker.reset()
+    monkeypatch.setattr(breaker, "timeout", 0.1)
+    monkeypatch.setattr(mlflow_utils, "_resolve_experiment", lambda uri, name: time.sleep(60))
+    local_uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    monkeypatch.setattr(mlflow_utils, "LOCAL_TRACKING_URI", local_uri)
+    # Restored after the test, as setup sets them for the process
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_TIMEOUT", "1")
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "0")
+
+    start = time.perf_counter()
+    try:
+        mlflow_utils.setup_mlflow_tracking("https://tracking.invalid", "resilience_test")
+        assert time.perf_counter() - start < 30
+        assert mlflow_utils.mlflow.get_tracking_uri() == local_uri
+    finally:
+        breaker.reset()
+        mlflow_utils.mlflow.set_tracking_uri(None)
+
+
+def test_async_logger_spools_while_circuit_open(tmp_path):
+    """Test that the async logger does not call an unhealthy tracking server."""
+    class Client:
+        batches = []
+
+        def log_batch(self, run_id, metrics=(), params=()):
+            self.batches.append(run_id)
+
+    breaker = CircuitBreaker("mlflow", failure_threshold=1, reset_timeout=3600)
+    breaker.record_failure(ConnectionError("down"))
+    logger = AsyncMlflowLogger(
+        str(tmp_path / "spool.jsonl"), flush_interval=0.05, replay_interval=3600,
+        client=Client(), breaker=breaker
+    )
+    try:
+        logger.log_metrics("run", {"rmse": 1.0})
+        assert logger.flush(timeout=5)
+        assert Client.batches == []
+        assert logger.stats()["spooled"] == 1
+
+        breaker.reset()
+        assert logger.replay() == 1
+        assert Client.batches == ["run"]
+    finally:
+        logger.close()
+
+
+def test_model_is_not_logged_while_circuit_open(monkeypatch):
+    """Test that logging a model does not start a run against an unhealthy server."""
+    import mlflow.sklearn
+
+    breaker = get_breaker("mlflow")
+    breaker.reset()
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError("down"))
+    logged = []
+    monkeypatch.setattr(mlflow.sklearn, "log_model", lambda *args, **kwargs: logged.append(args))
+    mlflow_utils.mlflow.set_tracking_uri("https://tracking.invalid")
+    try:
+        with mlflow_utils.start_run(run_name="unhealthy"):
+            mlflow_utils.log_model(object())
+        assert logged == []
+        assert mlflow_utils.mlflow.active_run() is None
+    finally:
+        breaker.reset()
+        mlflow_utils.mlflow.set_tracking_uri(None)
@@ -0,0 +1,77 @@
+"""Tests for Parquet data snapshots."""
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from agripreserve.utils import snapshots
+from agripreserve.utils.snapshots import read_snapshot, read_snapshot_info, write_snapshot
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "State": [f"State {i}" for i in range(20)],
+        "Region": ["Northern", "Southern"] * 10,
+        "Maize": [float(i) for i in range(20)],
+        "Rice": [float(i) * 2 for i in range(20)]
+    })
+
+
+def read_from_disk(path):
+    snapshots._cache.clear()
+    return read_snapshot(path)
+
+
+def test_delta_stores_only_changed_rows(tmp_path, frame):
+    """Test that a delta holds changed and added rows and reconstructs exactly."""
+    base_path = str(tmp_path / "base.parquet")
+    assert write_snapshot(frame, base_path)["kind"] == "full"
+
+    changed = frame.drop(index=[3])
+    changed.loc[5, "Maize"] = 99.0
+    changed.loc[20] = ["State 20", "Northern", 20.0, 40.0]
+    delta_path = str(tmp_path / "delta.parquet")
+    info = write_snapshot(changed, delta_path, base_path=base_path)
+
+    assert info["kind"] == "delta"
+    assert info["changed"] == 2
+    assert info["removed"] == 1
+    assert read_snapshot_info(delta_path)["base"] == "base.parquet"
+    pd.testing.assert_frame_equal(read_from_disk(delta_path), changed)
+    pd.testing.assert_frame_equal(read_from_disk(base_path), frame)
+
+
+def test_full_snapshot_when_delta_does_not_fit(tmp_path, frame):
+    """Test that reordered rows, new columns or long chains get a full snapshot."""
+    base_path = str(tmp_path / "base.parquet")
+    write_snapshot(frame, base_path)
+
+    reordered = frame.iloc[::-1]
+    assert write_snapshot(reordered, str(tmp_path / "reordered.parquet"), base_path)["kind"] == "full"
+    pd.testing.assert_frame_equal(read_from_disk(str(tmp_path / "reordered.parquet")), reordered)
+
+    extended = frame.assign(Millet=1.0)
+    assert write_snapshot(extended, str(tmp_path / "extended.parquet"), base_path)["kind"] == "full"
+
+    previous = base_path
+    kinds = []
+    for i in range(3):
+        current = frame.copy()
+        current.loc[i, "Rice"] = -1.0
+        path = str(tmp_path / f"chain_{i}.parquet")
+        kinds.append(write_snapshot(current, path, previous, max_chain=2)["kind"])
+        previous = path
+    assert kinds == ["delta", "delta", "full"]
+    pd.testing.assert_frame_equal(read_from_disk(previous), current)
+
+
+def test_unchanged_frame_writes_empty_delta(tmp_path, frame):
+    """Test that an unchanged frame costs an empty delta."""
+    base_path = str(tmp_path / "base.parquet")
+    write_snapshot(frame, base_path)
+    delta_path = str(tmp_path / "delta.parquet")
+    info = write_snapshot(frame.copy(), delta_path, base_path)
+
+    assert info["changed"] == 0
+    assert pq.read_metadata(delta_path).num_rows == 0
+    pd.testing.assert_frame_equal(read_from_disk(delta_path), frame)